@@ -1,7 +1,15 @@
-from flask import Flask, render_template, request, redirect, session, url_for, jsonify,send_file
-from flask_mysqldb import MySQL
+from flask import Flask, render_template, request, redirect, session, url_for, jsonify, send_file
+from flask import g, Response, before_render_template, template_rendered
 import json
-from ml.ml_manager import get_model_manager
+from ml.ml_manager import get_predictor
+from ml.mri_features import get_mri_features
+from ml.metrics import REGISTRY, CONTENT_TYPE
+from db.pool import PooledMySQL, mysql_config
+from db.diagnostics import save_diagnostic, load_json
+from db.audit_writer import AsyncRowWriter
+from db import counters
+from db.pagination import PagedQuery, BadPageToken, page_size
+from db.search import search_patients
 
 from datetime import datetime
 import traceback
@@ -9,9 +17,12 @@ import json
 import os
 
 
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-import io
+from MySQLdb.cursors import SSDictCursor
+from reports.exports import timeline_pdf, ehr_pdf, TIMELINE_SQL, EHR_SQL
+from reports.cache import ReportCache, REPORTS
+from storage.mri_store import MRIStore, UploadError, UploadConflict
+from concurrent.futures import TimeoutError as RenderPending
+import time
 
 
 
@@ -21,13 +32,150 @@ app.secret_key = "SECRET123"
 # ----------------------
 # MySQL CONFIG
 # ----------------------
-app.config["MYSQL_HOST"] = "localhost"
-app.config["MYSQL_USER"] = "hallibaz_neurosense"
-app.config["MYSQL_PASSWORD"] = "neurosense@123"
-app.config["MYSQL_DB"] = "hallibaz_neurosense"
+app.config.update(mysql_config())
 app.config["MYSQL_CURSORCLASS"] = "DictCursor"
+app.config["MYSQL_POOL_SIZE"] = int(os.environ.get("MYSQL_POOL_SIZE", 10))
+app.config["MYSQL_POOL_TIMEOUT"] = float(os.environ.get("MYSQL_POOL_TIMEOUT", 5))
 
-mysql = MySQL(app)
+mysql = PooledMySQL(app)
+
+# audit_log / health_events rows are written in the background (None → inline)
+events = AsyncRowWriter.from_env(mysql.pool)
+
+# dashboard totals, re-read from dashboard_counters at most every few seconds
+dashboard_counters = counters.DashboardCounters(
+    ttl=float(os.environ.get("NEUROSENSE_COUNTERS_TTL", 5)))
+
+# uploaded scans, stored once per content hash
+mri_store = MRIStore.from_env()
+# reject oversized bodies before they are read; chunk requests are far smaller
+app.config["MAX_CONTENT_LENGTH"] = mri_store.max_bytes + (1 << 20)
+
+# rendered timeline / EHR PDFs on disk, keyed by their rows (None → always stream)
+reports = ReportCache.from_env()
+
+# ---------------------------
+# PAGED LISTS (keyset pagination, see db/pagination.py)
+# ---------------------------
+PATIENT_OPTIONS = PagedQuery(
+    "patient_options",
+    "SELECT id, full_name FROM patients",
+    order=("full_name", "id"),
+    where=("full_name IS NOT NULL AND full_name != ''",))
+
+# patient <select>s render this many options; the rest load from /doctor_patient_options
+MAX_OPTIONS = 200
+
+PATIENT_ROSTER = PagedQuery(
+    "patient_roster",
+    "SELECT id, full_name, email, age, gender FROM patients",
+    order=("id",), descending=True)
+
+TIMELINE_EVENTS = PagedQuery(
+    "timeline",
+    "SELECT id, title, description, disease, event_type, created_at FROM health_events",
+    order=("created_at", "id"), descending=True,
+    filters={"patient_id": "patient_id = %s",
+             "event_type": "event_type = %s",
+             "disease": "disease = %s"})
+
+INTERVENTIONS = PagedQuery(
+    "interventions",
+    """SELECT he.id, p.full_name, he.title, he.description, he.disease, he.created_at
+       FROM health_events he JOIN patients p ON he.patient_id = p.id""",
+    order=("he.created_at", "he.id"), descending=True,
+    where=("he.event_type = 'intervention'",))
+
+def wants_json():
+    return request.args.get("format") == "json"
+
+def pdf_response(chunks, filename):
+    """Chunked PDF download; the body is generated while it is sent"""
+    return Response(chunks, mimetype="application/pdf", headers={
+        "Content-Disposition": f'attachment; filename="{filename}"',
+        "X-Accel-Buffering": "no",  # nginx: pass pages through as they come
+    })
+
+def stream_rows(sql, patient_id):
+    """Rows of a per-patient query through a server-side cursor on a borrowed connection"""
+    with mysql.borrow() as conn:
+        cur = conn.cursor(SSDictCursor)
+        try:
+            cur.execute(sql, (patient_id,))
+            yield from cur
+        finally:
+            cur.close()
+
+def cached_pdf(kind, patient_id, etag, chunks, filename):
+    """
+    Serve a report from the cache: 304 when the client's copy is current,
+    the file when it is on disk, otherwise render it in the background and
+    wait briefly before answering 202 + Retry-After.
+    """
+    if etag in request.if_none_match:
+        REPORTS.inc(kind=kind, outcome="not_modified")
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+
+    pdf = reports.lookup(kind, patient_id, etag)
+    if pdf is not None:
+        REPORTS.inc(kind=kind, outcome="hit")
+    else:
+        try:
+            pdf = reports.open(reports.render(kind, patient_id, etag, chunks).result(timeout=reports.wait))
+        except RenderPending:
+            pdf = None
+        if pdf is None:
+            REPORTS.inc(kind=kind, outcome="pending")
+            retry = max(1, round(reports.wait))
+            return render_template("report_pending.html", retry=retry), 202, {"Retry-After": str(retry)}
+        REPORTS.inc(kind=kind, outcome="rendered")
+
+    response = send_file(pdf, mimetype="application/pdf", as_attachment=True,
+                         download_name=filename, etag=etag, conditional=True, max_age=0)
+    response.cache_control.private = True
+    return response
+
+@app.errorhandler(BadPageToken)
+def bad_page_token(e):
+    return jsonify({"status": "error", "message": str(e)}), 400
+
+# ---------------------------
+# METRICS (Prometheus, see ml/metrics.py)
+# ---------------------------
+REQUEST_SECONDS = REGISTRY.histogram(
+    "neurosense_http_request_seconds", "Time per HTTP request",
+    labels=("endpoint", "method", "status"))
+RENDER_SECONDS = REGISTRY.histogram(
+    "neurosense_template_render_seconds", "Time per template render", labels=("template",))
+
+@app.before_request
+def _start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def _observe_request(response):
+    start = g.pop("request_start", None)
+    if start is not None:
+        REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint=request.endpoint or "unmatched",
+                                method=request.method, status=response.status_code)
+    return response
+
+def _start_render_timer(sender, template, context, **extra):
+    g.setdefault("render_start", {})[template.name] = time.perf_counter()
+
+def _observe_render(sender, template, context, **extra):
+    start = g.get("render_start", {}).pop(template.name, None)
+    if start is not None:
+        RENDER_SECONDS.observe(time.perf_counter() - start, template=template.name)
+
+before_render_template.connect(_start_render_timer, app)
+template_rendered.connect(_observe_render, app)
+
+@app.route("/metrics")
+def metrics():
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
 
 # ---------------------------
 # HOME PAGE
@@ -43,17 +191,12 @@ def check():
 
     cur = mysql.connection.cursor()
 
-    cur.execute("""
-        SELECT id, full_name
-        FROM patients
-        WHERE full_name IS NOT NULL AND full_name != ''
-        ORDER BY full_name
-    """)
-    patients = cur.fetchall()
+    patients, next_token = PATIENT_OPTIONS.page(cur, limit=MAX_OPTIONS)
 
     return render_template(
         "check.html",
-        patients=patients
+        patients=patients,
+        next_token=next_token
     )
    
 
@@ -69,6 +212,7 @@ def patient_signup():
 
         cur=mysql.connection.cursor()
         cur.execute("INSERT INTO patients(full_name,email,password) VALUES(%s,%s,%s)", (name,email,password))
+        counters.bump(cur, patients=1)
         mysql.connection.commit()
 
         return redirect(url_for("patient_login"))
@@ -172,30 +316,18 @@ def patient_timeline():
     event_type = request.args.get("type")
     disease = request.args.get("disease")
 
-    query = """
-        SELECT title, description, disease, event_type, created_at
-        FROM health_events
-        WHERE patient_id = %s
-    """
-    params = [pid]
-
-    if event_type:
-        query += " AND event_type = %s"
-        params.append(event_type)
-
-    if disease:
-        query += " AND disease = %s"
-        params.append(disease)
-
-    query += " ORDER BY created_at DESC"
-
     cur = mysql.connection.cursor()
-    cur.execute(query, params)
-    events = cur.fetchall()
+    events, next_token = TIMELINE_EVENTS.page(
+        cur, after=request.args.get("after"), limit=page_size(request.args.get("limit")),
+        patient_id=pid, event_type=event_type, disease=disease)
+
+    if wants_json():
+        return jsonify({"status": "success", "events": events, "next": next_token})
 
     return render_template(
         "patient_timeline.html",
         events=events,
+        next_token=next_token,
         active_page="timeline"
     )
 
@@ -208,45 +340,13 @@ def export_timeline():
         return redirect(url_for("patient_login"))
 
     pid = session["patient_id"]
-    cur = mysql.connection.cursor()
-    cur.execute("""
-        SELECT title, description, disease, created_at
-        FROM health_events
-        WHERE patient_id=%s
-        ORDER BY created_at DESC
-    """, (pid,))
-    events = cur.fetchall()
-
-    buffer = io.BytesIO()
-    pdf = canvas.Canvas(buffer, pagesize=A4)
-    y = 800
-
-    pdf.setFont("Helvetica-Bold", 16)
-    pdf.drawString(50, y, "Health Timeline")
-    y -= 40
-
-    pdf.setFont("Helvetica", 11)
-    for e in events:
-        pdf.drawString(50, y, f"{e['created_at']} - {e['title']}")
-        y -= 15
-        pdf.drawString(60, y, e['description'])
-        y -= 20
-        pdf.drawString(60, y, f"Disease: {e['disease']}")
-        y -= 30
-
-        if y < 100:
-            pdf.showPage()
-            y = 800
-
-    pdf.save()
-    buffer.seek(0)
-
-    return send_file(
-        buffer,
-        as_attachment=True,
-        download_name="Health_Timeline.pdf",
-        mimetype="application/pdf"
-    )
+    chunks = lambda: timeline_pdf(stream_rows(TIMELINE_SQL, pid))
+
+    if reports is None:
+        return pdf_response(chunks(), "Health_Timeline.pdf")
+
+    etag = reports.etag(mysql.connection.cursor(), "timeline", pid)
+    return cached_pdf("timeline", pid, etag, chunks, "Health_Timeline.pdf")
 
 
 
@@ -265,21 +365,25 @@ def patient_ehr():
     cur.execute("SELECT * FROM patients WHERE id=%s", (pid,))
     info = cur.fetchone()
 
-    # Assessments
+    # Assessments: generated columns + only the JSON fields the page shows
     cur.execute("""
-        SELECT diag, created_at
+        SELECT primary_diagnosis, diagnosis_confidence,
+               diag->'$.secondary_diagnoses' AS secondary_diagnoses,
+               diag->'$.recommendations' AS recommendations,
+               created_at
         FROM assessments
         WHERE patient_id=%s
         ORDER BY created_at DESC
     """, (pid,))
     assessments = cur.fetchall()
 
-    # ✅ Parse diag JSON here
     for a in assessments:
-        try:
-            a["diag"] = json.loads(a["diag"])
-        except:
-            a["diag"] = {}
+        a["diag"] = {
+            "primary_diagnosis": a["primary_diagnosis"],
+            "diagnosis_confidence": a["diagnosis_confidence"],
+            "secondary_diagnoses": load_json(a["secondary_diagnoses"], []),
+            "recommendations": load_json(a["recommendations"], []),
+        }
 
     return render_template(
         "patient_ehr.html",
@@ -302,46 +406,19 @@ def download_ehr():
 
     cur.execute("SELECT * FROM patients WHERE id=%s", (pid,))
     patient = cur.fetchone()
+    if patient is None:
+        return redirect(url_for("patient_login"))
 
-    cur.execute("SELECT diag, created_at FROM assessments WHERE patient_id=%s", (pid,))
-    assessments = cur.fetchall()
-
-    buffer = io.BytesIO()
-    pdf = canvas.Canvas(buffer, pagesize=A4)
-    y = 800
+    chunks = lambda: ehr_pdf(patient, stream_rows(EHR_SQL, pid))
 
-    pdf.setFont("Helvetica-Bold", 16)
-    pdf.drawString(50, y, "Electronic Health Record")
-    y -= 30
+    if reports is None:
+        return pdf_response(chunks(), "EHR_Report.pdf")
 
-    pdf.setFont("Helvetica", 11)
-    pdf.drawString(50, y, f"Name: {patient['full_name']}")
-    y -= 15
-    pdf.drawString(50, y, f"Email: {patient['email']}")
-    y -= 15
-    pdf.drawString(50, y, f"Age: {patient['age']}")
-    y -= 30
+    # the header prints these, so a profile edit must change the key too
+    profile = f"{patient['full_name']}|{patient['email']}|{patient['age']}"
+    etag = reports.etag(cur, "ehr", pid, extra=profile)
+    return cached_pdf("ehr", pid, etag, chunks, "EHR_Report.pdf")
 
-    for a in assessments:
-        d = json.loads(a["diag"])
-        pdf.drawString(50, y, f"Diagnosis: {d['primary_diagnosis']}")
-        y -= 15
-        pdf.drawString(60, y, f"Confidence: {d['diagnosis_confidence']}")
-        y -= 25
-
-        if y < 100:
-            pdf.showPage()
-            y = 800
-
-    pdf.save()
-    buffer.seek(0)
-
-    return send_file(
-        buffer,
-        as_attachment=True,
-        download_name="EHR_Report.pdf",
-        mimetype="application/pdf"
-    )
 
 
 # ==========================================
@@ -404,13 +481,11 @@ def assessment():
             return redirect(url_for("assessment", step=step+1))
         else:
             # RUN ML MODEL
-            ml=get_model_manager()
+            ml=get_predictor()
             form=session["form"]
 
-            alz = ml.predict_alzheimers_risk(form)
-            park = ml.predict_parkinsons_risk(form)
-            dem = ml.predict_dementia_risk(form)
-            diag = ml.predict_diagnostic(form)
+            # each model runs once for all four results
+            alz, park, dem, diag = ml.predict_assessment(form)
 
             cur=mysql.connection.cursor()
             cur.execute("INSERT INTO assessments(patient_id, form_data, alz, park, dem, diag) VALUES (%s,%s,%s,%s,%s,%s)",
@@ -459,33 +534,8 @@ def doctor_dashboard():
 
     cur = mysql.connection.cursor()
 
-    # Total patients
-    cur.execute("SELECT COUNT(*) AS total FROM patients")
-    total_patients = cur.fetchone()["total"]
-
-    # High risk patients
-    cur.execute("""
-        SELECT COUNT(*) AS high_risk
-        FROM diagnostic_reports
-        WHERE diagnosis_confidence >= 0.7
-    """)
-    high_risk = cur.fetchone()["high_risk"]
-
-    # Pending cases
-    cur.execute("""
-        SELECT COUNT(*) AS pending
-        FROM diagnostic_reports
-        WHERE diagnosis_confidence < 0.7
-    """)
-    pending = cur.fetchone()["pending"]
-
-    # Alerts (high severity events)
-    cur.execute("""
-        SELECT COUNT(*) AS alerts
-        FROM health_events
-        WHERE severity = 'high'
-    """)
-    alerts = cur.fetchone()["alerts"]
+    # Totals come from the counters table (db/counters.py), not COUNT(*)
+    totals = dashboard_counters.get(mysql.connection)
 
     # Patient roster
     cur.execute("""
@@ -507,10 +557,10 @@ def doctor_dashboard():
 
     return render_template(
         "doctor_dashboard.html",
-        total_patients=total_patients,
-        high_risk=high_risk,
-        pending=pending,
-        alerts=alerts,
+        total_patients=totals["patients"],
+        high_risk=totals["reports_high"],
+        pending=totals["reports_pending"],
+        alerts=totals["alerts"],
         patients=patients,
         activities=activities
     )
@@ -527,26 +577,26 @@ def doctor_patients():
 
     cur = mysql.connection.cursor()
 
+    after, limit = request.args.get("after"), page_size(request.args.get("limit"))
+
     if search:
-        cur.execute("""
-            SELECT id, full_name, email, age, gender
-            FROM patients
-            WHERE full_name LIKE %s OR email LIKE %s
-            ORDER BY id DESC
-        """, (f"%{search}%", f"%{search}%"))
+        # ranked FULLTEXT / prefix lookups, see db/search.py
+        patients, next_token = search_patients(cur, search, after=after, limit=limit)
     else:
-        cur.execute("""
-            SELECT id, full_name, email, age, gender
-            FROM patients
-            ORDER BY id DESC
-        """)
+        patients, next_token = PATIENT_ROSTER.page(cur, after=after, limit=limit)
 
-    patients = cur.fetchall()
+    if wants_json():
+        return jsonify({"status": "success", "patients": patients, "next": next_token})
+
+    # roster total from the dashboard counters; a search shows its page count
+    total = None if search else dashboard_counters.get(mysql.connection)["patients"]
 
     return render_template(
         "patient_management.html",
         patients=patients,
-        search=search
+        search=search,
+        total=total,
+        next_token=next_token
     )
 
 
@@ -558,17 +608,12 @@ def doctor_diagnostics_page():
 
     cur = mysql.connection.cursor()
 
-    cur.execute("""
-        SELECT id, full_name
-        FROM patients
-        WHERE full_name IS NOT NULL AND full_name != ''
-        ORDER BY full_name
-    """)
-    patients = cur.fetchall()
+    patients, next_token = PATIENT_OPTIONS.page(cur, limit=MAX_OPTIONS)
 
     return render_template(
         "diagnostics.html",
-        patients=patients
+        patients=patients,
+        next_token=next_token
     )
 
 
@@ -576,36 +621,23 @@ def doctor_diagnostics_page():
 
 
 def insert_diagnostic_report(data):
-    cur = mysql.connection.cursor()
-    cur.execute("""
-        INSERT INTO diagnostic_reports
-        (patient_id, doctor_id, primary_diagnosis, diagnosis_confidence,
-         secondary_diagnoses, disease_probabilities, key_findings, recommendations,
-         mmse_score, cdr_score, csf_tau_level, csf_abeta42_level, apoe_status,
-         mri_file_path, created_at)
-        VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,NOW())
-    """, (
-        data["patient_id"],
-        data["doctor_id"],
-        data["primary_diagnosis"],
-        data["diagnosis_confidence"],
-        json.dumps(data["secondary_diagnoses"]),
-        json.dumps(data["disease_probabilities"]),
-        json.dumps(data["key_findings"]),
-        json.dumps(data["recommendations"]),
-        data["mmse_score"],
-        data["cdr_score"],
-        data["csf_tau_level"],
-        data["csf_abeta42_level"],
-        data["apoe_status"],
-        data["mri_file_path"]
-    ))
-    mysql.connection.commit()
-    return cur.lastrowid
+    return save_diagnostic(mysql.connection, data["patient_id"], data["doctor_id"], data, data,
+                           writer=events)
 
 # -------------------------------------------------------------------
 # MAIN ROUTE — RUN DIAGNOSTICS
 
+@app.route("/doctor_patient_options")
+def patient_options():
+    if "doctor_id" not in session:
+        return jsonify({"error": "Unauthorized"}), 401
+
+    cur = mysql.connection.cursor()
+    patients, next_token = PATIENT_OPTIONS.page(
+        cur, after=request.args.get("after"), limit=page_size(request.args.get("limit"), MAX_OPTIONS))
+
+    return jsonify({"status": "success", "patients": patients, "next": next_token})
+
 @app.route("/doctor_patient_latest-assessment/<int:patient_id>")
 def get_latest_assessment(patient_id):
     if "doctor_id" not in session:
@@ -614,7 +646,10 @@ def get_latest_assessment(patient_id):
     cur = mysql.connection.cursor()
 
     cur.execute("""
-        SELECT diag
+        SELECT primary_diagnosis, diagnosis_confidence,
+               diag->'$.secondary_diagnoses' AS secondary_diagnoses,
+               diag->'$.recommendations' AS recommendations,
+               diag->'$.key_findings' AS key_findings
         FROM assessments
         WHERE patient_id = %s
         ORDER BY created_at DESC
@@ -626,25 +661,20 @@ def get_latest_assessment(patient_id):
     if not row:
         return jsonify({"status": "empty"})
 
-    try:
-        diag = json.loads(row["diag"])
-    except:
-        diag = {}
-
     return jsonify({
         "status": "success",
-        "primary_diagnosis": diag.get("primary_diagnosis", ""),
-        "diagnosis_confidence": diag.get("diagnosis_confidence", ""),
-        "secondary_diagnoses": ", ".join(diag.get("secondary_diagnoses", [])),
-        "recommendations": ", ".join(diag.get("recommendations", [])),
-        "key_findings": ", ".join(diag.get("key_findings", []))
+        "primary_diagnosis": row["primary_diagnosis"] or "",
+        "diagnosis_confidence": "" if row["diagnosis_confidence"] is None else row["diagnosis_confidence"],
+        "secondary_diagnoses": ", ".join(load_json(row["secondary_diagnoses"], [])),
+        "recommendations": ", ".join(load_json(row["recommendations"], [])),
+        "key_findings": ", ".join(load_json(row["key_findings"], []))
     })
 
 @app.route("/doctor_diagnostics", methods=["POST"])
 def run_diagnostics():
     try:
         data = request.get_json()
-        model_manager = get_model_manager()
+        model_manager = get_predictor()
 
         patient_id = data.get("patient_id")
         doctor_id = data.get("doctor_id")
@@ -655,6 +685,7 @@ def run_diagnostics():
         # ----------------------------------
         # 1. RUN ML MODEL
         # ----------------------------------
+        await_mri_features(data)
         try:
             result = model_manager.predict_diagnostic(data)
         except Exception as e:
@@ -662,75 +693,13 @@ def run_diagnostics():
             result = model_manager._fallback_diagnostic(data)
 
         # ----------------------------------
-        # 2. INSERT DIAGNOSTIC REPORT
-        # ----------------------------------
-        cur = mysql.connection.cursor()
-
-        cur.execute("""
-            INSERT INTO diagnostic_reports
-            (patient_id, doctor_id, primary_diagnosis, diagnosis_confidence,
-             secondary_diagnoses, disease_probabilities, key_findings,
-             recommendations, mmse_score, cdr_score,
-             csf_tau_level, csf_abeta42_level, apoe_status,
-             mri_file_path, created_at)
-            VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,NOW())
-        """, (
-            patient_id,
-            doctor_id,
-            result.primary_diagnosis,
-            result.diagnosis_confidence,
-            json.dumps(result.secondary_diagnoses),
-            json.dumps(result.disease_probabilities),
-            json.dumps(result.key_findings),
-            json.dumps(result.recommendations),
-            data.get("mmse_score"),
-            data.get("cdr_score"),
-            data.get("csf_tau_level"),
-            data.get("csf_abeta42_level"),
-            data.get("apoe_status"),
-            data.get("mri_file_path")
-        ))
-
-        mysql.connection.commit()
-        report_id = cur.lastrowid   # ✅ GUARANTEED
-
-        # ----------------------------------
-        # 3. INSERT HEALTH EVENT
+        # 2. REPORT + HEALTH EVENT + AUDIT LOG (one transaction)
         # ----------------------------------
-        cur.execute("""
-            INSERT INTO health_events
-            (patient_id, event_type, title, description, severity, disease, created_at)
-            VALUES (%s,%s,%s,%s,%s,%s,NOW())
-        """, (
-            patient_id,
-            "diagnosis",
-            f"Diagnostic Report: {result.primary_diagnosis}",
-            f"Primary diagnosis confirmed: {result.primary_diagnosis}",
-            "high" if result.diagnosis_confidence >= 0.7 else "moderate",
-            result.primary_diagnosis
-        ))
-
-        mysql.connection.commit()
-
-        # ----------------------------------
-        # 4. AUDIT LOG
-        # ----------------------------------
-        cur.execute("""
-            INSERT INTO audit_log
-            (user_id, action, table_name, record_id, changes, created_at)
-            VALUES (%s,%s,%s,%s,%s,NOW())
-        """, (
-            doctor_id,
-            "CREATE",
-            "diagnostic_reports",
-            report_id,
-            json.dumps({"diagnosis": result.primary_diagnosis})
-        ))
-
-        mysql.connection.commit()
+        report_id = save_diagnostic(mysql.connection, patient_id, doctor_id, result, data,
+                                    writer=events)
 
         # ----------------------------------
-        # 5. FINAL RESPONSE (IMPORTANT)
+        # 3. FINAL RESPONSE (IMPORTANT)
         # ----------------------------------
         return jsonify({
             "status": "success",
@@ -741,6 +710,7 @@ def run_diagnostics():
             "disease_probabilities": result.disease_probabilities,
             "key_findings": result.key_findings,
             "recommendations": result.recommendations,
+            "mri_features": result.mri_features,
             "timestamp": datetime.utcnow().isoformat()
         })
 
@@ -761,29 +731,102 @@ def upload_mri():
     if "doctor_id" not in session:
         return jsonify({"status": "error", "message": "Unauthorized"}), 401
 
-    if "mri_file" not in request.files:
-        return jsonify({"status": "error", "message": "No file provided"})
-
-    file = request.files["mri_file"]
+    # multipart form (mri_file) or the raw scan as the body (?filename=...)
+    if request.mimetype == "multipart/form-data":
+        if "mri_file" not in request.files:
+            return jsonify({"status": "error", "message": "No file provided"})
+        file = request.files["mri_file"]
+        filename, stream = file.filename, file.stream
+    else:
+        filename = request.args.get("filename") or request.headers.get("X-Filename", "")
+        stream = request.stream
 
-    if file.filename == "":
+    if filename == "":
         return jsonify({"status": "error", "message": "Empty filename"})
 
-    upload_dir = "uploads/mri"
-    os.makedirs(upload_dir, exist_ok=True)
-
-    filename = f"{datetime.utcnow().timestamp()}_{file.filename}"
-    filepath = os.path.join(upload_dir, filename)
+    try:
+        stored = mri_store.put(stream, filename)
+    except UploadError as e:
+        return jsonify({"status": "error", "message": str(e)}), e.status
 
-    file.save(filepath)
+    extract_mri_features(stored["sha256"])
 
     return jsonify({
         "status": "success",
-        "message": "MRI uploaded successfully",
-        "file": filepath
+        "message": "MRI already on file" if stored["deduplicated"] else "MRI uploaded successfully",
+        **stored
     })
 
 
+# ---------------------------
+# RESUMABLE MRI UPLOADS (see storage/mri_store.py)
+# ---------------------------
+@app.route("/upload_mri/sessions", methods=["POST"])
+def upload_mri_session():
+    if "doctor_id" not in session:
+        return jsonify({"status": "error", "message": "Unauthorized"}), 401
+
+    body = request.get_json(silent=True) or {}
+    if not body.get("filename") or not body.get("size"):
+        return jsonify({"status": "error", "message": "filename and size are required"}), 400
+
+    try:
+        info = mri_store.create_session(body["filename"], body["size"], session["doctor_id"])
+    except (UploadError, ValueError) as e:
+        return jsonify({"status": "error", "message": str(e)}), getattr(e, "status", 400)
+
+    return jsonify({"status": "success", **info}), 201
+
+
+@app.route("/upload_mri/sessions/<upload_id>", methods=["GET", "HEAD", "PATCH"])
+def upload_mri_chunk(upload_id):
+    if "doctor_id" not in session:
+        return jsonify({"status": "error", "message": "Unauthorized"}), 401
+
+    try:
+        if request.method == "PATCH":
+            offset = int(request.headers.get("Upload-Offset", -1))
+            info = mri_store.append(upload_id, session["doctor_id"], offset, request.stream)
+        else:
+            info = mri_store.status(upload_id, session["doctor_id"])
+    except UploadConflict as e:
+        return (jsonify({"status": "error", "message": str(e), "offset": e.offset}), 409,
+                {"Upload-Offset": str(e.offset)})
+    except UploadError as e:
+        return jsonify({"status": "error", "message": str(e)}), e.status
+    except ValueError:
+        return jsonify({"status": "error", "message": "Bad Upload-Offset header"}), 400
+
+    if request.method == "PATCH" and info.get("complete"):
+        extract_mri_features(info["sha256"])
+
+    return jsonify({"status": "success", **info}), 200, {"Upload-Offset": str(info["offset"])}
+
+
+def await_mri_features(form):
+    """
+    Wait (up to NEUROSENSE_MRI_FEATURE_WAIT) for the form's scan features on
+    the request thread, so the prediction, which only reads the cache, finds
+    them. Any failure just means a diagnostic without MRI features.
+    """
+    features = get_mri_features()
+    if features is not None and form.get("mri_file_path"):
+        try:
+            features.features(form["mri_file_path"])
+        except Exception as e:
+            print("⚠️ MRI feature lookup failed:", e)
+
+
+def extract_mri_features(sha256):
+    """Start feature extraction now so the diagnostic finds it cached"""
+    features = get_mri_features()
+    if features is not None and features.get(sha256) is None:
+        try:
+            features.submit(sha256)
+        except Exception as e:
+            print("⚠️ MRI feature extraction not started:", e)
+
+
 @app.route("/doctor_patients_add", methods=["GET", "POST"])
 def add_patient():
     if "doctor_id" not in session:
@@ -812,6 +855,7 @@ def add_patient():
             blood_type,
             password
         ))
+        counters.bump(cur, patients=1)
         mysql.connection.commit()
 
         return redirect(url_for("doctor_patients"))
@@ -847,54 +891,43 @@ def doctor_interventions():
         intervention_type = request.form["intervention_type"]
         details = request.form["details"]
 
-        cur.execute("""
-            INSERT INTO health_events
-            (patient_id, event_type, title, description, severity, disease, created_at)
-            VALUES (%s,'intervention',%s,%s,'moderate',%s,NOW())
-        """, (
-            patient_id,
-            f"{intervention_type} Intervention",
-            details,
-            diagnosis
-        ))
-        mysql.connection.commit()
+        row = (patient_id, "intervention", f"{intervention_type} Intervention",
+               details, "moderate", diagnosis)
+        if events is not None:
+            # wait for the flush: the redirect below lists recent interventions
+            events.append("health_events", row, wait=2.0)
+        else:
+            cur.execute("""
+                INSERT INTO health_events
+                (patient_id, event_type, title, description, severity, disease, created_at)
+                VALUES (%s,%s,%s,%s,%s,%s,NOW())
+            """, row)
+            counters.bump(cur, alerts=counters.alert_delta([row]))
+            mysql.connection.commit()
 
         return redirect(url_for("doctor_interventions"))
 
     # -------------------------------
     # FETCH PATIENTS
     # -------------------------------
-    cur.execute("""
-        SELECT id, full_name
-        FROM patients
-        WHERE full_name IS NOT NULL AND full_name != ''
-        ORDER BY full_name
-    """)
-    patients = cur.fetchall()
+    patients, next_token = PATIENT_OPTIONS.page(cur, limit=MAX_OPTIONS)
 
     # -------------------------------
     # FETCH INTERVENTIONS
     # -------------------------------
-    cur.execute("""
-        SELECT 
-            he.id,
-            p.full_name,
-            he.title,
-            he.description,
-            he.disease,
-            he.created_at
-        FROM health_events he
-        JOIN patients p ON he.patient_id = p.id
-        WHERE he.event_type = 'intervention'
-        ORDER BY he.created_at DESC
-        LIMIT 10
-    """)
-    interventions = cur.fetchall()
+    interventions, interventions_next = INTERVENTIONS.page(
+        cur, after=request.args.get("after"), limit=page_size(request.args.get("limit"), 10))
+
+    if wants_json():
+        return jsonify({"status": "success", "interventions": interventions,
+                        "next": interventions_next})
 
     return render_template(
         "interventions.html",
         patients=patients,
-        interventions=interventions
+        next_token=next_token,
+        interventions=interventions,
+        interventions_next=interventions_next
     )
 
 
@@ -903,7 +936,7 @@ def doctor_interventions():
 def run_diagnostics_flask():
     try:
         body = request.json
-        model_manager = get_model_manager()
+        model_manager = get_predictor()
 
         patient_id = body.get("patient_id")
         doctor_id = body.get("doctor_id")
@@ -913,6 +946,7 @@ def run_diagnostics_flask():
         # -------------------------------
         # STEP 1 — MODEL PREDICTION
         # -------------------------------
+        await_mri_features(body)
         try:
             diagnostic_result = model_manager.predict_diagnostic(body)
         except Exception as e:
@@ -923,84 +957,15 @@ def run_diagnostics_flask():
             diagnostic_result = model_manager._fallback_diagnostic(body)
 
         # -------------------------------
-        # STEP 2 — INSERT DIAGNOSTIC REPORT INTO DB
+        # STEP 2 — REPORT + HEALTH EVENT + AUDIT LOG (one transaction)
         # -------------------------------
-        report_id = None
         try:
-            cur = mysql.connection.cursor()
-
-            cur.execute("""
-                INSERT INTO diagnostic_reports 
-                (patient_id, doctor_id, primary_diagnosis, diagnosis_confidence,
-                 secondary_diagnoses, disease_probabilities, key_findings, recommendations,
-                 mmse_score, cdr_score, csf_tau_level, csf_abeta42_level, apoe_status, 
-                 mri_file_path, created_at)
-                VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s, NOW())
-            """, (
-                patient_id,
-                doctor_id,
-                diagnostic_result.primary_diagnosis,
-                diagnostic_result.diagnosis_confidence,
-                json.dumps(diagnostic_result.secondary_diagnoses),
-                json.dumps(diagnostic_result.disease_probabilities),
-                json.dumps(diagnostic_result.key_findings),
-                json.dumps(diagnostic_result.recommendations),
-                body.get("mmse_score"),
-                body.get("cdr_score"),
-                body.get("csf_tau_level"),
-                body.get("csf_abeta42_level"),
-                body.get("apoe_status"),
-                body.get("mri_file_path")
-            ))
-
-            mysql.connection.commit()
-            report_id = cur.lastrowid
-
+            report_id = save_diagnostic(mysql.connection, patient_id, doctor_id,
+                                        diagnostic_result, body, writer=events)
         except Exception as e:
-            print("⚠️ DB Error inserting diagnostic report:", e)
+            print("⚠️ DB Error saving diagnostic report:", e)
             report_id = f"temp_{int(datetime.utcnow().timestamp())}"
 
-        # -------------------------------
-        # STEP 3 — INSERT HEALTH EVENT
-        # -------------------------------
-        try:
-            cur = mysql.connection.cursor()
-            cur.execute("""
-                INSERT INTO health_events
-                (patient_id, event_type, title, description, severity, disease, created_at)
-                VALUES (%s, %s, %s, %s, %s, %s, NOW())
-            """, (
-                patient_id,
-                "diagnosis",
-                f"Diagnostic Report: {diagnostic_result.primary_diagnosis}",
-                f"Primary diagnosis: {diagnostic_result.primary_diagnosis}",
-                "high" if diagnostic_result.diagnosis_confidence > 0.7 else "moderate",
-                diagnostic_result.primary_diagnosis
-            ))
-            mysql.connection.commit()
-        except Exception as e:
-            print("⚠️ Error inserting health event:", e)
-
-        # -------------------------------
-        # STEP 4 — AUDIT LOG
-        # -------------------------------
-        try:
-            cur = mysql.connection.cursor()
-            cur.execute("""
-                INSERT INTO audit_log
-                (user_id, action, table_name, record_id, changes, created_at)
-                VALUES (%s, %s, %s, %s, %s, NOW())
-            """, (
-                doctor_id,
-                "CREATE",
-                "diagnostic_reports",
-                report_id,
-                json.dumps({"diagnosis": diagnostic_result.primary_diagnosis})
-            ))
-            mysql.connection.commit()
-        except Exception as e:
-            print("⚠️ Error inserting audit log:", e)
-
         # -------------------------------
         # FINAL SUCCESS RESPONSE
         # -------------------------------
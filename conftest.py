@@ -0,0 +1 @@
+"""pytest: run from the repository root so `ml`, `db`, ... import as in the app"""
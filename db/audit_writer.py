@@ -0,0 +1,306 @@
+"""
+Asynchronous Append-Only Writer
+Takes audit_log and health_events rows off the request path. Rows are
+queued (never blocking the caller), written by a background thread as
+multi-row executemany() INSERTs, flushed when a batch is full or after
+`flush_interval` seconds, and drained at shutdown. If the database is
+unreachable the rows are appended to a local JSONL spill file and
+replayed once writes succeed again. High-severity events bump the
+dashboard "alerts" counter in the same transaction as their batch.
+
+A batch the database rejects (FK violation, value too long, ...) is
+retried row by row; rows that fail on their own go to a dead-letter
+file with their error and are not retried, so one bad row cannot hold
+back the rows around it.
+
+Enabled by default; NEUROSENSE_AUDIT_ASYNC=0 writes synchronously.
+
+    python -m db.audit_writer replay     # replay a spill file by hand
+"""
+
+import atexit
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
+
+from db import counters
+from ml.metrics import REGISTRY
+
+# created_at is bound as a parameter (captured when the row is queued) so
+# every VALUES tuple is pure %s and MySQLdb sends a batch as one statement
+TABLES = {
+    "health_events": """
+        INSERT INTO health_events
+        (patient_id, event_type, title, description, severity, disease, created_at)
+        VALUES (%s,%s,%s,%s,%s,%s,%s)
+    """,
+    "audit_log": """
+        INSERT INTO audit_log
+        (user_id, action, table_name, record_id, changes, created_at)
+        VALUES (%s,%s,%s,%s,%s,%s)
+    """,
+}
+
+ROWS_WRITTEN = REGISTRY.counter(
+    "neurosense_async_rows_total", "Rows handled by the async writer by outcome",
+    labels=("table", "outcome"))
+FLUSH_SECONDS = REGISTRY.histogram(
+    "neurosense_async_flush_seconds", "Time per async writer flush")
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+# server errors that say nothing about the rows: too many connections,
+# server shutdown, lock wait timeout, deadlock
+TRANSIENT_ERRORS = {1040, 1053, 1205, 1213}
+
+
+def is_transient(error):
+    """
+    True when a failed write may succeed later as it is (database down,
+    connection lost: client errors 2000+), False when the rows themselves
+    were rejected.
+    """
+    code = error.args[0] if error.args and isinstance(error.args[0], int) else None
+    return code is None or code >= 2000 or code in TRANSIENT_ERRORS
+
+
+class AsyncRowWriter:
+
+    def __init__(self, pool, batch_size=200, flush_interval=1.0, max_queue=10000,
+                 spill_path="instance/audit_spill.jsonl",
+                 dead_letter_path="instance/audit_dead_letter.jsonl"):
+        self.pool = pool
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.spill_path = spill_path
+        self.dead_letter_path = dead_letter_path
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._wake = threading.Event()
+        self._stop = False
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._spill_lock = threading.Lock()
+        atexit.register(self.close)
+        REGISTRY.gauge_func("neurosense_async_queue_depth", "Rows waiting in the async writer",
+                            lambda: self._queue.qsize())
+
+    @classmethod
+    def from_env(cls, pool):
+        if os.environ.get("NEUROSENSE_AUDIT_ASYNC", "1") == "0":
+            return None
+        return cls(
+            pool,
+            batch_size=int(os.environ.get("NEUROSENSE_AUDIT_BATCH", 200)),
+            flush_interval=float(os.environ.get("NEUROSENSE_AUDIT_FLUSH_SECONDS", 1.0)),
+            spill_path=os.environ.get("NEUROSENSE_AUDIT_SPILL", "instance/audit_spill.jsonl"),
+            dead_letter_path=os.environ.get("NEUROSENSE_AUDIT_DEAD_LETTER",
+                                            "instance/audit_dead_letter.jsonl"),
+        )
+
+    # =============================
+    # PRODUCER SIDE
+    # =============================
+    def append(self, table, params, wait=None):
+        """
+        Queue one row (params without created_at). Returns immediately;
+        a full queue spills the row to disk instead of blocking.
+        With `wait` (seconds), for rows a page is about to show: wake the
+        writer and block until the row's batch is flushed; returns False
+        if that took longer.
+        """
+        if table not in TABLES:
+            raise ValueError(f"Unknown table for async writes: {table}")
+        row = (table, tuple(params) + (datetime.now(),))
+        done = threading.Event() if wait else None
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(row + (done,))
+        except queue.Full:
+            self._spill([row])
+            return True
+        if done is None:
+            return True
+        self._wake.set()
+        return done.wait(wait)
+
+    # =============================
+    # WORKER
+    # =============================
+    def _ensure_worker(self):
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                if self._pid != os.getpid():
+                    self._queue = queue.Queue(maxsize=self._queue.maxsize)
+                self._pid = os.getpid()
+                self._stop = False
+                self._thread = threading.Thread(target=self._run, name="async-row-writer",
+                                                daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stop:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self._drain()
+
+    def _drain(self):
+        """Write everything queued right now, one batch at a time"""
+        while True:
+            items = []
+            while len(items) < self.batch_size:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not items:
+                return
+            batch = [(table, params) for table, params, _ in items]
+            try:
+                left = self._flush(batch)
+                if left:
+                    self._spill(left)
+                else:
+                    self.replay()
+            finally:
+                for _, _, done in items:
+                    if done is not None:
+                        done.set()
+            if len(items) < self.batch_size:
+                return
+
+    def _flush(self, batch):
+        """
+        Write a batch; returns the rows still to write later (empty once the
+        database has taken them or dead-lettered the ones it rejects)
+        """
+        try:
+            self._write(batch)
+            return []
+        except Exception as e:
+            if is_transient(e):
+                print("⚠️ Async writer: flush failed:", e)
+                return batch
+            print(f"⚠️ Async writer: batch of {len(batch)} rejected ({e}), retrying row by row")
+
+        for i, row in enumerate(batch):
+            try:
+                self._write([row])
+            except Exception as e:
+                if is_transient(e):
+                    print("⚠️ Async writer: flush failed:", e)
+                    return batch[i:]
+                self._dead_letter(row, e)
+        return []
+
+    def _write(self, batch):
+        """One transaction for the batch; raises (after rolling back) on failure"""
+        by_table = {}
+        for table, params in batch:
+            by_table.setdefault(table, []).append(params)
+
+        start = time.perf_counter()
+        conn = self.pool.acquire()
+        try:
+            cur = conn.cursor()
+            for table, rows in by_table.items():
+                cur.executemany(TABLES[table], rows)
+            counters.bump(cur, alerts=counters.alert_delta(by_table.get("health_events", ())))
+            conn.commit()
+            cur.close()
+        except Exception:
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+            raise
+        finally:
+            self.pool.release(conn)
+        FLUSH_SECONDS.observe(time.perf_counter() - start)
+        for table, rows in by_table.items():
+            ROWS_WRITTEN.inc(len(rows), table=table, outcome="written")
+
+    # =============================
+    # SPILL / DEAD-LETTER FILES
+    # =============================
+    @staticmethod
+    def _line(table, params, **extra):
+        values = [v.strftime(TIME_FORMAT) if isinstance(v, datetime) else v for v in params]
+        return json.dumps({"table": table, "params": values, **extra}, default=str) + "\n"
+
+    def _spill(self, batch):
+        with self._spill_lock:
+            os.makedirs(os.path.dirname(self.spill_path) or ".", exist_ok=True)
+            with open(self.spill_path, "a") as f:
+                for table, params in batch:
+                    f.write(self._line(table, params))
+        for table, _ in batch:
+            ROWS_WRITTEN.inc(table=table, outcome="spilled")
+        print(f"⚠️ Async writer: {len(batch)} rows spilled to {self.spill_path}")
+
+    def _dead_letter(self, row, error):
+        """A row the database rejects on its own: kept for inspection, never retried"""
+        table, params = row
+        with self._spill_lock:
+            os.makedirs(os.path.dirname(self.dead_letter_path) or ".", exist_ok=True)
+            with open(self.dead_letter_path, "a") as f:
+                f.write(self._line(table, params, error=str(error)))
+        ROWS_WRITTEN.inc(table=table, outcome="dead_letter")
+        print(f"❌ Async writer: {table} row rejected ({error}), moved to {self.dead_letter_path}")
+
+    def replay(self):
+        """Write back rows from the spill file; returns how many were replayed"""
+        replaying = self.spill_path + ".replay"
+        with self._spill_lock:
+            # a .replay left behind by an interrupted replay goes first
+            if not os.path.exists(replaying):
+                if not os.path.exists(self.spill_path):
+                    return 0
+                os.replace(self.spill_path, replaying)
+
+        with open(replaying) as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+        batch = [(r["table"], tuple(r["params"][:-1]) +
+                  (datetime.strptime(r["params"][-1], TIME_FORMAT),)) for r in rows]
+
+        for i in range(0, len(batch), self.batch_size):
+            left = self._flush(batch[i:i + self.batch_size])
+            if left:
+                self._spill(left + batch[i + self.batch_size:])
+                break
+        os.remove(replaying)
+        if batch:
+            print(f"✔ Async writer: replayed {len(batch)} spilled rows")
+        return len(batch)
+
+    # =============================
+    # SHUTDOWN
+    # =============================
+    def close(self, timeout=10.0):
+        """Stop the worker and drain what is left (atexit)"""
+        if self._thread is None or self._pid != os.getpid():
+            return
+        self._stop = True
+        self._wake.set()
+        self._thread.join(timeout)
+        self._drain()
+
+
+def main(argv):
+    if argv == ["replay"]:
+        from app import mysql
+        writer = AsyncRowWriter.from_env(mysql.pool) or AsyncRowWriter(mysql.pool)
+        writer.replay()
+        return 0
+    print(__doc__)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,196 @@
+"""
+Dashboard Counters
+The doctor dashboard's four totals are kept in a small `dashboard_counters`
+rollup table instead of being COUNT(*)ed on every page view. Each writer
+bumps the matching counter in the same transaction as its INSERT, so a
+counter moves exactly when the row it counts becomes visible; reads are
+one primary-key lookup behind a short in-process TTL cache.
+
+    CREATE TABLE dashboard_counters (
+        name  VARCHAR(64) PRIMARY KEY,
+        value BIGINT NOT NULL DEFAULT 0
+    ) ENGINE=InnoDB;
+
+Any drift (rows written outside the app, manual deletes) is repaired by
+the reconciliation job, which recounts from the source tables:
+
+    python -m db.counters reconcile       # recount and fix
+    python -m db.counters check           # report drift only
+"""
+
+import struct
+import sys
+import threading
+import time
+
+# diagnosis_confidence is a FLOAT column: a stored 0.70 reads back as
+# 0.6999999. "High" starts half a point lower, at what displays as 70%,
+# and is compared on the bare column so idx_reports_confidence serves it
+# as a range.
+HIGH_CONFIDENCE = 0.695
+
+# counter name -> the query it stands in for (used by reconcile; the
+# initial backfill in migrations/008 repeats them)
+COUNTERS = {
+    "patients": "SELECT COUNT(*) FROM patients",
+    "reports_high": f"SELECT COUNT(*) FROM diagnostic_reports WHERE diagnosis_confidence >= {HIGH_CONFIDENCE}",
+    "reports_pending": f"SELECT COUNT(*) FROM diagnostic_reports WHERE diagnosis_confidence < {HIGH_CONFIDENCE}",
+    "alerts": "SELECT COUNT(*) FROM health_events WHERE severity = 'high'",
+}
+
+# upsert: a counter row that does not exist yet starts at the delta
+BUMP_SQL = """
+    INSERT INTO dashboard_counters (name, value) VALUES (%s, %s)
+    ON DUPLICATE KEY UPDATE value = value + VALUES(value)
+"""
+
+READ_SQL = "SELECT name, value FROM dashboard_counters"
+
+
+# -----------------------------
+# WRITE SIDE (caller's transaction)
+# -----------------------------
+def bump(cur, **deltas):
+    """
+    Add deltas to counters on the caller's cursor, e.g. bump(cur, patients=1).
+    Does not commit: call it between the INSERT and the commit so both land
+    together. Counter rows are locked until that commit, so keep it last.
+    """
+    # fixed lock order across writers: no deadlocks between two bumps
+    rows = [(name, delta) for name, delta in sorted(deltas.items()) if delta]
+    for name, _ in rows:
+        if name not in COUNTERS:
+            raise ValueError(f"Unknown dashboard counter: {name}")
+    if rows:
+        cur.executemany(BUMP_SQL, rows)
+
+
+def alert_delta(event_rows):
+    """How many health_events rows (INSERT_EVENT parameter order) count as alerts"""
+    return sum(1 for row in event_rows if row[4] == "high")
+
+
+def report_counter(confidence):
+    """
+    Counter a diagnostic report with this confidence belongs to, judged on
+    the value the FLOAT column will hold, as the COUNTERS queries see it
+    """
+    stored = struct.unpack("f", struct.pack("f", float(confidence)))[0]
+    return "reports_high" if stored >= HIGH_CONFIDENCE else "reports_pending"
+
+
+# -----------------------------
+# READ SIDE
+# -----------------------------
+def _rows(cur):
+    for row in cur.fetchall():
+        if isinstance(row, dict):
+            yield row["name"], row["value"]
+        else:
+            yield row[0], row[1]
+
+
+def read(cur):
+    """All counters straight from the table; missing rows read as 0"""
+    cur.execute(READ_SQL)
+    values = dict.fromkeys(COUNTERS, 0)
+    values.update((name, int(value)) for name, value in _rows(cur) if name in COUNTERS)
+    return values
+
+
+class DashboardCounters:
+    """Per-process cache of the counters, refreshed at most every `ttl` seconds"""
+
+    def __init__(self, ttl=5.0):
+        self.ttl = ttl
+        self._values = None
+        self._expires = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, conn):
+        now = time.monotonic()
+        if self._values is not None and now < self._expires:
+            return self._values
+        with self._lock:
+            if self._values is None or time.monotonic() >= self._expires:
+                cur = conn.cursor()
+                try:
+                    self._values = read(cur)
+                finally:
+                    cur.close()
+                self._expires = time.monotonic() + self.ttl
+        return self._values
+
+    def invalidate(self):
+        self._expires = 0.0
+
+
+# -----------------------------
+# RECONCILIATION
+# -----------------------------
+def _count(cur, sql):
+    cur.execute(sql)
+    row = cur.fetchone()
+    return int(next(iter(row.values())) if isinstance(row, dict) else row[0])
+
+
+def reconcile(conn, fix=True):
+    """
+    Recount every counter from its source table and (with `fix`) overwrite
+    the stored value. Returns {name: (stored, actual)} for counters that
+    were off.
+
+    Each counter is fixed in its own short transaction: the counter row is
+    locked FOR UPDATE first, so writers that have not bumped yet wait for
+    us and add their +1 on top of the recount, while writers that already
+    bumped have committed and are included in it.
+    """
+    drift = {}
+    cur = conn.cursor()
+    try:
+        for name, sql in COUNTERS.items():
+            cur.execute("INSERT IGNORE INTO dashboard_counters (name, value) VALUES (%s, 0)", (name,))
+            cur.execute("SELECT value FROM dashboard_counters WHERE name = %s FOR UPDATE", (name,))
+            row = cur.fetchone()
+            stored = int(row["value"] if isinstance(row, dict) else row[0])
+            actual = _count(cur, sql)
+            if stored != actual:
+                drift[name] = (stored, actual)
+                if fix:
+                    cur.execute("UPDATE dashboard_counters SET value = %s WHERE name = %s",
+                                (actual, name))
+            if fix:
+                conn.commit()
+            else:
+                conn.rollback()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+    return drift
+
+
+def main(argv):
+    if argv not in (["reconcile"], ["check"]):
+        print(__doc__)
+        return 2
+    from app import mysql
+
+    fix = argv == ["reconcile"]
+    conn = mysql.pool.acquire()
+    try:
+        drift = reconcile(conn, fix=fix)
+    finally:
+        mysql.pool.release(conn)
+
+    if not drift:
+        print("✔ Dashboard counters match their tables")
+        return 0
+    for name, (stored, actual) in drift.items():
+        print(f"{'✔ Fixed' if fix else '⚠️ Drift'} {name}: stored {stored}, actual {actual}")
+    return 0 if fix else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
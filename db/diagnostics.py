@@ -0,0 +1,125 @@
+"""
+Diagnostic Persistence
+Writes a diagnostic report, its health-timeline event and the audit
+entry in one transaction with one commit: either all three rows exist
+or none do. The dashboard counters (db/counters.py) are bumped in the
+same transaction.
+
+With an AsyncRowWriter (db/audit_writer.py) only the report is written
+inline and the other two rows are queued after it commits, which is a
+weaker guarantee: they land up to one flush interval later, go to the
+spill file while the database is down, and are lost if the process dies
+before the flush. Run with NEUROSENSE_AUDIT_ASYNC=0 where every report
+must have its audit row.
+
+    report_id = save_diagnostic(mysql.connection, patient_id, doctor_id, result, data)
+"""
+
+import json
+
+from db import counters
+
+# clinical inputs stored alongside the report, taken from the request body
+CLINICAL_FIELDS = ("mmse_score", "cdr_score", "csf_tau_level", "csf_abeta42_level",
+                   "apoe_status", "mri_file_path")
+
+INSERT_REPORT = """
+    INSERT INTO diagnostic_reports
+    (patient_id, doctor_id, primary_diagnosis, diagnosis_confidence,
+     secondary_diagnoses, disease_probabilities, key_findings, recommendations,
+     mmse_score, cdr_score, csf_tau_level, csf_abeta42_level, apoe_status,
+     mri_file_path, created_at)
+    VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,NOW())
+"""
+
+INSERT_EVENT = """
+    INSERT INTO health_events
+    (patient_id, event_type, title, description, severity, disease, created_at)
+    VALUES (%s,%s,%s,%s,%s,%s,NOW())
+"""
+
+INSERT_AUDIT = """
+    INSERT INTO audit_log
+    (user_id, action, table_name, record_id, changes, created_at)
+    VALUES (%s,%s,%s,%s,%s,NOW())
+"""
+
+
+def load_json(raw, default):
+    """A JSON column or JSON_EXTRACT value as MySQLdb returns it (str, bytes or None)"""
+    if raw is None:
+        return default
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return default
+
+
+def _fields(diagnosis):
+    """A DiagnosticResult or a dict with the same keys, as a dict"""
+    return diagnosis if isinstance(diagnosis, dict) else vars(diagnosis)
+
+
+def report_params(patient_id, doctor_id, diagnosis, clinical):
+    d = _fields(diagnosis)
+    return (
+        patient_id,
+        doctor_id,
+        d["primary_diagnosis"],
+        d["diagnosis_confidence"],
+        json.dumps(d["secondary_diagnoses"]),
+        json.dumps(d["disease_probabilities"]),
+        json.dumps(d["key_findings"]),
+        json.dumps(d["recommendations"]),
+        *(clinical.get(k) for k in CLINICAL_FIELDS),
+    )
+
+
+def event_params(patient_id, diagnosis):
+    d = _fields(diagnosis)
+    primary = d["primary_diagnosis"]
+    return (
+        patient_id,
+        "diagnosis",
+        f"Diagnostic Report: {primary}",
+        f"Primary diagnosis confirmed: {primary}",
+        "high" if d["diagnosis_confidence"] >= 0.7 else "moderate",
+        primary,
+    )
+
+
+def audit_params(doctor_id, report_id, diagnosis):
+    return (doctor_id, "CREATE", "diagnostic_reports", report_id,
+            json.dumps({"diagnosis": _fields(diagnosis)["primary_diagnosis"]}))
+
+
+def save_diagnostic(conn, patient_id, doctor_id, diagnosis, clinical=None, writer=None):
+    """
+    Insert report + health event + audit row, commit once; returns the
+    report id. `diagnosis` is a DiagnosticResult or a dict with the same
+    keys. Rolls back and re-raises on any failure. With `writer`, the
+    event and audit rows are queued there after the report commits and
+    are not part of its transaction (see the module docstring).
+    """
+    cur = conn.cursor()
+    try:
+        cur.execute(INSERT_REPORT, report_params(patient_id, doctor_id, diagnosis, clinical or {}))
+        report_id = cur.lastrowid
+        deltas = {counters.report_counter(_fields(diagnosis)["diagnosis_confidence"]): 1}
+        if writer is None:
+            event = event_params(patient_id, diagnosis)
+            cur.execute(INSERT_EVENT, event)
+            cur.execute(INSERT_AUDIT, audit_params(doctor_id, report_id, diagnosis))
+            deltas["alerts"] = counters.alert_delta([event])
+        counters.bump(cur, **deltas)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+    if writer is not None:
+        writer.append("health_events", event_params(patient_id, diagnosis))
+        writer.append("audit_log", audit_params(doctor_id, report_id, diagnosis))
+    return report_id
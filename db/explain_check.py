@@ -0,0 +1,225 @@
+"""
+EXPLAIN Check
+Collects every SELECT / UPDATE / DELETE that app.py (and the query
+modules in SOURCES) pass to cursor.execute(), runs EXPLAIN on it against the configured database and
+exits non-zero when a query does a full table scan (type ALL) that is not
+listed in ALLOWED_SCANS. Queries built up with `query += ...` and the
+keyset-paged lists declared with PagedQuery(...) are checked in their
+fullest form (every optional filter and the page seek applied). Helpers
+that execute a query they receive as a parameter (stream_rows(sql, ...))
+are followed to their call sites.
+
+    python -m db.explain_check          # needs MYSQL_* settings, run after db.migrate
+    python -m db.explain_check --list   # just print the collected queries
+
+Run it against a database with realistic row counts: on near-empty tables
+MySQL may prefer a scan even when a usable index exists.
+"""
+
+import ast
+import os
+import sys
+
+from db.pagination import PagedQuery
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCES = ("app.py", "db/search.py", "reports/exports.py", "reports/cache.py")
+
+# query fragment -> why a full scan is accepted there
+ALLOWED_SCANS = {
+    ") AS ranked": "derived table of FULLTEXT matches; only matched rows are scanned to rank them",
+}
+
+CHECKED_VERBS = ("SELECT", "UPDATE", "DELETE")
+
+
+# -----------------------------
+# QUERY COLLECTION
+# -----------------------------
+def _string(node):
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value
+    return None
+
+
+def _assigned(func, name):
+    """Concatenation of every string assigned / += to `name` inside func"""
+    parts = []
+    for node in ast.walk(func):
+        if isinstance(node, ast.Assign) and any(
+                isinstance(t, ast.Name) and t.id == name for t in node.targets):
+            value = _string(node.value)
+            if value is not None:
+                parts.append((node.lineno, value))
+        elif isinstance(node, ast.AugAssign) and isinstance(node.target, ast.Name) \
+                and node.target.id == name and isinstance(node.op, ast.Add):
+            value = _string(node.value)
+            if value is not None:
+                parts.append((node.lineno, value))
+    parts.sort()
+    return "".join(value for _, value in parts) or None
+
+
+def _paged(source, node):
+    """PagedQuery(...) call with literal arguments -> (location, fullest sql)"""
+    if not (isinstance(node, ast.Call) and isinstance(node.func, ast.Name)
+            and node.func.id == "PagedQuery"):
+        return None
+    args = [ast.literal_eval(a) for a in node.args]
+    kwargs = {k.arg: ast.literal_eval(k.value) for k in node.keywords}
+    query = PagedQuery(*args, **kwargs)
+    return f"{source}:{node.lineno} PagedQuery({query.name})", query.fullest()
+
+
+def _runners(tree):
+    """{function name: index of the parameter it passes to execute()}"""
+    runners = {}
+    for func in ast.walk(tree):
+        if not isinstance(func, ast.FunctionDef):
+            continue
+        params = [a.arg for a in func.args.args]
+        for node in ast.walk(func):
+            if (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+                    and node.func.attr == "execute" and node.args
+                    and isinstance(node.args[0], ast.Name) and node.args[0].id in params
+                    and _assigned(func, node.args[0].id) is None):
+                runners[func.name] = params.index(node.args[0].id)
+    return runners
+
+
+def collect(sources=SOURCES):
+    """[(location, sql)] for every checkable execute() call and PagedQuery"""
+    found, trees, constants = [], {}, {}
+    # module-level SQL constants from every source, so imported names resolve
+    for source in sources:
+        path = os.path.join(ROOT, source)
+        with open(path) as f:
+            trees[source] = tree = ast.parse(f.read(), path)
+        for node in tree.body:
+            if not isinstance(node, ast.Assign):
+                continue
+            value = _string(node.value)
+            if isinstance(node.value, ast.Dict):
+                # {kind: "SELECT ..."} tables of queries, executed as NAME[kind]
+                values = [_string(v) for v in node.value.values]
+                value = values if values and None not in values else None
+            if value is not None:
+                for target in node.targets:
+                    if isinstance(target, ast.Name):
+                        constants[target.id] = value
+
+    runners = {}
+    for tree in trees.values():
+        runners.update(_runners(tree))
+
+    for source, tree in trees.items():
+        for node in tree.body:
+            if isinstance(node, ast.Assign):
+                paged = _paged(source, node.value)
+                if paged:
+                    found.append(paged)
+        for func in ast.walk(tree):
+            if not isinstance(func, ast.FunctionDef):
+                continue
+            for node in ast.walk(func):
+                if not isinstance(node, ast.Call):
+                    continue
+                if isinstance(node.func, ast.Attribute) and node.func.attr == "execute" and node.args:
+                    arg = node.args[0]
+                elif (isinstance(node.func, ast.Name) and node.func.id in runners
+                        and len(node.args) > runners[node.func.id]):
+                    arg = node.args[runners[node.func.id]]
+                else:
+                    continue
+                # nested functions are walked again on their own; report the innermost
+                if any(inner is not func and isinstance(inner, ast.FunctionDef)
+                       and node in ast.walk(inner) for inner in ast.walk(func)):
+                    continue
+                sql = _string(arg)
+                if sql is None and isinstance(arg, ast.Name):
+                    sql = _assigned(func, arg.id) or constants.get(arg.id)
+                if sql is None and isinstance(arg, ast.Subscript) and isinstance(arg.value, ast.Name):
+                    sql = constants.get(arg.value.id)
+                if sql is None:
+                    continue
+                for query in ([sql] if isinstance(sql, str) else sql):
+                    query = " ".join(query.split())
+                    if query.split(None, 1)[0].upper() in CHECKED_VERBS:
+                        found.append((f"{source}:{node.lineno} {func.name}()", query))
+    return found
+
+
+def allowed(sql):
+    for fragment, reason in ALLOWED_SCANS.items():
+        if fragment in sql:
+            return reason
+    return None
+
+
+# -----------------------------
+# EXPLAIN
+# -----------------------------
+def explain(cur, sql):
+    """EXPLAIN rows as dicts, with every %s bound to a sample value"""
+    cur.execute("EXPLAIN " + sql, ["1"] * sql.count("%s"))
+    rows = cur.fetchall()
+    if rows and not isinstance(rows[0], dict):
+        names = [d[0] for d in cur.description]
+        rows = [dict(zip(names, row)) for row in rows]
+    return rows
+
+
+def check(conn, queries):
+    """Print one line per query; returns the number of failures"""
+    failures = 0
+    cur = conn.cursor()
+    try:
+        for location, sql in queries:
+            plan = explain(cur, sql)
+            scans = [r for r in plan if r.get("type") == "ALL"]
+            sorts = [r for r in plan if "filesort" in (r.get("Extra") or "")]
+            reason = allowed(sql)
+
+            if scans and not reason:
+                failures += 1
+                for r in scans:
+                    hint = (f" (index available: {r['possible_keys']}; try realistic data)"
+                            if r.get("possible_keys") else "")
+                    print(f"❌ {location}: full scan of {r.get('table')}, "
+                          f"~{r.get('rows')} rows{hint}\n   {sql}")
+            elif scans:
+                print(f"· {location}: full scan allowed ({reason})")
+            else:
+                keys = ", ".join(f"{r.get('table')}:{r.get('key')}" for r in plan)
+                print(f"✔ {location}: {keys}")
+            for r in sorts:
+                print(f"   ⚠️ filesort on {r.get('table')}")
+    finally:
+        cur.close()
+    return failures
+
+
+def main(argv):
+    queries = collect()
+    if argv == ["--list"]:
+        for location, sql in queries:
+            print(f"{location}\n   {sql}")
+        return 0
+    if argv:
+        print(__doc__)
+        return 2
+
+    import MySQLdb
+    from db.pool import connect_kwargs, mysql_config
+
+    conn = MySQLdb.connect(**connect_kwargs(mysql_config()))
+    try:
+        failures = check(conn, queries)
+    finally:
+        conn.close()
+    print(f"{'❌' if failures else '✔'} {len(queries)} queries checked, {failures} full scan(s)")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
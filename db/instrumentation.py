@@ -0,0 +1,79 @@
+"""
+SQL Timing
+Wraps MySQLdb connections so every statement and commit is timed into
+ml.metrics (db/pool.py hands out wrapped connections). Call sites keep
+using mysql.connection.cursor().
+
+Statements are labelled by verb and table ("SELECT patients"), so the
+label set stays small no matter how many distinct queries there are.
+"""
+
+import re
+import time
+from functools import lru_cache
+
+from ml.metrics import REGISTRY
+
+SQL_SECONDS = REGISTRY.histogram(
+    "neurosense_sql_seconds", "Time per SQL statement", labels=("statement",))
+SQL_ERRORS = REGISTRY.counter(
+    "neurosense_sql_errors_total", "SQL statements that raised", labels=("statement",))
+
+_TABLE = re.compile(r"\b(?:FROM|INTO|UPDATE|JOIN)\s+`?(\w+)", re.IGNORECASE)
+
+
+@lru_cache(maxsize=1024)
+def statement_label(query):
+    """'SELECT patients' style label for a query string"""
+    words = query.split(None, 1)
+    verb = words[0].upper() if words else "?"
+    table = _TABLE.search(query)
+    return f"{verb} {table.group(1)}" if table else verb
+
+
+class TimedCursor:
+    """DB-API cursor proxy that times execute / executemany"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, query, args=None):
+        return self._timed(self._cursor.execute, query, args)
+
+    def executemany(self, query, args):
+        return self._timed(self._cursor.executemany, query, args)
+
+    def _timed(self, fn, query, args):
+        label = statement_label(query if isinstance(query, str) else query.decode())
+        start = time.perf_counter()
+        try:
+            return fn(query, args)
+        except Exception:
+            SQL_ERRORS.inc(statement=label)
+            raise
+        finally:
+            SQL_SECONDS.observe(time.perf_counter() - start, statement=label)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class TimedConnection:
+    """Connection proxy handing out TimedCursors and timing commits"""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self, *args, **kwargs):
+        return TimedCursor(self._conn.cursor(*args, **kwargs))
+
+    def commit(self):
+        with SQL_SECONDS.time(statement="COMMIT"):
+            return self._conn.commit()
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
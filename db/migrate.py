@@ -0,0 +1,141 @@
+"""
+Schema Migrations
+Applies migrations/NNN_name.sql files in order and records each one in a
+`schema_migrations` table, so every database knows which version it is at.
+
+    python -m db.migrate            # apply pending migrations
+    python -m db.migrate status     # list applied / pending
+
+MySQL commits DDL implicitly, so a migration is not atomic: statements
+run one by one and the migration is recorded only after the last one.
+If a statement fails, fix the migration file or the database by hand and
+re-run; already-applied migrations are skipped, and one whose file was
+edited after it ran is reported (checksum mismatch) instead of re-run.
+"""
+
+import hashlib
+import os
+import re
+import sys
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                              "migrations")
+
+CREATE_TABLE = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INT PRIMARY KEY,
+        name VARCHAR(255) NOT NULL,
+        checksum CHAR(40) NOT NULL,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+_FILENAME = re.compile(r"^(\d+)_(\w+)\.sql$")
+
+
+# -----------------------------
+# MIGRATION FILES
+# -----------------------------
+def discover(path=MIGRATIONS_DIR):
+    """[(version, name, filename)] sorted by version"""
+    found = []
+    for filename in os.listdir(path):
+        m = _FILENAME.match(filename)
+        if m:
+            found.append((int(m.group(1)), m.group(2), os.path.join(path, filename)))
+    found.sort()
+    versions = [v for v, _, _ in found]
+    if len(versions) != len(set(versions)):
+        raise ValueError(f"Duplicate migration version in {path}")
+    return found
+
+
+def checksum(sql):
+    return hashlib.sha1(sql.encode()).hexdigest()
+
+
+def statements(sql):
+    """Split a migration into statements (no ';' inside literals, please)"""
+    lines = [line for line in sql.splitlines() if not line.strip().startswith("--")]
+    return [s.strip() for s in "\n".join(lines).split(";") if s.strip()]
+
+
+# -----------------------------
+# DATABASE
+# -----------------------------
+def _value(row, key, index):
+    return row[key] if isinstance(row, dict) else row[index]
+
+
+def applied(conn):
+    """{version: checksum} of migrations already run"""
+    cur = conn.cursor()
+    try:
+        cur.execute(CREATE_TABLE)
+        cur.execute("SELECT version, checksum FROM schema_migrations")
+        return {int(_value(r, "version", 0)): _value(r, "checksum", 1) for r in cur.fetchall()}
+    finally:
+        cur.close()
+
+
+def migrate(conn, path=MIGRATIONS_DIR):
+    """Apply pending migrations in order; returns the versions applied"""
+    done = applied(conn)
+    ran = []
+    for version, name, filename in discover(path):
+        with open(filename) as f:
+            sql = f.read()
+        if version in done:
+            if done[version] != checksum(sql):
+                print(f"⚠️ Migration {version:03d}_{name} changed after it was applied")
+            continue
+
+        print(f"▶ Applying {version:03d}_{name}")
+        cur = conn.cursor()
+        try:
+            for stmt in statements(sql):
+                try:
+                    cur.execute(stmt)
+                except Exception:
+                    print(f"❌ Migration {version:03d}_{name} failed on:\n{stmt}")
+                    raise
+            cur.execute("INSERT INTO schema_migrations (version, name, checksum) VALUES (%s,%s,%s)",
+                        (version, name, checksum(sql)))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
+        ran.append(version)
+    return ran
+
+
+def status(conn, path=MIGRATIONS_DIR):
+    done = applied(conn)
+    for version, name, _ in discover(path):
+        print(f"{'✔' if version in done else '·'} {version:03d}_{name}")
+
+
+def main(argv):
+    if argv not in ([], ["status"]):
+        print(__doc__)
+        return 2
+    import MySQLdb
+    from app import app
+    from db.pool import connect_kwargs
+
+    conn = MySQLdb.connect(**connect_kwargs(app.config))
+    try:
+        if argv == ["status"]:
+            status(conn)
+        else:
+            ran = migrate(conn)
+            print(f"✔ {len(ran)} migration(s) applied" if ran else "✔ Schema is up to date")
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
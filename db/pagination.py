@@ -0,0 +1,116 @@
+"""
+Keyset Pagination
+Lists are read one page at a time by seeking past the last row of the
+previous page instead of using OFFSET, so page N costs the same as page 1
+and rows inserted meanwhile never shift or duplicate a page.
+
+    PATIENTS = PagedQuery("patients", "SELECT id, full_name FROM patients",
+                          order=("full_name", "id"))
+    rows, next_token = PATIENTS.page(cur, after=request.args.get("after"))
+
+The page token is an opaque URL-safe string holding the sort key of the
+last row; it names its query, so a token from another list is rejected.
+The ORDER BY must end in a unique column (id) to make the key total.
+"""
+
+import base64
+import binascii
+import json
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class BadPageToken(ValueError):
+    pass
+
+
+def page_size(value, default=PAGE_SIZE):
+    """?limit= value clamped to 1..MAX_PAGE_SIZE"""
+    try:
+        return max(1, min(int(value), MAX_PAGE_SIZE))
+    except (TypeError, ValueError):
+        return default
+
+
+class PagedQuery:
+    """
+    A SELECT paged by keyset on `order` (all ascending or all descending).
+    `where` conditions always apply; `filters` maps a keyword to an optional
+    condition that is added when page() gets a value for it (a tuple value
+    binds several %s). page(params=...) binds any %s inside `select` itself.
+    """
+
+    def __init__(self, name, select, order, where=(), filters=None, descending=False):
+        self.name = name
+        self.select = " ".join(select.split())
+        self.order = tuple(order)
+        self.keys = tuple(col.split(".")[-1] for col in self.order)
+        self.where = tuple(where)
+        self.filters = dict(filters or {})
+        self.descending = descending
+
+    # -----------------------------
+    # TOKENS
+    # -----------------------------
+    def token(self, row):
+        payload = json.dumps([self.name, [row[k] for k in self.keys]], default=str)
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+    def decode(self, token):
+        try:
+            raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+            name, values = json.loads(raw)
+        except (binascii.Error, ValueError, TypeError) as e:
+            raise BadPageToken(f"Malformed page token: {e}")
+        if name != self.name or not isinstance(values, list) or len(values) != len(self.order):
+            raise BadPageToken("Page token belongs to another list")
+        return values
+
+    # -----------------------------
+    # SQL
+    # -----------------------------
+    def _seek(self):
+        """(a, b) > (x, y) spelled out so every MySQL version can range-scan it"""
+        op = "<" if self.descending else ">"
+        terms = []
+        for i, col in enumerate(self.order):
+            equal = [f"{c} = %s" for c in self.order[:i]]
+            terms.append("(" + " AND ".join(equal + [f"{col} {op} %s"]) + ")")
+        return "(" + " OR ".join(terms) + ")"
+
+    def _seek_params(self, values):
+        params = []
+        for i in range(len(values)):
+            params += values[:i + 1]
+        return params
+
+    def sql(self, filters=(), after=False):
+        conditions = list(self.where) + [self.filters[f] for f in filters]
+        if after:
+            conditions.append(self._seek())
+        query = self.select
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        direction = " DESC" if self.descending else ""
+        query += " ORDER BY " + ", ".join(col + direction for col in self.order)
+        return query + " LIMIT %s"
+
+    def fullest(self):
+        """The query with every filter and the seek applied (for EXPLAIN)"""
+        return self.sql(self.filters, after=True)
+
+    def page(self, cur, after=None, limit=PAGE_SIZE, params=(), **filters):
+        """(rows, next_token); next_token is None on the last page"""
+        active = [f for f in self.filters if filters.get(f) not in (None, "")]
+        params = list(params)
+        for f in active:
+            value = filters[f]
+            params += list(value) if isinstance(value, tuple) else [value]
+        if after:
+            params += self._seek_params(self.decode(after))
+
+        cur.execute(self.sql(active, after=bool(after)), params + [limit + 1])
+        rows = list(cur.fetchall())
+        next_token = self.token(rows[limit - 1]) if len(rows) > limit else None
+        return rows[:limit], next_token
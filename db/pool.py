@@ -0,0 +1,244 @@
+"""
+MySQL Connection Pool
+Replaces flask_mysqldb's connect-per-request with a bounded pool of
+MySQLdb connections. Handlers keep calling mysql.connection.cursor():
+the first access in a request borrows a connection, teardown returns it.
+
+    mysql = PooledMySQL(app)
+
+Config (app.config):
+    MYSQL_POOL_SIZE        max open connections per process (default 10)
+    MYSQL_POOL_TIMEOUT     seconds to wait for a free connection (default 5)
+    MYSQL_POOL_PING_AFTER  ping connections idle longer than this (default 1s)
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from db.instrumentation import TimedConnection
+from ml.metrics import REGISTRY
+
+POOL_WAIT_SECONDS = REGISTRY.histogram(
+    "neurosense_db_pool_wait_seconds", "Time spent borrowing a connection")
+POOL_EVENTS = REGISTRY.counter(
+    "neurosense_db_pool_events_total", "Pool events (created, discarded, waited, timeout)",
+    labels=("event",))
+
+
+class PoolTimeout(Exception):
+    """No connection became free within the pool timeout"""
+
+
+# the deployment's database; each setting can be overridden from the environment
+MYSQL_DEFAULTS = {
+    "MYSQL_HOST": "localhost",
+    "MYSQL_USER": "hallibaz_neurosense",
+    "MYSQL_PASSWORD": "neurosense@123",
+    "MYSQL_DB": "hallibaz_neurosense",
+}
+
+
+def mysql_config(environ=None):
+    """
+    MYSQL_* settings: MYSQL_DEFAULTS overridden by the environment (also
+    MYSQL_PORT, MYSQL_UNIX_SOCKET). app.py and the command-line jobs read
+    the same settings, so a job does not have to import the app.
+    """
+    environ = os.environ if environ is None else environ
+    config = {key: environ.get(key, default) for key, default in MYSQL_DEFAULTS.items()}
+    for key in ("MYSQL_PORT", "MYSQL_UNIX_SOCKET"):
+        if environ.get(key):
+            config[key] = environ[key]
+    return config
+
+
+def connect_kwargs(config):
+    """MySQLdb.connect() arguments from flask_mysqldb-style MYSQL_* config"""
+    kwargs = dict(
+        host=config.get("MYSQL_HOST", "localhost"),
+        user=config.get("MYSQL_USER"),
+        passwd=config.get("MYSQL_PASSWORD"),
+        db=config.get("MYSQL_DB"),
+        port=int(config.get("MYSQL_PORT", 3306)),
+        charset=config.get("MYSQL_CHARSET", "utf8mb4"),
+        autocommit=False,
+    )
+    if config.get("MYSQL_UNIX_SOCKET"):
+        kwargs["unix_socket"] = config["MYSQL_UNIX_SOCKET"]
+    if config.get("MYSQL_CURSORCLASS"):
+        from MySQLdb import cursors
+        kwargs["cursorclass"] = getattr(cursors, config["MYSQL_CURSORCLASS"])
+    return kwargs
+
+
+# -----------------------------
+# POOL
+# -----------------------------
+class ConnectionPool:
+    """
+    At most `size` connections; idle ones are reused most-recently-used
+    first. A borrowed connection idle for more than `ping_after` seconds
+    is pinged first and replaced if the server dropped it.
+    """
+
+    def __init__(self, connect, size=10, timeout=5.0, ping_after=1.0):
+        self.connect = connect
+        self.size = size
+        self.timeout = timeout
+        self.ping_after = ping_after
+        self._idle = deque()           # (conn, returned_at)
+        self._open = 0
+        self._cond = threading.Condition()
+        self._pid = os.getpid()
+
+    def acquire(self):
+        self._check_fork()
+        start = time.perf_counter()
+        deadline = start + self.timeout
+        waited = False
+        with self._cond:
+            while not self._idle and self._open >= self.size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    POOL_EVENTS.inc(event="timeout")
+                    raise PoolTimeout(f"No MySQL connection free after {self.timeout}s "
+                                      f"(pool size {self.size})")
+                waited = True
+                self._cond.wait(remaining)
+            if self._idle:
+                conn, returned = self._idle.pop()
+            else:
+                conn, returned = None, None
+                self._open += 1
+
+        if waited:
+            POOL_EVENTS.inc(event="waited")
+        try:
+            if conn is not None and time.monotonic() - returned > self.ping_after:
+                conn = self._alive(conn)
+            if conn is None:
+                conn = self.connect()
+                POOL_EVENTS.inc(event="created")
+        except Exception:
+            self._forget()
+            raise
+        POOL_WAIT_SECONDS.observe(time.perf_counter() - start)
+        return conn
+
+    def release(self, conn):
+        """Return a connection; its open transaction (if any) is rolled back"""
+        if os.getpid() != self._pid:
+            return
+        try:
+            conn.rollback()
+        except Exception:
+            self._discard(conn)
+            return
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def _alive(self, conn):
+        try:
+            conn.ping()
+            return conn
+        except Exception:
+            self._close(conn)
+            POOL_EVENTS.inc(event="discarded")
+            return None
+
+    def _discard(self, conn):
+        self._close(conn)
+        POOL_EVENTS.inc(event="discarded")
+        self._forget()
+
+    def _forget(self):
+        with self._cond:
+            self._open -= 1
+            self._cond.notify()
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _check_fork(self):
+        # sockets inherited from the parent belong to it; start empty
+        if os.getpid() != self._pid:
+            with self._cond:
+                if os.getpid() != self._pid:
+                    self._idle.clear()
+                    self._open = 0
+                    self._pid = os.getpid()
+
+    def stats(self):
+        with self._cond:
+            return {"open": self._open, "idle": len(self._idle),
+                    "in_use": self._open - len(self._idle), "size": self.size}
+
+    def close(self):
+        with self._cond:
+            while self._idle:
+                self._close(self._idle.pop()[0])
+                self._open -= 1
+
+
+# -----------------------------
+# FLASK INTEGRATION
+# -----------------------------
+class PooledMySQL:
+    """Drop-in for flask_mysqldb.MySQL backed by a ConnectionPool"""
+
+    def __init__(self, app=None):
+        self.pool = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        import MySQLdb
+
+        kwargs = connect_kwargs(app.config)
+        self.pool = ConnectionPool(
+            lambda: MySQLdb.connect(**kwargs),
+            size=int(app.config.get("MYSQL_POOL_SIZE", 10)),
+            timeout=float(app.config.get("MYSQL_POOL_TIMEOUT", 5)),
+            ping_after=float(app.config.get("MYSQL_POOL_PING_AFTER", 1)),
+        )
+        app.teardown_appcontext(self.teardown)
+        REGISTRY.gauge_func(
+            "neurosense_db_pool_connections", "Pool connections by state",
+            lambda: {(k,): v for k, v in self.pool.stats().items()}, labels=("state",))
+
+    @property
+    def connection(self):
+        # Flask only here: the pool and mysql_config() load without it (CLI jobs)
+        from flask import g
+
+        conn = g.get("mysql_conn")
+        if conn is None:
+            conn = g.mysql_conn = TimedConnection(self.pool.acquire())
+        return conn
+
+    @contextmanager
+    def borrow(self):
+        """
+        A connection of its own for work that outlives the view function,
+        e.g. a streamed response reading through a server-side cursor.
+        """
+        conn = self.pool.acquire()
+        try:
+            yield TimedConnection(conn)
+        finally:
+            self.pool.release(conn)
+
+    def teardown(self, exception):
+        from flask import g
+
+        conn = g.pop("mysql_conn", None)
+        if conn is not None:
+            self.pool.release(conn._conn)
@@ -0,0 +1,90 @@
+"""
+Patient Search
+Replaces `full_name LIKE '%x%' OR email LIKE '%x%'` (a full scan of
+patients per keystroke) with index-backed lookups:
+
+    - text       ranked MATCH against the n-gram FULLTEXT index on
+                 (full_name, email) from migrations/004; each word must
+                 appear as a substring, best matches first
+    - "x"        a single character is shorter than an n-gram, so it is a
+                 name-prefix range scan instead
+    - "a@b..."   anything with an @ is an email-prefix range scan on the
+                 unique email index
+    - "@b..."    a leading @ searches the domain: prefix range scan on the
+                 generated email_domain column from migrations/006
+
+Every kind pages by keyset. Ranked pages seek on (score, id), with the
+score rounded to 6 places so the value in the token compares equal to
+the one MySQL recomputes for the next page.
+
+InnoDB maintains the FULLTEXT index itself, so signup, add-patient and
+profile updates need no extra code to keep search current.
+"""
+
+from db.pagination import PagedQuery, PAGE_SIZE
+
+# innodb ngram_token_size (MySQL default); shorter terms can't hit the index
+NGRAM_TOKEN_SIZE = 2
+
+# best matches first; the derived table makes `score` a column the page
+# seek can compare (binds: the boolean query twice)
+RANKED = PagedQuery(
+    "search_ranked",
+    """SELECT * FROM (
+        SELECT id, full_name, email, age, gender,
+               ROUND(MATCH(full_name, email) AGAINST (%s IN BOOLEAN MODE), 6) AS score
+        FROM patients
+        WHERE MATCH(full_name, email) AGAINST (%s IN BOOLEAN MODE)
+    ) AS ranked""",
+    order=("score", "id"),
+    descending=True)
+
+NAME_PREFIX = PagedQuery(
+    "search_name_prefix",
+    "SELECT id, full_name, email, age, gender FROM patients",
+    order=("full_name", "id"),
+    filters={"prefix": "full_name LIKE %s"})
+
+EMAIL_PREFIX = PagedQuery(
+    "search_email_prefix",
+    "SELECT id, full_name, email, age, gender FROM patients",
+    order=("email", "id"),
+    filters={"prefix": "email LIKE %s"})
+
+EMAIL_DOMAIN = PagedQuery(
+    "search_email_domain",
+    "SELECT id, full_name, email, age, gender FROM patients",
+    order=("email_domain", "id"),
+    filters={"prefix": "email_domain LIKE %s"})
+
+
+def like_prefix(text):
+    """'x%' pattern with LIKE wildcards in `text` escaped"""
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+def boolean_query(text):
+    """
+    BOOLEAN MODE query requiring every word as a phrase (+"word"), which the
+    ngram parser matches as a substring. Words shorter than an n-gram are
+    dropped; returns "" when nothing searchable is left.
+    """
+    words = [w.replace('"', "") for w in text.split()]
+    words = [w for w in words if len(w) >= NGRAM_TOKEN_SIZE]
+    return " ".join(f'+"{w}"' for w in words)
+
+
+def search_patients(cur, text, after=None, limit=PAGE_SIZE):
+    """(rows, next_token) for a roster search; next_token is None on the last page"""
+    text = text.strip()
+    if text.startswith("@"):
+        return EMAIL_DOMAIN.page(cur, after=after, limit=limit,
+                                 prefix=like_prefix(text.lstrip("@")))
+    if "@" in text:
+        return EMAIL_PREFIX.page(cur, after=after, limit=limit, prefix=like_prefix(text))
+
+    query = boolean_query(text)
+    if not query:
+        return NAME_PREFIX.page(cur, after=after, limit=limit, prefix=like_prefix(text))
+
+    return RANKED.page(cur, after=after, limit=limit, params=(query, query))
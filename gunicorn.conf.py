@@ -0,0 +1,21 @@
+"""
+Gunicorn config with pre-fork model sharing.
+
+    NEUROSENSE_XGB_BACKEND=compiled NEUROSENSE_TF_BACKEND=numpy \
+        gunicorn -c gunicorn.conf.py app:app
+
+Models are loaded once in the master (see ml/prefork.py) and inherited
+read-only by every worker.
+"""
+
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("GUNICORN_WORKERS", 4))
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+preload_app = True
+
+
+def on_starting(server):
+    from ml.prefork import preload_for_fork
+    preload_for_fork()
@@ -0,0 +1,191 @@
+"""
+Bulk Re-Scoring of Stored Assessments
+Streams assessments.form_data through a server-side cursor in chunks,
+re-scores each chunk with one batched inference, and writes alz / park /
+dem / diag back in one transaction per chunk. Progress is checkpointed
+after every commit, so an interrupted run resumes where it stopped.
+
+    python -m jobs.rescore_assessments
+    python -m jobs.rescore_assessments --chunk-size 2000 --restart
+    NEUROSENSE_XGB_BACKEND=compiled python -m jobs.rescore_assessments
+
+Database settings come from the MYSQL_* environment variables, with the
+app's defaults (db.pool.mysql_config); the Flask app is not imported.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from ml.features import FEATURE_SPEC
+from ml.ml_manager import MLModelManager
+
+READ_SQL = """
+    SELECT id, patient_id, form_data
+    FROM assessments
+    WHERE id > %s
+    ORDER BY id
+"""
+
+# an assessment deleted while the job runs matches no row: it is skipped,
+# never re-created
+WRITE_SQL = "UPDATE assessments SET alz = %s, park = %s, dem = %s, diag = %s WHERE id = %s"
+
+
+# -----------------------------
+# CHECKPOINT
+# -----------------------------
+def load_checkpoint(path, model_version):
+    """last_id to resume after (0 = start), ignoring checkpoints of other models"""
+    if not os.path.exists(path):
+        return 0, 0
+    with open(path) as f:
+        state = json.load(f)
+    if state.get("model_version") != model_version:
+        print(f"⚠️ Checkpoint {path} is for model version {state.get('model_version')}, starting over")
+        return 0, 0
+    print(f"↻ Resuming after assessment {state['last_id']} ({state['rows']} rows already done)")
+    return state["last_id"], state["rows"]
+
+
+def save_checkpoint(path, model_version, last_id, rows):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({"model_version": model_version, "last_id": last_id, "rows": rows,
+                   "updated": time.strftime("%Y-%m-%dT%H:%M:%S")}, f)
+    os.replace(tmp, path)
+
+
+# -----------------------------
+# SCORING
+# -----------------------------
+def _results(ctx):
+    return list(zip(ctx.risks("alzheimers"), ctx.risks("parkinsons"),
+                    ctx.risks("dementia"), ctx.diagnostics()))
+
+
+def score_chunk(manager, rows):
+    """(alz, park, dem, diag, id) tuples for a chunk; rows that cannot be scored are skipped"""
+    forms, keep, failed = [], [], []
+    for row_id, patient_id, form_data in rows:
+        try:
+            # stored forms hold numbers as strings ("72"); score them as numbers
+            form = FEATURE_SPEC.coerce(json.loads(form_data) if form_data else {})
+            manager._feature_row(form)
+        except Exception as e:
+            failed.append((row_id, str(e)))
+            continue
+        forms.append(form)
+        keep.append(row_id)
+
+    try:
+        results = list(zip(keep, _results(manager.new_context(forms))))
+    except Exception:
+        # results are built for the whole chunk at once, so one bad form
+        # fails them all: score row by row to find and skip it
+        results = []
+        for row_id, form in zip(keep, forms):
+            try:
+                results.append((row_id, _results(manager.new_context([form]))[0]))
+            except Exception as e:
+                failed.append((row_id, str(e)))
+
+    params = [
+        (*(json.dumps(r.__dict__) for r in scored), row_id)
+        for row_id, scored in results
+    ]
+    return params, failed
+
+
+def write_chunk(cur, params):
+    """Write a chunk's scores; ids that no longer exist are skipped"""
+    cur.executemany(WRITE_SQL, params)
+
+
+# -----------------------------
+# JOB
+# -----------------------------
+def connect(cursorclass):
+    import MySQLdb
+    from db.pool import connect_kwargs, mysql_config
+
+    return MySQLdb.connect(**{**connect_kwargs(mysql_config()), "cursorclass": cursorclass})
+
+
+def run(chunk_size=1000, checkpoint=".rescore_checkpoint.json", restart=False, manager=None):
+    from MySQLdb.cursors import Cursor, SSCursor
+
+    manager = manager or MLModelManager(cache=None)
+    manager.preload()
+    version = manager.model_version
+
+    last_id, done = (0, 0) if restart else load_checkpoint(checkpoint, version)
+
+    # reads stream from one connection, writes commit on another
+    reader = connect(SSCursor)
+    writer = connect(Cursor)
+    try:
+        count = writer.cursor()
+        count.execute("SELECT COUNT(*) FROM assessments WHERE id > %s", (last_id,))
+        remaining = count.fetchone()[0]
+        count.close()
+        print(f"▶ Re-scoring {remaining} assessments with model version {version}")
+
+        rcur = reader.cursor()
+        # the server waits on us while we score; don't let it drop the stream
+        rcur.execute("SET SESSION net_write_timeout = 3600")
+        rcur.execute(READ_SQL, (last_id,))
+
+        wcur = writer.cursor()
+        start, scored, failures = time.perf_counter(), 0, 0
+        while True:
+            rows = rcur.fetchmany(chunk_size)
+            if not rows:
+                break
+
+            params, failed = score_chunk(manager, rows)
+            try:
+                if params:
+                    write_chunk(wcur, params)
+                writer.commit()
+            except Exception:
+                writer.rollback()
+                raise
+
+            last_id = rows[-1][0]
+            scored += len(params)
+            failures += len(failed)
+            done += len(rows)
+            save_checkpoint(checkpoint, version, last_id, done)
+
+            for row_id, error in failed:
+                print(f"⚠️ Skipped assessment {row_id}: {error}")
+            elapsed = time.perf_counter() - start
+            rate = scored / elapsed if elapsed else 0.0
+            left = max(remaining - scored - failures, 0)
+            eta = left / rate if rate else 0.0
+            print(f"✔ {scored + failures}/{remaining} (up to id {last_id}) "
+                  f"{rate:,.0f} rows/s, ETA {eta:,.0f}s")
+
+        rcur.close()
+        print(f"✔ Done: {scored} re-scored, {failures} skipped in {time.perf_counter() - start:.1f}s")
+        return scored, failures
+    finally:
+        reader.close()
+        writer.close()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--chunk-size", type=int, default=1000)
+    ap.add_argument("--checkpoint", default=".rescore_checkpoint.json")
+    ap.add_argument("--restart", action="store_true", help="ignore an existing checkpoint")
+    args = ap.parse_args(argv)
+    scored, failures = run(args.chunk_size, args.checkpoint, args.restart)
+    return 1 if failures and not scored else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+-- Baseline schema (as previously documented in README.md).
+-- IF NOT EXISTS lets databases created by hand adopt the migration history.
+
+CREATE TABLE IF NOT EXISTS patients (
+    id INT PRIMARY KEY AUTO_INCREMENT,
+    full_name VARCHAR(255),
+    email VARCHAR(255) UNIQUE,
+    password VARCHAR(255),
+    phone VARCHAR(20),
+    age INT,
+    gender ENUM('Male', 'Female', 'Other'),
+    blood_type VARCHAR(10),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS doctors (
+    id INT PRIMARY KEY AUTO_INCREMENT,
+    name VARCHAR(255),
+    email VARCHAR(255) UNIQUE,
+    password VARCHAR(255),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS assessments (
+    id INT PRIMARY KEY AUTO_INCREMENT,
+    patient_id INT NOT NULL,
+    form_data LONGTEXT,
+    alz LONGTEXT,
+    park LONGTEXT,
+    dem LONGTEXT,
+    diag LONGTEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (patient_id) REFERENCES patients(id)
+);
+
+CREATE TABLE IF NOT EXISTS diagnostic_reports (
+    id INT PRIMARY KEY AUTO_INCREMENT,
+    patient_id INT NOT NULL,
+    doctor_id INT,
+    primary_diagnosis VARCHAR(255),
+    diagnosis_confidence FLOAT,
+    secondary_diagnoses LONGTEXT,
+    disease_probabilities LONGTEXT,
+    key_findings LONGTEXT,
+    recommendations LONGTEXT,
+    mmse_score INT,
+    cdr_score FLOAT,
+    csf_tau_level FLOAT,
+    csf_abeta42_level FLOAT,
+    apoe_status VARCHAR(10),
+    mri_file_path VARCHAR(512),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (patient_id) REFERENCES patients(id),
+    FOREIGN KEY (doctor_id) REFERENCES doctors(id)
+);
+
+CREATE TABLE IF NOT EXISTS health_events (
+    id INT PRIMARY KEY AUTO_INCREMENT,
+    patient_id INT NOT NULL,
+    event_type ENUM('diagnosis', 'intervention', 'medication', 'assessment'),
+    title VARCHAR(255),
+    description LONGTEXT,
+    severity ENUM('low', 'moderate', 'high'),
+    disease VARCHAR(255),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (patient_id) REFERENCES patients(id)
+);
+
+CREATE TABLE IF NOT EXISTS audit_log (
+    id INT PRIMARY KEY AUTO_INCREMENT,
+    user_id INT,
+    action VARCHAR(50),
+    table_name VARCHAR(100),
+    record_id INT,
+    changes LONGTEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,7 @@
+-- Rollup table for the doctor dashboard totals (db/counters.py).
+-- Fill it afterwards with: python -m db.counters reconcile
+
+CREATE TABLE IF NOT EXISTS dashboard_counters (
+    name VARCHAR(64) PRIMARY KEY,
+    value BIGINT NOT NULL DEFAULT 0
+);
@@ -0,0 +1,19 @@
+-- Indexes for the queries in app.py (checked by python -m db.explain_check).
+
+-- patient history pages: WHERE patient_id = ? ORDER BY created_at DESC
+CREATE INDEX idx_assessments_patient_created ON assessments (patient_id, created_at);
+CREATE INDEX idx_health_events_patient_created ON health_events (patient_id, created_at);
+CREATE INDEX idx_reports_patient_created ON diagnostic_reports (patient_id, created_at);
+
+-- intervention list: WHERE event_type = ? ORDER BY created_at DESC
+CREATE INDEX idx_health_events_type_created ON health_events (event_type, created_at);
+
+-- dashboard recent activity: ORDER BY created_at DESC LIMIT 5
+CREATE INDEX idx_health_events_created ON health_events (created_at);
+
+-- counter reconciliation: severity = 'high', diagnosis_confidence >= 0.7
+CREATE INDEX idx_health_events_severity ON health_events (severity);
+CREATE INDEX idx_reports_confidence ON diagnostic_reports (diagnosis_confidence);
+
+-- patient pickers: WHERE full_name != '' ORDER BY full_name
+CREATE INDEX idx_patients_full_name ON patients (full_name);
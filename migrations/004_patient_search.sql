@@ -0,0 +1,5 @@
+-- Ranked patient search (db/search.py): n-gram FULLTEXT over name and email,
+-- so substring matches no longer need a leading-wildcard LIKE scan.
+-- The ngram parser splits text into ngram_token_size (default 2) character tokens.
+
+ALTER TABLE patients ADD FULLTEXT INDEX ft_patients_search (full_name, email) WITH PARSER ngram;
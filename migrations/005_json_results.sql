@@ -0,0 +1,40 @@
+-- Assessment and report results as native JSON instead of LONGTEXT blobs,
+-- with the two fields every list reads pulled out into generated columns.
+-- The STORED generated columns are computed for existing rows by the ALTER
+-- itself (the backfill); afterwards MySQL keeps them in sync on every write.
+-- Both ALTERs rebuild their table: run this in a quiet window on big tables.
+
+-- text that is not valid JSON would fail the type change; keep it as a JSON string
+UPDATE assessments SET diag = JSON_QUOTE(diag) WHERE diag IS NOT NULL AND NOT JSON_VALID(diag);
+UPDATE assessments SET alz = JSON_QUOTE(alz) WHERE alz IS NOT NULL AND NOT JSON_VALID(alz);
+UPDATE assessments SET park = JSON_QUOTE(park) WHERE park IS NOT NULL AND NOT JSON_VALID(park);
+UPDATE assessments SET dem = JSON_QUOTE(dem) WHERE dem IS NOT NULL AND NOT JSON_VALID(dem);
+
+ALTER TABLE assessments
+    MODIFY alz JSON,
+    MODIFY park JSON,
+    MODIFY dem JSON,
+    MODIFY diag JSON,
+    ADD COLUMN primary_diagnosis VARCHAR(255)
+        GENERATED ALWAYS AS (diag->>'$.primary_diagnosis') STORED,
+    ADD COLUMN diagnosis_confidence DOUBLE
+        GENERATED ALWAYS AS (
+            IF(JSON_TYPE(diag->'$.diagnosis_confidence') IN ('INTEGER', 'DOUBLE', 'DECIMAL'),
+               diag->>'$.diagnosis_confidence' + 0, NULL)) STORED,
+    ADD INDEX idx_assessments_diagnosis (primary_diagnosis, diagnosis_confidence);
+
+UPDATE diagnostic_reports SET secondary_diagnoses = JSON_QUOTE(secondary_diagnoses)
+    WHERE secondary_diagnoses IS NOT NULL AND NOT JSON_VALID(secondary_diagnoses);
+UPDATE diagnostic_reports SET disease_probabilities = JSON_QUOTE(disease_probabilities)
+    WHERE disease_probabilities IS NOT NULL AND NOT JSON_VALID(disease_probabilities);
+UPDATE diagnostic_reports SET key_findings = JSON_QUOTE(key_findings)
+    WHERE key_findings IS NOT NULL AND NOT JSON_VALID(key_findings);
+UPDATE diagnostic_reports SET recommendations = JSON_QUOTE(recommendations)
+    WHERE recommendations IS NOT NULL AND NOT JSON_VALID(recommendations);
+
+ALTER TABLE diagnostic_reports
+    MODIFY secondary_diagnoses JSON,
+    MODIFY disease_probabilities JSON,
+    MODIFY key_findings JSON,
+    MODIFY recommendations JSON,
+    ADD INDEX idx_reports_diagnosis (primary_diagnosis, diagnosis_confidence);
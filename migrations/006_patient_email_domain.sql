@@ -0,0 +1,8 @@
+-- Domain searches ("@gmail.com", db/search.py) as an index range scan instead
+-- of a leading-wildcard LIKE on email. A VIRTUAL generated column is added
+-- without rebuilding the table; only its index is built and stored.
+
+ALTER TABLE patients
+    ADD COLUMN email_domain VARCHAR(255)
+        GENERATED ALWAYS AS (SUBSTRING_INDEX(email, '@', -1)) VIRTUAL,
+    ADD INDEX idx_patients_email_domain (email_domain);
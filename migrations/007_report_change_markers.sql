@@ -0,0 +1,16 @@
+-- Change markers for the report cache (reports/cache.py). A rescore or any
+-- other in-place edit rewrites a row without changing the row count or the
+-- latest id, so the cache key also takes MAX(updated_at). MySQL moves the
+-- column on every UPDATE that changes a value; microsecond precision keeps
+-- two edits in the same second apart. Existing rows start at the migration
+-- time, which re-renders every cached report once.
+
+ALTER TABLE assessments
+    ADD COLUMN updated_at TIMESTAMP(6) NOT NULL
+        DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6),
+    ADD INDEX idx_assessments_patient_updated (patient_id, updated_at);
+
+ALTER TABLE health_events
+    ADD COLUMN updated_at TIMESTAMP(6) NOT NULL
+        DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6),
+    ADD INDEX idx_health_events_patient_updated (patient_id, updated_at);
@@ -0,0 +1,17 @@
+-- Fill dashboard_counters from the tables they count, so a fresh deploy
+-- shows real totals without running python -m db.counters reconcile first.
+-- The WHERE clauses are COUNTERS in db/counters.py; keep them in step.
+-- A row written while this runs can be miscounted: run it in a quiet
+-- window, or reconcile afterwards.
+
+INSERT INTO dashboard_counters (name, value)
+SELECT name, n FROM (
+    SELECT 'patients' AS name, COUNT(*) AS n FROM patients
+    UNION ALL
+    SELECT 'reports_high', COUNT(*) FROM diagnostic_reports WHERE diagnosis_confidence >= 0.695
+    UNION ALL
+    SELECT 'reports_pending', COUNT(*) FROM diagnostic_reports WHERE diagnosis_confidence < 0.695
+    UNION ALL
+    SELECT 'alerts', COUNT(*) FROM health_events WHERE severity = 'high'
+) AS counts
+ON DUPLICATE KEY UPDATE value = counts.n;
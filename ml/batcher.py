@@ -0,0 +1,200 @@
+"""
+Request-Coalescing Micro-Batcher
+Collects concurrent predict_* calls for a short window and runs them as
+one batched inference on MLModelManager; every caller gets its own result.
+
+Enable with NEUROSENSE_MICROBATCH_WINDOW_MS (e.g. 2) and optionally
+NEUROSENSE_MICROBATCH_MAX (e.g. 64); see get_predictor() in ml_manager.
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from ml.metrics import REGISTRY
+
+
+SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256]
+WAIT_BUCKETS = [0.0005, 0.001, 0.002, 0.005, 0.01, 0.025, 0.05, 0.1]
+
+
+# -----------------------------
+# MICRO-BATCHER
+# -----------------------------
+class _Request:
+    __slots__ = ("kind", "form", "future", "enqueued")
+
+    def __init__(self, kind, form):
+        self.kind = kind
+        self.form = form
+        self.future = Future()
+        self.enqueued = time.perf_counter()
+
+
+class MicroBatcher:
+    """
+    Drop-in front for MLModelManager. Calls block until their batch is
+    done. A batch closes after `window_ms` from its first request or when
+    it holds `max_batch` requests, whichever comes first.
+    """
+
+    KINDS = ("alzheimers", "parkinsons", "dementia", "diagnostic", "assessment")
+
+    def __init__(self, manager, window_ms=2.0, max_batch=64, max_queue=4096, timeout=30.0):
+        self.manager = manager
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self.timeout = timeout
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+        self.batch_sizes = REGISTRY.histogram(
+            "neurosense_microbatch_batch_size", "Requests per executed batch", SIZE_BUCKETS)
+        self.queue_depth = REGISTRY.histogram(
+            "neurosense_microbatch_queue_depth", "Queue depth when a batch opens", SIZE_BUCKETS)
+        self.queue_wait = REGISTRY.histogram(
+            "neurosense_microbatch_queue_wait_seconds", "Time a request waited for its batch",
+            WAIT_BUCKETS)
+        REGISTRY.gauge_func("neurosense_microbatch_queue_depth_now", "Requests waiting now",
+                            lambda: self._queue.qsize())
+
+    @classmethod
+    def from_env(cls, manager):
+        window = float(os.environ.get("NEUROSENSE_MICROBATCH_WINDOW_MS", 0))
+        if window <= 0:
+            return None
+        max_batch = int(os.environ.get("NEUROSENSE_MICROBATCH_MAX", 64))
+        return cls(manager, window_ms=window, max_batch=max_batch)
+
+    # =============================
+    # PUBLIC API (same as MLModelManager)
+    # =============================
+    def predict_alzheimers_risk(self, f):
+        return self._call("alzheimers", f)
+
+    def predict_parkinsons_risk(self, f):
+        return self._call("parkinsons", f)
+
+    def predict_dementia_risk(self, f):
+        return self._call("dementia", f)
+
+    def predict_diagnostic(self, f):
+        return self._call("diagnostic", f)
+
+    def predict_assessment(self, f):
+        return self._call("assessment", f)
+
+    def __getattr__(self, name):
+        # everything else (batch APIs, fallbacks, preload, ...) goes straight through
+        if name == "manager":
+            raise AttributeError(name)
+        return getattr(self.manager, name)
+
+    def submit(self, kind, form):
+        """Queue one prediction; returns a Future"""
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown prediction kind: {kind}")
+        self._ensure_worker()
+        req = _Request(kind, form)
+        self._queue.put(req, timeout=self.timeout)
+        return req.future
+
+    def stats(self):
+        return {
+            "queue_depth_now": self._queue.qsize(),
+            "batch_size": self.batch_sizes.snapshot(),
+            "queue_depth": self.queue_depth.snapshot(),
+            "queue_wait_seconds": self.queue_wait.snapshot(),
+        }
+
+    def _call(self, kind, form):
+        return self.submit(kind, form).result(timeout=self.timeout)
+
+    # =============================
+    # WORKER
+    # =============================
+    def _ensure_worker(self):
+        # started lazily, and again after fork (threads do not survive it)
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                if self._pid != os.getpid():
+                    self._queue = queue.Queue(maxsize=self._queue.maxsize)
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name="ml-microbatcher", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            self.queue_depth.observe(self._queue.qsize() + 1)
+            deadline = time.perf_counter() + self.window
+
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            try:
+                self._execute(batch)
+            except Exception as e:
+                # never let one batch take the worker down with it
+                print("⚠️ Micro-batch failed:", e)
+                for req in batch:
+                    if not req.future.done():
+                        req.future.set_exception(e)
+
+    def _execute(self, batch):
+        start = time.perf_counter()
+        self.batch_sizes.observe(len(batch))
+        for req in batch:
+            self.queue_wait.observe(start - req.enqueued)
+
+        # a form whose features cannot be extracted fails alone, not the batch
+        valid = []
+        for req in batch:
+            try:
+                self.manager._feature_row(req.form)
+                valid.append(req)
+            except Exception as e:
+                req.future.set_exception(e)
+        if valid:
+            self._resolve(valid)
+
+    def _resolve(self, batch):
+        """
+        Results for a batch from one context: features once, every model once.
+        Results are built for the whole batch at once, so one bad form fails
+        them all; the batch is then split in halves until the bad form is
+        alone (log N extra passes, not one per request).
+        """
+        try:
+            ctx = self.manager.new_context([r.form for r in batch])
+            results = [self._result(ctx, req.kind, i) for i, req in enumerate(batch)]
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0].future.set_exception(e)
+                return
+            half = len(batch) // 2
+            self._resolve(batch[:half])
+            self._resolve(batch[half:])
+            return
+        for req, result in zip(batch, results):
+            req.future.set_result(result)
+
+    def _result(self, ctx, kind, i):
+        if kind == "diagnostic":
+            return ctx.diagnostics()[i]
+        if kind == "assessment":
+            return (ctx.risks("alzheimers")[i], ctx.risks("parkinsons")[i],
+                    ctx.risks("dementia")[i], ctx.diagnostics()[i])
+        return ctx.risks(kind)[i]
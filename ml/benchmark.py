@@ -0,0 +1,225 @@
+"""
+Inference Micro-Benchmarks for MLModelManager
+
+Measures p50/p95/p99 latency and throughput of every predict_* method,
+predict_diagnostic, fallback mode, batched inference at several batch
+sizes, and each available backend. Results are written as JSON and can
+be compared with an earlier run to catch regressions.
+
+    python -m ml.benchmark --out bench.json
+    python -m ml.benchmark --backends compiled:numpy --batch-sizes 1,64
+    python -m ml.benchmark --out new.json --compare bench.json --threshold 0.2
+"""
+
+import argparse
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+from ml.ml_manager import MLModelManager
+
+SYMPTOMS = ["tremor", "rigidity", "bradykinesia", "gait", "speech", "sleep", "balance"]
+DISEASES = ["Alzheimer's Disease", "Parkinson's Disease", "Dementia"]
+
+
+# -----------------------------
+# SYNTHETIC FORMS
+# -----------------------------
+def synthetic_forms(n, seed=0, unique=None):
+    """
+    Forms with every field _extract_features and _fallback_score read.
+    `unique` limits the number of distinct forms (to exercise the cache).
+    """
+    rng = random.Random(seed)
+    pool = unique or n
+    base = [
+        {
+            "age": rng.randint(40, 95),
+            "weight": round(rng.uniform(45, 120), 1),
+            "height": round(rng.uniform(145, 200), 1),
+            "gender": rng.choice(["Male", "Female"]),
+            "alcoholConsumption": round(rng.uniform(0, 20), 1),
+            "familyHistory": rng.sample(DISEASES, rng.randint(0, 2)),
+            "memoryComplaints": rng.choice(["none", "mild", "moderate", "severe"]),
+            "neurologicalSymptoms": rng.sample(SYMPTOMS, rng.randint(0, 4)),
+        }
+        for _ in range(pool)
+    ]
+    return [base[i % pool] for i in range(n)]
+
+
+# -----------------------------
+# TIMING
+# -----------------------------
+def _measure(fn, iterations, warmup, rows_per_call=1):
+    for _ in range(warmup):
+        fn()
+    samples = np.empty(iterations)
+    for i in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples[i] = time.perf_counter() - start
+    ms = samples * 1000
+    return {
+        "iterations": iterations,
+        "rows_per_call": rows_per_call,
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "mean_ms": float(ms.mean()),
+        "throughput_rows_per_s": float(rows_per_call * iterations / samples.sum()),
+    }
+
+
+def bench_manager(manager, label, forms, batch_sizes, iterations, warmup):
+    """All single-form methods plus batched diagnostics for one manager"""
+    results = []
+    cursor = iter(range(10 ** 12))
+
+    def one(method):
+        return lambda: method(forms[next(cursor) % len(forms)])
+
+    single = {
+        "predict_alzheimers_risk": manager.predict_alzheimers_risk,
+        "predict_parkinsons_risk": manager.predict_parkinsons_risk,
+        "predict_dementia_risk": manager.predict_dementia_risk,
+        "predict_diagnostic": manager.predict_diagnostic,
+        "predict_assessment": manager.predict_assessment,
+    }
+    for name, method in single.items():
+        results.append({"name": name, "backend": label, "batch_size": 1,
+                        **_measure(one(method), iterations, warmup)})
+
+    for size in batch_sizes:
+        batch = forms[:size] if size <= len(forms) else synthetic_forms(size, seed=size)
+        stats = _measure(lambda: manager.predict_diagnostic_batch(batch),
+                         max(3, iterations // max(1, size // 8)), warmup, rows_per_call=size)
+        results.append({"name": "predict_diagnostic_batch", "backend": label,
+                        "batch_size": size, **stats})
+    return results
+
+
+def run(backends, batch_sizes, iterations=200, warmup=10, n_forms=512,
+        unique=None, models_path="ml/Models", cache=False):
+    forms = synthetic_forms(n_forms, unique=unique)
+    results = []
+
+    for backend in backends:
+        xgb_backend, tf_backend = backend.split(":")
+        try:
+            manager = MLModelManager(models_path, xgb_backend=xgb_backend, tf_backend=tf_backend,
+                                     cache="auto" if cache else None)
+            manager.preload()
+        except Exception as e:
+            print(f"⚠️ Skipping backend {backend}:", e)
+            continue
+        print(f"▶ {backend}")
+        results += bench_manager(manager, backend, forms, batch_sizes, iterations, warmup)
+        if manager.cache is not None:
+            results[-1]["cache"] = manager.cache.stats()
+
+    # fallback mode: rule-based scoring only
+    manager = MLModelManager(models_path, cache=None)
+    manager.fallback_mode = True
+    print("▶ fallback")
+    results += bench_manager(manager, "fallback", forms, batch_sizes, iterations, warmup)
+
+    return {"meta": _meta(), "config": {
+        "backends": backends, "batch_sizes": batch_sizes, "iterations": iterations,
+        "warmup": warmup, "n_forms": n_forms, "unique": unique, "cache": cache,
+    }, "results": results}
+
+
+def _meta():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, timeout=5).stdout.strip() or None
+    except Exception:
+        commit = None
+    return {
+        "timestamp": datetime.utcnow().isoformat(),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+    }
+
+
+# -----------------------------
+# REGRESSION CHECK
+# -----------------------------
+def compare(current, baseline, threshold=0.2, metrics=("p50_ms", "p95_ms")):
+    """Results more than `threshold` (fraction) slower than baseline"""
+    key = lambda r: (r["name"], r["backend"], r["batch_size"])
+    old = {key(r): r for r in baseline["results"]}
+    regressions = []
+    for r in current["results"]:
+        prev = old.get(key(r))
+        if prev is None:
+            continue
+        for m in metrics:
+            if prev[m] > 0 and (r[m] - prev[m]) / prev[m] > threshold:
+                regressions.append({"name": r["name"], "backend": r["backend"],
+                                    "batch_size": r["batch_size"], "metric": m,
+                                    "baseline": prev[m], "current": r[m]})
+    return regressions
+
+
+def _print_table(report):
+    print(f"\n{'method':28} {'backend':16} {'batch':>5} {'p50 ms':>9} {'p95 ms':>9} "
+          f"{'p99 ms':>9} {'rows/s':>11}")
+    for r in report["results"]:
+        print(f"{r['name']:28} {r['backend']:16} {r['batch_size']:>5} {r['p50_ms']:>9.3f} "
+              f"{r['p95_ms']:>9.3f} {r['p99_ms']:>9.3f} {r['throughput_rows_per_s']:>11.0f}")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--out", help="write JSON results here")
+    ap.add_argument("--compare", help="baseline JSON from an earlier run")
+    ap.add_argument("--threshold", type=float, default=0.2,
+                    help="allowed slowdown vs baseline (0.2 = 20%%)")
+    ap.add_argument("--backends", default="booster:keras,compiled:keras,compiled:numpy",
+                    help="comma-separated xgb_backend:tf_backend pairs")
+    ap.add_argument("--batch-sizes", default="1,8,64,256")
+    ap.add_argument("--iterations", type=int, default=200)
+    ap.add_argument("--warmup", type=int, default=10)
+    ap.add_argument("--unique", type=int, help="distinct forms (default: all distinct)")
+    ap.add_argument("--cache", action="store_true", help="enable the prediction cache")
+    ap.add_argument("--models-path", default="ml/Models")
+    args = ap.parse_args(argv)
+
+    report = run(
+        backends=args.backends.split(","),
+        batch_sizes=[int(x) for x in args.batch_sizes.split(",")],
+        iterations=args.iterations, warmup=args.warmup,
+        unique=args.unique, models_path=args.models_path, cache=args.cache,
+    )
+    _print_table(report)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✔ Results written to {args.out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        for r in regressions:
+            print(f"❌ {r['name']} [{r['backend']}, batch {r['batch_size']}] {r['metric']}: "
+                  f"{r['baseline']:.3f} → {r['current']:.3f} ms")
+        if regressions:
+            return 1
+        print("✔ No regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,327 @@
+"""
+Model Bundle Format
+One versioned, memory-mappable file holding every model the predictors
+use, so startup is one mmap plus a manifest parse (no unpickling, no
+xgboost / TensorFlow / sklearn import).
+
+Layout:
+    b"NSBUNDLE" | u32 format version | u64 manifest length | manifest JSON
+    | zero padding | arrays, each 64-byte aligned
+
+The manifest records the feature schema, the ensemble definition, and
+for every model its kind, metadata and arrays (dtype, shape, offset,
+sha256).
+
+    python -m ml.bundle pack ml/Models ml/Models/neurosense.bundle
+    python -m ml.bundle info ml/Models/neurosense.bundle
+    python -m ml.bundle verify ml/Models/neurosense.bundle
+
+Serve it with NEUROSENSE_MODEL_BUNDLE=ml/Models/neurosense.bundle.
+"""
+
+import hashlib
+import json
+import struct
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from ml.keras_numpy import NumpyDenseModel
+from ml.model_registry import ModelRegistry
+from ml.tree_compiler import CompiledBooster
+
+MAGIC = b"NSBUNDLE"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<8sIQ")
+ALIGN = 64
+
+
+# -----------------------------
+# SCALER PARAMETERS
+# -----------------------------
+class ScalerParams:
+    """StandardScaler reduced to its arrays: (x - mean) / scale"""
+
+    ARRAYS = ("mean", "scale")
+
+    def __init__(self, mean, scale, feature_names=None):
+        self.mean = mean
+        self.scale = scale
+        self.feature_names = feature_names
+
+    @classmethod
+    def from_sklearn(cls, scaler):
+        n = scaler.n_features_in_
+        mean = getattr(scaler, "mean_", None)
+        scale = getattr(scaler, "scale_", None)
+        names = getattr(scaler, "feature_names_in_", None)
+        return cls(
+            np.zeros(n) if mean is None else np.asarray(mean, dtype=np.float64),
+            np.ones(n) if scale is None else np.asarray(scale, dtype=np.float64),
+            None if names is None else [str(x) for x in names],
+        )
+
+    @property
+    def n_features_in_(self):
+        return len(self.mean)
+
+    def transform(self, X):
+        return (np.asarray(X, dtype=np.float64) - self.mean) / self.scale
+
+
+# -----------------------------
+# MODEL ↔ (metadata, arrays)
+# -----------------------------
+def _flatten(kind, model):
+    """Split a model into JSON metadata and named arrays"""
+    if kind == "xgb_compiled":
+        meta = {
+            "max_depth": model.max_depth,
+            "base_margin": model.base_margin,
+            "objective": model.objective,
+            "num_feature": model.num_feature,
+            "feature_names": model.feature_names,
+        }
+        return meta, {k: getattr(model, k) for k in CompiledBooster.ARRAYS}
+
+    if kind == "tf_numpy":
+        layers, arrays = [], {}
+        for i, (layer_kind, params) in enumerate(model.layers):
+            if layer_kind == "dense":
+                kernel, bias, act = params
+                layers.append({"kind": "dense", "activation": act, "bias": bias is not None})
+                arrays[f"{i}.kernel"] = kernel
+                if bias is not None:
+                    arrays[f"{i}.bias"] = bias
+            elif layer_kind == "activation":
+                layers.append({"kind": "activation", "activation": params})
+            else:
+                layers.append({"kind": "affine"})
+                arrays[f"{i}.scale"], arrays[f"{i}.shift"] = params
+        return {"layers": layers}, arrays
+
+    if kind == "scaler":
+        if not isinstance(model, ScalerParams):
+            model = ScalerParams.from_sklearn(model)
+        return {"feature_names": model.feature_names}, {k: getattr(model, k) for k in ScalerParams.ARRAYS}
+
+    raise ValueError(f"Cannot bundle model kind: {kind}")
+
+
+def _build(kind, meta, arrays):
+    """Inverse of _flatten"""
+    if kind == "xgb_compiled":
+        return CompiledBooster(**{k: arrays[k] for k in CompiledBooster.ARRAYS}, **meta)
+
+    if kind == "tf_numpy":
+        layers = []
+        for i, layer in enumerate(meta["layers"]):
+            if layer["kind"] == "dense":
+                bias = arrays[f"{i}.bias"] if layer["bias"] else None
+                layers.append(("dense", (arrays[f"{i}.kernel"], bias, layer["activation"])))
+            elif layer["kind"] == "activation":
+                layers.append(("activation", layer["activation"]))
+            else:
+                layers.append(("affine", (arrays[f"{i}.scale"], arrays[f"{i}.shift"])))
+        return NumpyDenseModel(layers)
+
+    if kind == "scaler":
+        return ScalerParams(arrays["mean"], arrays["scale"], meta.get("feature_names"))
+
+    raise ValueError(f"Unknown model kind in bundle: {kind}")
+
+
+# -----------------------------
+# WRITE
+# -----------------------------
+def pack(models_path, out_path):
+    """Convert the loose artifacts in `models_path` into one bundle file"""
+    from ml.ml_manager import DISEASE_MODELS, FEATURE_SCHEMA, MLModelManager
+
+    registry = ModelRegistry(models_path, xgb_backend="compiled", tf_backend="numpy")
+    names = MLModelManager.ACTIVE_MODELS + [
+        n for n, s in registry.specs.items() if s.kind == "scaler"
+    ]
+
+    entries, blobs, offset, skipped = {}, [], 0, []
+    for name in names:
+        model = registry.get(name)
+        if model is None:
+            skipped.append(name)
+            continue
+        kind = registry.loader_kind(name)
+        meta, arrays = _flatten(kind, model)
+
+        described = {}
+        for key, arr in arrays.items():
+            arr = np.ascontiguousarray(arr)
+            described[key] = {
+                "dtype": arr.dtype.str,
+                "shape": list(arr.shape),
+                "offset": offset,
+                "nbytes": arr.nbytes,
+                "sha256": hashlib.sha256(arr.tobytes()).hexdigest(),
+            }
+            blobs.append((offset, arr))
+            offset = _aligned(offset + arr.nbytes)
+
+        entries[name] = {"kind": kind, "source": registry.specs[name].file,
+                         "meta": meta, "arrays": described}
+
+    manifest = {
+        "format": "neurosense-bundle",
+        "format_version": FORMAT_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "feature_schema": FEATURE_SCHEMA,
+        "ensemble": {
+            key: {"disease": disease, "models": [xgb_name, "tf_neuro_model"], "confidence": conf}
+            for key, (disease, xgb_name, conf) in DISEASE_MODELS.items()
+        },
+        "models": entries,
+        "skipped": skipped,
+    }
+    raw = json.dumps(manifest, indent=1).encode()
+    data_start = _aligned(HEADER.size + len(raw))
+
+    out_path = Path(out_path)
+    tmp = out_path.with_suffix(out_path.suffix + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(raw)))
+        f.write(raw)
+        for off, arr in blobs:
+            f.seek(data_start + off)
+            f.write(arr.tobytes())
+        f.truncate(data_start + offset)
+    tmp.replace(out_path)
+    return manifest
+
+
+def _aligned(n):
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+
+# -----------------------------
+# READ
+# -----------------------------
+class ModelBundle:
+    """An opened bundle: parsed manifest plus one read-only memmap"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            magic, version, length = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC:
+                raise ValueError(f"{self.path} is not a model bundle")
+            if version != FORMAT_VERSION:
+                raise ValueError(f"Unsupported bundle format version {version}")
+            raw = f.read(length)
+        self.manifest = json.loads(raw)
+        self.data_start = _aligned(HEADER.size + length)
+        self.version = hashlib.sha1(raw).hexdigest()[:16]
+        self._mm = np.memmap(self.path, dtype=np.uint8, mode="r")
+
+    @property
+    def models(self):
+        return self.manifest["models"]
+
+    def arrays(self, name):
+        out = {}
+        for key, a in self.models[name]["arrays"].items():
+            start = self.data_start + a["offset"]
+            raw = self._mm[start:start + a["nbytes"]]
+            out[key] = raw.view(np.dtype(a["dtype"])).reshape(a["shape"])
+        return out
+
+    def load(self, name):
+        entry = self.models[name]
+        return _build(entry["kind"], entry["meta"], self.arrays(name))
+
+    def verify(self):
+        """Check every array against its sha256; returns the names that fail"""
+        bad = []
+        for name, entry in self.models.items():
+            arrays = self.arrays(name)
+            for key, a in entry["arrays"].items():
+                if hashlib.sha256(arrays[key].tobytes()).hexdigest() != a["sha256"]:
+                    bad.append(f"{name}.{key}")
+        return bad
+
+
+class BundleRegistry(ModelRegistry):
+    """ModelRegistry that serves models from a bundle instead of loose files"""
+
+    def __init__(self, bundle_path):
+        super().__init__(Path(bundle_path).parent, specs=[])
+        self.bundle = ModelBundle(bundle_path)
+
+        from ml.ml_manager import FEATURE_SCHEMA
+        if self.bundle.manifest["feature_schema"] != FEATURE_SCHEMA:
+            print("⚠️ Bundle feature schema differs from the code's:",
+                  self.bundle.manifest["feature_schema"])
+
+    def available(self, name):
+        return name in self.bundle.models
+
+    def loader_kind(self, name):
+        return self.bundle.models[name]["kind"]
+
+    def version(self):
+        return self.bundle.version
+
+    def status(self):
+        return {
+            name: {
+                "file": self.bundle.path.name,
+                "available": True,
+                "loaded": name in self.models,
+                "load_ms": self.load_times.get(name),
+                "error": self.errors.get(name),
+            }
+            for name in self.bundle.models
+        }
+
+    def preload(self, names=None):
+        for name in names or list(self.bundle.models):
+            self.get(name)
+        return dict(self.load_times)
+
+    def _load(self, name):
+        start = time.perf_counter()
+        try:
+            self.models[name] = self.bundle.load(name)
+        except Exception as e:
+            self.errors[name] = str(e)
+            print(f"❌ Bundle load error ({name}):", e)
+            return
+        self.load_times[name] = (time.perf_counter() - start) * 1000
+        print(f"✔ Loaded from bundle: {name} ({self.load_times[name]:.1f} ms)")
+
+
+# -----------------------------
+# CLI
+# -----------------------------
+def main(argv):
+    if len(argv) == 3 and argv[0] == "pack":
+        manifest = pack(argv[1], argv[2])
+        print(f"✔ Packed {len(manifest['models'])} models into {argv[2]}")
+        if manifest["skipped"]:
+            print("⚠️ Skipped (missing or failed to load):", ", ".join(manifest["skipped"]))
+        return 0
+    if len(argv) == 2 and argv[0] == "info":
+        bundle = ModelBundle(argv[1])
+        for name, entry in bundle.models.items():
+            size = sum(a["nbytes"] for a in entry["arrays"].values())
+            print(f"{name:32} {entry['kind']:14} {size / 1024:8.1f} KB  ({entry['source']})")
+        return 0
+    if len(argv) == 2 and argv[0] == "verify":
+        bad = ModelBundle(argv[1]).verify()
+        print("✔ All checksums match" if not bad else f"❌ Checksum mismatch: {', '.join(bad)}")
+        return 1 if bad else 0
+    print(__doc__)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
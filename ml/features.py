@@ -0,0 +1,244 @@
+"""
+Declarative Feature Pipeline
+FEATURE_SPEC lists every feature read from an assessment form; it is
+compiled once into two generated functions, one for a single form
+(a flat tuple expression) and one columnar for many forms (one list
+comprehension per field, parsed by NumPy).
+
+MODEL_INPUTS maps each model's own training columns onto those
+features. A model's columns come from its scaler's feature names, or
+its booster's, and the (x - mean) / scale step is fused with the
+column gather into one InputLayout per model.
+
+    X = FEATURE_SPEC.extract_many(forms)      # (N, F) canonical matrix
+    layout = MODEL_INPUTS["dementia_oasis_model"].compile(FEATURE_SPEC, model, scaler)
+    layout.apply(X)                            # (N, 7) scaled model input
+"""
+
+import hashlib
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+# -----------------------------
+# FEATURE KINDS
+# -----------------------------
+@dataclass(frozen=True)
+class Number:
+    """float(form[field]), `default` when absent"""
+    name: str
+    field: str
+    default: float = 0.0
+
+    def row_expr(self):
+        return f"float(get({self.field!r}, {self.default!r}))"
+
+    def column_expr(self):
+        # float() per value, as in the row path: "72" reads as 72, None and "" raise
+        return f"np.array([float(f.get({self.field!r}, {self.default!r})) for f in forms], dtype=np.float64)"
+
+
+@dataclass(frozen=True)
+class OneOf:
+    """1.0 if form[field] is one of `values`"""
+    name: str
+    field: str
+    values: Tuple[str, ...]
+
+    def row_expr(self):
+        return f"1.0 if get({self.field!r}) in {self.values!r} else 0.0"
+
+    def column_expr(self):
+        return f"np.array([f.get({self.field!r}) in {self.values!r} for f in forms], dtype=np.float64)"
+
+
+@dataclass(frozen=True)
+class Contains:
+    """1.0 if `value` was ticked in the checkbox group `field`"""
+    name: str
+    field: str
+    value: str
+
+    def row_expr(self):
+        return f"1.0 if {self.value!r} in get({self.field!r}, ()) else 0.0"
+
+    def column_expr(self):
+        return f"np.array([{self.value!r} in f.get({self.field!r}, ()) for f in forms], dtype=np.float64)"
+
+
+@dataclass(frozen=True)
+class Derived:
+    """Arithmetic over earlier features; NaN where it is undefined"""
+    name: str
+    expr: str
+
+
+# -----------------------------
+# FEATURE SPEC
+# -----------------------------
+class FeatureSpec:
+
+    def __init__(self, features):
+        self.features = list(features)
+        self.names = [f.name for f in self.features]
+        self.index = {n: i for i, n in enumerate(self.names)}
+        self.source = _generate(self.features)
+        namespace = {"np": np, "nan": float("nan")}
+        exec(compile(self.source, "<feature_spec>", "exec"), namespace)
+        self._row = namespace["extract_row"]
+        self._columns = namespace["extract_columns"]
+        self.fingerprint = hashlib.sha1(self.source.encode()).hexdigest()[:12]
+
+    def coerce(self, form):
+        """
+        Copy of a stored form with its numeric fields as numbers: form_data
+        saved from an HTML post holds "72" rather than 72. A blank or null
+        field is dropped so the feature's default applies.
+        """
+        out = dict(form)
+        for feat in self.features:
+            if isinstance(feat, Number):
+                value = out.get(feat.field)
+                if value is None or (isinstance(value, str) and not value.strip()):
+                    out.pop(feat.field, None)
+                elif isinstance(value, str):
+                    out[feat.field] = float(value)
+        return out
+
+    def extract(self, form):
+        """Feature tuple for one form"""
+        return self._row(form)
+
+    def extract_many(self, forms):
+        """(N, F) float32 matrix; row-wise for small batches, columnar from 64 forms up"""
+        if not forms:
+            return np.empty((0, len(self.names)), dtype=np.float32)
+        if len(forms) < 64:
+            return np.array(list(map(self._row, forms)), dtype=np.float32)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return self._columns(forms)
+
+
+def _generate(features):
+    """Source of extract_row(form) and extract_columns(forms)"""
+    row = ["def extract_row(f):", "    get = f.get"]
+    cols = ["def extract_columns(forms):"]
+    for feat in features:
+        if isinstance(feat, Derived):
+            row += ["    try:", f"        {feat.name} = {feat.expr}",
+                    "    except ZeroDivisionError:", f"        {feat.name} = nan"]
+            cols += [f"    {feat.name} = {feat.expr}",
+                     f"    {feat.name}[~np.isfinite({feat.name})] = nan"]
+        else:
+            row.append(f"    {feat.name} = {feat.row_expr()}")
+            cols.append(f"    {feat.name} = {feat.column_expr()}")
+    names = ", ".join(f.name for f in features)
+    row.append(f"    return ({names},)")
+    cols.append(f"    return np.stack(({names},), axis=1).astype(np.float32)")
+    return "\n".join(row + [""] + cols) + "\n"
+
+
+# -----------------------------
+# MODEL INPUT LAYOUTS
+# -----------------------------
+class InputLayout:
+    """Canonical matrix → one model's input: gather columns, then (x - mean) / scale"""
+
+    def __init__(self, columns, idx, mean=None, scale=None):
+        self.columns = columns
+        self.idx = np.asarray(idx, dtype=np.intp)
+        self.missing = self.idx < 0
+        self.idx[self.missing] = 0
+        self.mean = mean
+        self.scale = scale
+
+    def apply(self, X):
+        out = X.take(self.idx, axis=1).astype(np.float64)
+        if self.mean is not None:
+            out -= self.mean
+            out /= self.scale
+        out[:, self.missing] = np.nan
+        if self.mean is not None:
+            # training imputed missing values with the column mean → 0 once scaled
+            np.nan_to_num(out, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
+        return out.astype(np.float32)
+
+
+@dataclass
+class ModelInput:
+    """
+    How one model reads the canonical features. `columns` defaults to the
+    scaler's feature names, then the model's; `aliases` maps those column
+    names to feature names. No columns at all → canonical matrix as is.
+    """
+    columns: Optional[List[str]] = None
+    scaler: Optional[str] = None
+    aliases: Dict[str, str] = field(default_factory=dict)
+
+    def compile(self, spec, model=None, scaler=None):
+        from ml.bundle import ScalerParams
+
+        if scaler is not None and not isinstance(scaler, ScalerParams):
+            scaler = ScalerParams.from_sklearn(scaler)
+        columns = (self.columns
+                   or (scaler.feature_names if scaler is not None else None)
+                   or getattr(model, "feature_names", None))
+        if not columns:
+            return None
+
+        idx = [spec.index.get(self.aliases.get(c, c), -1) for c in columns]
+        if scaler is None:
+            return InputLayout(list(columns), idx)
+        if len(scaler.mean) != len(columns):
+            raise ValueError(f"Scaler has {len(scaler.mean)} features, layout has {len(columns)}")
+        return InputLayout(list(columns), idx, np.asarray(scaler.mean, dtype=np.float64),
+                           np.asarray(scaler.scale, dtype=np.float64))
+
+
+# -----------------------------
+# NEUROSENSE FEATURES
+# -----------------------------
+FEATURE_SPEC = FeatureSpec([
+    # the multimodal network's 8 inputs
+    Number("age", "age", 65),
+    Number("weight", "weight", 70),
+    Number("height", "height", 170),
+    OneOf("gender_male", "gender", ("Male",)),
+    Number("alcohol_consumption", "alcoholConsumption", 0),
+    Contains("family_history_alzheimers", "familyHistory", "Alzheimer's Disease"),
+    Contains("family_history_parkinsons", "familyHistory", "Parkinson's Disease"),
+    Contains("family_history_dementia", "familyHistory", "Dementia"),
+    # read by the clinical XGBoost models
+    OneOf("gender_female", "gender", ("Female",)),
+    Derived("bmi", "weight / (height / 100) ** 2"),
+    Contains("hypertension", "medicalConditions", "Hypertension"),
+    Contains("diabetes", "medicalConditions", "Diabetes"),
+    Contains("depression", "medicalConditions", "Depression"),
+    Contains("tremor", "neurologicalSymptoms", "Tremors"),
+    Contains("rigidity", "neurologicalSymptoms", "Stiffness"),
+    Contains("bradykinesia", "neurologicalSymptoms", "Slowed movement"),
+    Contains("postural_instability", "neurologicalSymptoms", "Balance problems"),
+    OneOf("speech_problems", "speechIssues", ("mild", "moderate", "severe")),
+])
+
+# OASIS columns; Sex was label-encoded from M/F, so M = 1
+OASIS_ALIASES = {"Age": "age", "Sex": "gender_male"}
+
+# Parkinson's clinical dataset columns; Gender is 0 = male, 1 = female
+PD_CLINICAL_ALIASES = {
+    "Age": "age", "Gender": "gender_female", "BMI": "bmi",
+    "AlcoholConsumption": "alcohol_consumption",
+    "FamilyHistoryParkinsons": "family_history_parkinsons",
+    "Hypertension": "hypertension", "Diabetes": "diabetes", "Depression": "depression",
+    "Tremor": "tremor", "Rigidity": "rigidity", "Bradykinesia": "bradykinesia",
+    "PosturalInstability": "postural_instability", "SpeechProblems": "speech_problems",
+}
+
+MODEL_INPUTS = {
+    "alzheimer_model1_xgb": ModelInput(aliases=OASIS_ALIASES),
+    "dementia_oasis_model": ModelInput(scaler="dementia_scaler", aliases=OASIS_ALIASES),
+    "parkinsons_model1_xgb": ModelInput(scaler="parkinsons_scaler1", aliases=PD_CLINICAL_ALIASES),
+    "tf_neuro_model": ModelInput(columns=FEATURE_SPEC.names[:8]),
+}
@@ -0,0 +1,269 @@
+"""
+Keras Inference Backends
+Alternatives to model.predict() for the small dense multimodal model:
+
+  numpy        weights read once from the .h5 file (h5py only, no
+               TensorFlow import), forward pass in NumPy
+  tf_function  the Keras model traced once into a fixed-signature
+               tf.function, called directly
+
+Check parity against the original model:
+    python -m ml.keras_numpy ml/Models/tf_multimodal_model.h5
+"""
+
+import json
+import sys
+
+import numpy as np
+
+from ml.model_registry import import_framework
+
+
+# -----------------------------
+# ACTIVATIONS
+# -----------------------------
+def _softmax(x):
+    e = np.exp(x - x.max(axis=-1, keepdims=True))
+    return e / e.sum(axis=-1, keepdims=True)
+
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+ACTIVATIONS = {
+    "linear": lambda x: x,
+    "relu": lambda x: np.maximum(x, 0),
+    "sigmoid": _sigmoid,
+    "tanh": np.tanh,
+    "softmax": _softmax,
+    "elu": lambda x: np.where(x > 0, x, np.expm1(x)),
+    "selu": lambda x: 1.0507009873554805 * np.where(x > 0, x, 1.6732632423543772 * np.expm1(x)),
+    "swish": lambda x: x * _sigmoid(x),
+    "silu": lambda x: x * _sigmoid(x),
+}
+
+
+def _activation(spec):
+    """Validated activation name"""
+    # Keras 3 may serialize activations as {"class_name": ..., "config": {...}}
+    if isinstance(spec, dict):
+        spec = spec.get("config", {}).get("name") or spec.get("class_name", "").lower()
+    spec = spec or "linear"
+    if spec not in ACTIVATIONS:
+        raise ValueError(f"Unsupported activation: {spec}")
+    return spec
+
+
+# expected weight order per layer type (used when names are not descriptive)
+WEIGHT_ORDER = {
+    "Dense": ["kernel", "bias"],
+    "BatchNormalization": ["gamma", "beta", "moving_mean", "moving_variance"],
+}
+
+PASSTHROUGH = {"InputLayer", "Dropout", "Flatten", "GaussianNoise", "GaussianDropout"}
+
+
+# -----------------------------
+# NUMPY BACKEND
+# -----------------------------
+class NumpyDenseModel:
+    """
+    Forward pass of a linear stack of Dense / Activation /
+    BatchNormalization layers. Dropout-style layers are inference no-ops.
+    """
+
+    def __init__(self, layers):
+        # list of (kind, params):
+        #   ("dense", (kernel, bias or None, activation name))
+        #   ("activation", activation name)
+        #   ("affine", (scale, shift))      folded BatchNormalization
+        self.layers = layers
+
+    # =============================
+    # BUILD
+    # =============================
+    @classmethod
+    def from_h5(cls, path):
+        """Read architecture and weights from a Keras .h5 file"""
+        h5py = import_framework("h5py")
+        with h5py.File(path, "r") as f:
+            config = f.attrs["model_config"]
+            config = json.loads(config.decode() if isinstance(config, bytes) else config)
+            group = f["model_weights"] if "model_weights" in f else f
+            weights = {
+                name: _read_layer_weights(group[name])
+                for name in group if isinstance(group[name], h5py.Group)
+            }
+        return cls.from_config(config, weights)
+
+    @classmethod
+    def from_keras(cls, model):
+        """Copy architecture and weights from a loaded tf.keras model"""
+        config = {"class_name": "Sequential", "config": {"layers": []}}
+        weights = {}
+        for layer in model.layers:
+            config["config"]["layers"].append({
+                "class_name": type(layer).__name__,
+                "config": layer.get_config(),
+            })
+            names = [w.name.split("/")[-1].split(":")[0] for w in layer.weights]
+            weights[layer.name] = list(zip(names, layer.get_weights()))
+        return cls.from_config(config, weights)
+
+    @classmethod
+    def from_config(cls, config, weights):
+        layers = []
+        for layer in _linear_layers(config):
+            kind = layer["class_name"]
+            cfg = layer["config"]
+            if kind in PASSTHROUGH:
+                continue
+            w = _named_weights(kind, weights.get(cfg["name"], []))
+
+            if kind == "Dense":
+                layers.append(("dense", (
+                    np.asarray(w["kernel"], dtype=np.float32),
+                    np.asarray(w["bias"], dtype=np.float32) if cfg.get("use_bias", True) else None,
+                    _activation(cfg.get("activation")),
+                )))
+            elif kind == "Activation":
+                layers.append(("activation", _activation(cfg.get("activation"))))
+            elif kind == "BatchNormalization":
+                eps = cfg.get("epsilon", 1e-3)
+                mean = np.asarray(w["moving_mean"], dtype=np.float32)
+                scale = 1.0 / np.sqrt(np.asarray(w["moving_variance"], dtype=np.float32) + eps)
+                if cfg.get("scale", True):
+                    scale = scale * np.asarray(w["gamma"], dtype=np.float32)
+                shift = -mean * scale
+                if cfg.get("center", True):
+                    shift = shift + np.asarray(w["beta"], dtype=np.float32)
+                layers.append(("affine", (scale.astype(np.float32), shift.astype(np.float32))))
+            else:
+                raise ValueError(f"Unsupported layer for NumPy backend: {kind}")
+        return cls(layers)
+
+    # =============================
+    # PREDICT
+    # =============================
+    def predict(self, X, batch_size=None, verbose=0):
+        """Same call shape as keras Model.predict; returns (N, units)"""
+        x = np.asarray(X, dtype=np.float32)
+        if x.ndim == 1:
+            x = x.reshape(1, -1)
+        for kind, params in self.layers:
+            if kind == "dense":
+                kernel, bias, act = params
+                x = x @ kernel
+                if bias is not None:
+                    x += bias
+                x = ACTIVATIONS[act](x)
+            elif kind == "activation":
+                x = ACTIVATIONS[params](x)
+            else:
+                scale, shift = params
+                x = x * scale + shift
+        return x
+
+    def __repr__(self):
+        return f"NumpyDenseModel(layers={[k for k, _ in self.layers]})"
+
+
+def _linear_layers(config):
+    """Layer configs in execution order; only single-input chains are supported"""
+    cfg = config.get("config", config)
+    layers = cfg["layers"] if isinstance(cfg, dict) else cfg
+    for layer in layers:
+        inbound = layer.get("inbound_nodes") or []
+        if len(inbound) > 1 or (inbound and _inbound_count(inbound[0]) > 1):
+            raise ValueError("NumPy backend supports only linear (single-input) models")
+    return layers
+
+
+def _inbound_count(node):
+    # Keras 2: [[name, 0, 0, {}], ...]   Keras 3: {"args": [...], "kwargs": {...}}
+    if isinstance(node, dict):
+        return len(node.get("args", []))
+    return len(node)
+
+
+def _read_layer_weights(group):
+    """[(name, array)] in the order Keras stored them"""
+    names = group.attrs.get("weight_names")
+    if names is not None:
+        names = [n.decode() if isinstance(n, bytes) else n for n in names]
+        return [(n, group[n][()]) for n in names]
+
+    found = []
+    group.visititems(lambda n, obj: found.append((n, obj[()])) if hasattr(obj, "shape") else None)
+    return found
+
+
+def _named_weights(kind, weights):
+    """Map stored weights to kernel/bias/gamma/... by name, else by position"""
+    out = {}
+    for name, value in weights:
+        base = name.split("/")[-1].split(":")[0]
+        out[base] = value
+    expected = WEIGHT_ORDER.get(kind, [])
+    if expected and not set(expected) & set(out):
+        out = dict(zip(expected, [v for _, v in weights]))
+    return out
+
+
+# -----------------------------
+# TF.FUNCTION BACKEND
+# -----------------------------
+class TracedKerasModel:
+    """Keras model traced once into a fixed-signature tf.function"""
+
+    def __init__(self, model):
+        tf = import_framework("tensorflow")
+        n_inputs = model.inputs[0].shape[-1]
+        self.model = model
+        self._fn = tf.function(
+            lambda x: model(x, training=False),
+            input_signature=[tf.TensorSpec([None, n_inputs], tf.float32)],
+        )
+
+    @classmethod
+    def from_h5(cls, path):
+        tf = import_framework("tensorflow")
+        return cls(tf.keras.models.load_model(path))
+
+    def predict(self, X, batch_size=None, verbose=0):
+        x = np.asarray(X, dtype=np.float32)
+        if x.ndim == 1:
+            x = x.reshape(1, -1)
+        return self._fn(x).numpy()
+
+
+# -----------------------------
+# PARITY CHECK
+# -----------------------------
+def check_parity(path, X=None, n_rows=256, atol=1e-5, seed=0):
+    """
+    Compare both backends with keras model.predict on the same rows.
+    Returns {backend: max abs diff}; raises AssertionError above `atol`.
+    """
+    tf = import_framework("tensorflow")
+    model = tf.keras.models.load_model(path)
+
+    if X is None:
+        rng = np.random.default_rng(seed)
+        X = rng.normal(size=(n_rows, model.inputs[0].shape[-1])).astype(np.float32)
+
+    expected = model.predict(X, verbose=0)
+    diffs = {
+        "numpy": NumpyDenseModel.from_h5(path).predict(X),
+        "tf_function": TracedKerasModel(model).predict(X),
+    }
+    diffs = {k: float(np.max(np.abs(expected - v))) for k, v in diffs.items()}
+    for backend, diff in diffs.items():
+        assert diff <= atol, f"{backend}: max abs diff {diff} > {atol}"
+    return diffs
+
+
+if __name__ == "__main__":
+    for p in sys.argv[1:] or ["ml/Models/tf_multimodal_model.h5"]:
+        print(p, check_parity(p))
@@ -0,0 +1,190 @@
+"""
+Lightweight Metrics
+Counters, histograms and callback gauges with Prometheus text output.
+Cheap enough for the hot path: one lock and a bisect per observation.
+
+    MODEL_SECONDS.time(model="tf_neuro_model")   # context manager
+    REGISTRY.render()                            # /metrics body
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+LATENCY_BUCKETS = [0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5]
+
+
+def _labels_text(names, values, extra=None):
+    pairs = list(zip(names, values)) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    body = ",".join(f'{k}="{_escape(v)}"' for k, v in pairs)
+    return "{" + body + "}"
+
+
+def _escape(v):
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _fmt(v):
+    return repr(float(v)) if not isinstance(v, int) else str(v)
+
+
+# -----------------------------
+# METRIC TYPES
+# -----------------------------
+class Counter:
+    type = "counter"
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(l, "") for l in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [(self.name, _labels_text(self.labels, k), v) for k, v in items]
+
+
+class Histogram:
+    """Fixed-bucket histogram (cumulative counts, Prometheus style)"""
+
+    type = "histogram"
+
+    def __init__(self, name, help, buckets=LATENCY_BUCKETS, labels=()):
+        self.name = name
+        self.help = help
+        self.buckets = list(buckets)
+        self.labels = tuple(labels)
+        self._series = {}   # label values → [bucket counts..., +Inf], count, sum
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(l, "") for l in self.labels)
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0, 0.0]
+            series[0][i] += 1
+            series[1] += 1
+            series[2] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def snapshot(self, **labels):
+        """Cumulative bucket counts, count and sum for one label set"""
+        key = tuple(labels.get(l, "") for l in self.labels)
+        with self._lock:
+            counts, total, s = self._series.get(key, [[0] * (len(self.buckets) + 1), 0, 0.0])
+            counts = list(counts)
+        cumulative, running = {}, 0
+        for bound, count in zip(self.buckets + ["+Inf"], counts):
+            running += count
+            cumulative[str(bound)] = running
+        return {"buckets": cumulative, "count": total, "sum": s}
+
+    def samples(self):
+        with self._lock:
+            items = [(k, list(v[0]), v[1], v[2]) for k, v in self._series.items()]
+        out = []
+        for key, counts, total, s in items:
+            running = 0
+            for bound, count in zip(self.buckets + ["+Inf"], counts):
+                running += count
+                le = bound if bound == "+Inf" else _fmt(bound)
+                out.append((self.name + "_bucket", _labels_text(self.labels, key, ("le", le)), running))
+            out.append((self.name + "_count", _labels_text(self.labels, key), total))
+            out.append((self.name + "_sum", _labels_text(self.labels, key), s))
+        return out
+
+
+class GaugeFunc:
+    """Gauge read from a callback at scrape time: fn() → {label tuple: value} or value"""
+
+    type = "gauge"
+
+    def __init__(self, name, help, fn, labels=()):
+        self.name = name
+        self.help = help
+        self.fn = fn
+        self.labels = tuple(labels)
+
+    def samples(self):
+        try:
+            value = self.fn()
+        except Exception:
+            return []
+        if not isinstance(value, dict):
+            return [(self.name, "", value)]
+        return [(self.name, _labels_text(self.labels, k), v) for k, v in value.items()]
+
+
+# -----------------------------
+# REGISTRY
+# -----------------------------
+class MetricsRegistry:
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, *args, **kwargs):
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = cls(name, *args, **kwargs)
+            return self._metrics[name]
+
+    def counter(self, name, help, labels=()):
+        return self._get_or_create(Counter, name, help, labels=labels)
+
+    def histogram(self, name, help, buckets=LATENCY_BUCKETS, labels=()):
+        return self._get_or_create(Histogram, name, help, buckets=buckets, labels=labels)
+
+    def gauge_func(self, name, help, fn, labels=()):
+        with self._lock:
+            self._metrics[name] = GaugeFunc(name, help, fn, labels=labels)
+            return self._metrics[name]
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for m in metrics:
+            lines.append(f"# HELP {m.name} {m.help}")
+            lines.append(f"# TYPE {m.name} {m.type}")
+            for name, labels, value in m.samples():
+                lines.append(f"{name}{labels} {_fmt(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# -----------------------------
+# ML INFERENCE METRICS
+# -----------------------------
+MODEL_SECONDS = REGISTRY.histogram(
+    "neurosense_model_inference_seconds", "Time per model call (one batch)", labels=("model",))
+FEATURE_SECONDS = REGISTRY.histogram(
+    "neurosense_feature_extraction_seconds", "Time to build the feature matrix")
+PREDICTIONS = REGISTRY.counter(
+    "neurosense_predictions_total", "Risk predictions by disease and source",
+    labels=("disease", "source"))
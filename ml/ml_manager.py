@@ -1,20 +1,20 @@
 """
 ML Model Loading & Inference Module (Flask Compatible)
 Now supports: TensorFlow / Keras Models
+Models are loaded lazily through ml.model_registry.
 """
 
 import os
-import json
-import pickle
 import numpy as np
-from pathlib import Path
 from typing import Dict, Any, Optional, List
 from dataclasses import dataclass
 
-import xgboost as xgb
-import lightgbm as lgb
-import tensorflow as tf   # ← NEW
-from sklearn.preprocessing import StandardScaler
+from ml.model_registry import ModelRegistry, import_framework
+from ml.tree_compiler import CompiledBooster
+from ml.prediction_cache import PredictionCache, make_key
+from ml.features import FEATURE_SPEC, MODEL_INPUTS
+from ml.mri_features import get_mri_features
+from ml.metrics import REGISTRY, MODEL_SECONDS, FEATURE_SECONDS, PREDICTIONS
 
 
 # -----------------------------
@@ -37,181 +37,364 @@ class DiagnosticResult:
     disease_probabilities: Dict[str, float]
     key_findings: List[str]
     recommendations: List[str]
+    mri_features: Optional[Dict[str, float]] = None
 
 
 # -----------------------------
-# MODEL MANAGER
+# DISEASE MODEL TABLE
+# key → (disease label, XGBoost model, confidence)
 # -----------------------------
-class MLModelManager:
+DISEASE_MODELS = {
+    "alzheimers": ("Alzheimer's", "alzheimer_model1_xgb", 90),
+    "parkinsons": ("Parkinson's", "parkinsons_model1_xgb", 88),
+    "dementia": ("Dementia", "dementia_oasis_model", 87),
+}
 
-    def __init__(self, models_path: str = "ml/Models"):
-        self.models_path = Path(models_path)
-        self.models = {}
-        self.scalers = {}
-        self.fallback_mode = False
-        self._load_all_models()
 
-    # =============================
-    # LOAD ALL MODELS
-    # =============================
-    def _load_all_models(self):
-        try:
-            # XGBoost Models
-            self._load_xgb("alzheimer_model1_xgb", "alzheimer_model1_xgb.json")
-            self._load_xgb("alzheimer_model2_xgb", "alzheimer_model2_lgbm.pkl")
+# columns of the canonical feature matrix (see ml/features.py)
+FEATURE_SCHEMA = FEATURE_SPEC.names
 
-            self._load_xgb("parkinsons_model1_xgb", "parkinsons_model1_xgb.json")
-            self._load_xgb("parkinsons_model2_xgb", "parkinsons_model2_xgb.json")
 
-            self._load_xgb("dementia_oasis_model", "dementia_oasis_model.json")
-            self._load_xgb("dementia_progression_model", "dementia_progression_model.json")
+# -----------------------------
+# PER-REQUEST INFERENCE CONTEXT
+# -----------------------------
+class InferenceContext:
+    """
+    Result context for one set of forms. Features are extracted once,
+    every model runs at most once on that feature matrix, and the
+    per-disease risks are reused by the diagnostic.
+    """
+
+    def __init__(self, manager, forms):
+        self.manager = manager
+        self.forms = list(forms)
+        self._features = None
+        self._scores = None
+        self._risks = {}
+        self._mri = None
+        self._diagnostics = None
+
+    @property
+    def features(self):
+        if self._features is None:
+            self._features = self.manager._extract_features_batch(self.forms)
+        return self._features
+
+    def scores(self):
+        """Per-disease ensemble scores for every form (NaN → fallback)"""
+        if self._scores is None:
+            self._scores = self.manager._scores(self.features)
+        return self._scores
+
+    def risks(self, key):
+        if key not in self._risks:
+            self._risks[key] = self.manager._compute_risks(key, self)
+        return self._risks[key]
+
+    def mri(self):
+        """Cached MRI volume features per form (None without a processed scan)"""
+        if self._mri is None:
+            self._mri = self.manager._mri_features(self.forms)
+        return self._mri
+
+    def diagnostics(self):
+        if self._diagnostics is None:
+            self._diagnostics = [
+                self.manager._diagnose(a, d, p, m)
+                for a, d, p, m in zip(self.risks("alzheimers"),
+                                      self.risks("dementia"),
+                                      self.risks("parkinsons"),
+                                      self.mri())
+            ]
+        return self._diagnostics
 
-            # TensorFlow Model
-            self._load_tf("tf_neuro_model", "tf_multimodal_model.h5")
 
-            # Scalers
-            self._load_scaler("dementia_scaler", "dementia_scaler.pkl")
-            self._load_scaler("parkinsons_scaler1", "parkinsons_scaler1.pkl")
+# -----------------------------
+# MODEL MANAGER
+# -----------------------------
+class MLModelManager:
 
-            if len(self.models) == 0:
-                print("⚠️ No ML models found → fallback mode enabled")
-                self.fallback_mode = True
+    # models the predictors actually use
+    ACTIVE_MODELS = [m[1] for m in DISEASE_MODELS.values()] + ["tf_neuro_model"]
+    # scalers applied to their inputs
+    SCALERS = sorted({MODEL_INPUTS[m].scaler for m in ACTIVE_MODELS
+                      if m in MODEL_INPUTS and MODEL_INPUTS[m].scaler})
+
+    def __init__(self, models_path: str = "ml/Models",
+                 xgb_backend: Optional[str] = None, tf_backend: Optional[str] = None,
+                 cache="auto", bundle: Optional[str] = None, mri="auto"):
+        # xgb: "booster" (xgboost) or "compiled" (NumPy trees, fastest for single rows)
+        # tf:  "keras", "numpy" (no TensorFlow import) or "tf_function"
+        # bundle: single-file model bundle (ml/bundle.py), replaces models_path
+        xgb_backend = xgb_backend or os.environ.get("NEUROSENSE_XGB_BACKEND", "booster")
+        tf_backend = tf_backend or os.environ.get("NEUROSENSE_TF_BACKEND", "keras")
+        bundle = bundle or os.environ.get("NEUROSENSE_MODEL_BUNDLE")
+        if bundle:
+            from ml.bundle import BundleRegistry
+            self.registry = BundleRegistry(bundle)
+        else:
+            self.registry = ModelRegistry(models_path, xgb_backend=xgb_backend,
+                                          tf_backend=tf_backend)
+        self.models_path = self.registry.models_path
+        self.model_version = self._version()
+        self.fallback_mode = False
+        self._layouts = {}
 
-        except Exception as e:
-            print("❌ MODEL LOAD ERROR:", e)
+        # cache="auto" → configured from NEUROSENSE_PREDICTION_CACHE_*; None disables
+        self.cache = PredictionCache.from_env() if cache == "auto" else cache
+        # mri="auto" → shared MRIFeatureCache (ml/mri_features.py); None ignores scans
+        self.mri = get_mri_features() if mri == "auto" else mri
+
+        if not any(self.registry.available(m) for m in self.ACTIVE_MODELS):
+            print("⚠️ No ML models found → fallback mode enabled")
             self.fallback_mode = True
 
     # =============================
-    # LOADERS
+    # MODEL ACCESS (LAZY)
+    # =============================
+    @property
+    def models(self):
+        """Models loaded so far, by name"""
+        return self.registry.models
+
+    def _model(self, name):
+        """Return a loaded model, loading it on first use (None if unavailable)"""
+        return self.registry.get(name)
+
+    def preload(self, names=None):
+        """Load models now instead of on first request; returns load times (ms)"""
+        return self.registry.preload(names or self.ACTIVE_MODELS + self.SCALERS)
+
+    def reload(self):
+        """Drop loaded models and cached predictions; models reload on next use"""
+        self.registry.clear()
+        self._layouts = {}
+        self.model_version = self._version()
+        if self.cache is not None:
+            self.cache.clear()
+
+    def _version(self):
+        # cached scores depend on the artifacts and on how features map onto them
+        return f"{self.registry.version()}-{FEATURE_SPEC.fingerprint}"
+
+    def _check_version(self):
+        """Reload when a model file was replaced on disk (size or mtime changed)"""
+        if self._version() != self.model_version:
+            print("↻ Model files changed on disk → reloading models and cached scores")
+            self.reload()
+
+    def _layout(self, name, model):
+        """Compiled InputLayout for a model (None → canonical matrix as is)"""
+        if name not in self._layouts:
+            spec = MODEL_INPUTS.get(name)
+            scaler = None
+            if spec is not None and spec.scaler:
+                scaler = self._model(spec.scaler)
+                if scaler is None:
+                    print(f"⚠️ Scaler {spec.scaler} unavailable, {name} gets unscaled features")
+            self._layouts[name] = spec.compile(FEATURE_SPEC, model, scaler) if spec else None
+        return self._layouts[name]
+
+    def _model_input(self, name, model, X):
+        """(model input matrix, feature names to pass along or None)"""
+        layout = self._layout(name, model)
+        if layout is None:
+            return X, None
+        names = layout.columns if getattr(model, "feature_names", None) else None
+        return layout.apply(X), names
+
+    # =============================
+    # XGBOOST PREDICTION
     # =============================
-    def _load_xgb(self, name, file):
-        path = self.models_path / file
-        if path.exists():
-            try:
-                model = xgb.Booster()
-                model.load_model(str(path))
-                self.models[name] = model
-                print(f"✔ Loaded XGBoost: {name}")
-            except:
-                pass
-
-    def _load_lgbm(self, name, file):
-        path = self.models_path / file
-        if path.exists():
-            try:
-                with open(path, "rb") as f:
-                    self.models[name] = pickle.load(f)
-                print(f"✔ Loaded LightGBM: {name}")
-            except:
-                pass
-
-    def _load_tf(self, name, file):
-        """Load TensorFlow / Keras Model"""
-        path = self.models_path / file
-        if path.exists():
-            try:
-                self.models[name] = tf.keras.models.load_model(path)
-                print(f"✔ Loaded TensorFlow Model: {name}")
-            except Exception as e:
-                print("TensorFlow load error:", e)
-
-    def _load_scaler(self, name, file):
-        path = self.models_path / file
-        if path.exists():
-            with open(path, "rb") as f:
-                self.scalers[name] = pickle.load(f)
-            print(f"✔ Loaded Scaler: {name}")
+    def _predict_xgb(self, name, fv):
+        """Predict a single feature vector using an XGBoost booster"""
+        out = self._predict_xgb_batch(name, fv.reshape(1, -1))
+        return None if out is None else float(out[0])
+
+    def _predict_xgb_batch(self, name, X):
+        """Predict an (N, F) feature matrix with one DMatrix call"""
+        model = self._model(name)
+        if model is None:
+            return None
+        try:
+            Xm, names = self._model_input(name, model, X)
+            with MODEL_SECONDS.time(model=name):
+                if isinstance(model, CompiledBooster):
+                    out = model.predict(Xm, feature_names=names)
+                else:
+                    xgb = import_framework("xgboost")
+                    out = model.predict(xgb.DMatrix(Xm, feature_names=names))
+            return np.asarray(out, dtype=np.float64).reshape(len(X))
+        except Exception as e:
+            print("XGB Prediction Error:", e)
+            return None
 
     # =============================
     # TENSORFLOW PREDICTION
     # =============================
     def _predict_tf(self, name, fv):
-        """Predict using TensorFlow model"""
-        if name not in self.models:
+        """Predict a single feature vector using TensorFlow model"""
+        out = self._predict_tf_batch(name, fv.reshape(1, -1))
+        return None if out is None else float(out[0])
+
+    def _predict_tf_batch(self, name, X):
+        """Predict an (N, F) feature matrix with one Keras call"""
+        model = self._model(name)
+        if model is None:
             return None
         try:
-            model = self.models[name]
-            fv = fv.reshape(1, -1)
-            result = model.predict(fv)[0][0]
-            return float(result)
+            Xm, _ = self._model_input(name, model, X)
+            with MODEL_SECONDS.time(model=name):
+                out = model.predict(Xm, batch_size=len(X), verbose=0)
+            return np.asarray(out, dtype=np.float64).reshape(len(X), -1)[:, 0]
         except Exception as e:
             print("TF Prediction Error:", e)
             return None
 
     # =============================
     # DISEASE RISK MODELS
+    # Pass the same `ctx` (see new_context) to several predictors
+    # to share features and model outputs between them.
     # =============================
-    def predict_alzheimers_risk(self, f):
-        if self.fallback_mode:
-            return self._fallback_risk("Alzheimer's", f)
-
-        fv = self._extract_features(f)
-        p1 = self._predict_xgb("alzheimer_model1_xgb", fv)
-        p2 = self._predict_tf("tf_neuro_model", fv)  # ← TensorFlow added
-
-        if p1 is None and p2 is None:
-            return self._fallback_risk("Alzheimer's", f)
+    def new_context(self, forms):
+        return InferenceContext(self, forms)
 
-        score = float(np.mean([p for p in [p1, p2] if p is not None]) * 100)
-
-        return RiskPrediction(
-            disease="Alzheimer's",
-            score=score,
-            confidence=90,
-            risk_level=self._risk(score),
-            top_factors=self._top_factors(f, score)
-        )
+    def predict_alzheimers_risk(self, f, ctx=None):
+        return self.predict_alzheimers_risk_batch([f], ctx)[0]
 
-    def predict_parkinsons_risk(self, f):
-        if self.fallback_mode:
-            return self._fallback_risk("Parkinson's", f)
+    def predict_parkinsons_risk(self, f, ctx=None):
+        return self.predict_parkinsons_risk_batch([f], ctx)[0]
 
-        fv = self._extract_features(f)
-        p1 = self._predict_xgb("parkinsons_model1_xgb", fv)
-        p2 = self._predict_tf("tf_neuro_model", fv)
+    def predict_dementia_risk(self, f, ctx=None):
+        return self.predict_dementia_risk_batch([f], ctx)[0]
 
-        if p1 is None and p2 is None:
-            return self._fallback_risk("Parkinson's", f)
+    def predict_alzheimers_risk_batch(self, forms, ctx=None):
+        return (ctx or self.new_context(forms)).risks("alzheimers")
 
-        score = float(np.mean([p for p in [p1, p2] if p is not None]) * 100)
+    def predict_parkinsons_risk_batch(self, forms, ctx=None):
+        return (ctx or self.new_context(forms)).risks("parkinsons")
 
-        return RiskPrediction(
-            disease="Parkinson's",
-            score=score,
-            confidence=88,
-            risk_level=self._risk(score),
-            top_factors=self._top_factors(f, score)
-        )
+    def predict_dementia_risk_batch(self, forms, ctx=None):
+        return (ctx or self.new_context(forms)).risks("dementia")
 
-    def predict_dementia_risk(self, f):
+    def _compute_risks(self, key, ctx):
+        """
+        Score the context's N forms for one disease: one (N, F) feature
+        matrix, one call per model, N RiskPrediction objects back.
+        """
+        disease, xgb_name, confidence = DISEASE_MODELS[key]
+        forms = ctx.forms
+        if not forms:
+            return []
         if self.fallback_mode:
-            return self._fallback_risk("Dementia", f)
-
-        fv = self._extract_features(f)
-        d1 = self._predict_xgb("dementia_oasis_model", fv)
-        d2 = self._predict_tf("tf_neuro_model", fv)
-
-        if d1 is None and d2 is None:
-            return self._fallback_risk("Dementia", f)
-
-        score = float(np.mean([p for p in [d1, d2] if p is not None]) * 100)
+            PREDICTIONS.inc(len(forms), disease=key, source="fallback")
+            return [self._fallback_risk(disease, f) for f in forms]
+
+        scores = ctx.scores()[key]
+        fallbacks = int(np.isnan(scores).sum())
+        PREDICTIONS.inc(len(forms) - fallbacks, disease=key, source="model")
+        if fallbacks:
+            PREDICTIONS.inc(fallbacks, disease=key, source="fallback")
+
+        return [
+            self._fallback_risk(disease, f) if np.isnan(score) else
+            RiskPrediction(
+                disease=disease,
+                score=float(score),
+                confidence=confidence,
+                risk_level=self._risk(score),
+                top_factors=self._top_factors(f, score)
+            )
+            for f, score in zip(forms, scores)
+        ]
 
-        return RiskPrediction(
-            disease="Dementia",
-            score=score,
-            confidence=87,
-            risk_level=self._risk(score),
-            top_factors=self._top_factors(f, score)
-        )
+    # =============================
+    # ENSEMBLE SCORES
+    # =============================
+    def _scores(self, X):
+        """Per-disease scores for an (N, F) matrix, served from the cache where possible"""
+        self._check_version()
+        if self.cache is None or not len(X):
+            return self._score_matrix(X)
+
+        keys = [make_key(row, self.model_version) for row in X]
+        cached = self.cache.get_many(keys)
+        miss = [i for i, v in enumerate(cached) if v is None]
+
+        if miss:
+            fresh = self._score_matrix(X[miss])
+            values = [
+                {k: None if np.isnan(fresh[k][j]) else float(fresh[k][j]) for k in DISEASE_MODELS}
+                for j in range(len(miss))
+            ]
+            self.cache.put_many(zip([keys[i] for i in miss], values))
+            for i, v in zip(miss, values):
+                cached[i] = v
+
+        return {
+            k: np.array([np.nan if v[k] is None else v[k] for v in cached], dtype=np.float64)
+            for k in DISEASE_MODELS
+        }
+
+    def _score_matrix(self, X):
+        """
+        Ensemble score (0-100) per disease for each row. Each model runs
+        once on X; a disease whose models are all unavailable is NaN.
+        """
+        outputs = {}
+
+        def run(name, predict):
+            if name not in outputs:
+                outputs[name] = predict(name, X)
+            return outputs[name]
+
+        scores = {}
+        for key, (_, xgb_name, _) in DISEASE_MODELS.items():
+            p1 = run(xgb_name, self._predict_xgb_batch)
+            p2 = run("tf_neuro_model", self._predict_tf_batch)
+            preds = [p for p in [p1, p2] if p is not None]
+            scores[key] = np.mean(preds, axis=0) * 100 if preds else np.full(len(X), np.nan)
+        return scores
 
     # =============================
     # MULTIMODAL DIAGNOSTIC
     # =============================
-    def predict_diagnostic(self, f):
-        alz = self.predict_alzheimers_risk(f)
-        dem = self.predict_dementia_risk(f)
-        park = self.predict_parkinsons_risk(f)
+    def predict_assessment(self, f):
+        """(alzheimers, parkinsons, dementia, diagnostic) for one form, models run once"""
+        ctx = self.new_context([f])
+        return (ctx.risks("alzheimers")[0], ctx.risks("parkinsons")[0],
+                ctx.risks("dementia")[0], ctx.diagnostics()[0])
+
+    def predict_diagnostic(self, f, ctx=None):
+        return self.predict_diagnostic_batch([f], ctx)[0]
+
+    def predict_diagnostic_batch(self, forms, ctx=None):
+        return (ctx or self.new_context(forms)).diagnostics()
+
+    def _fallback_diagnostic(self, f):
+        return self._diagnose(
+            self._fallback_risk("Alzheimer's", f),
+            self._fallback_risk("Dementia", f),
+            self._fallback_risk("Parkinson's", f),
+            self._mri_features([f])[0]
+        )
+
+    def _mri_features(self, forms):
+        """
+        Features of each form's uploaded scan (mri_file_path), from the cache
+        only: this runs on the batcher thread, so it never waits for an
+        extraction. A missing one is started and cached for the next call;
+        request threads wait for it first (app.await_mri_features).
+        """
+        if self.mri is None:
+            return [None] * len(forms)
+        try:
+            return self.mri.features_many([f.get("mri_file_path") for f in forms], wait=0)
+        except Exception as e:
+            print("⚠️ MRI feature lookup failed:", e)
+            return [None] * len(forms)
 
+    def _diagnose(self, alz, dem, park, mri=None):
         preds = sorted(
             [(alz.disease, alz.score),
              (dem.disease, dem.score),
@@ -221,35 +404,41 @@ class MLModelManager:
 
         primary = preds[0][0]
 
-        probs = {d[0]: d[1] / sum(p[1] for p in preds) for d in preds}
+        total = sum(p[1] for p in preds)
+        probs = {d[0]: d[1] / total if total else 1 / len(preds) for d in preds}
+
+        findings = [f"Primary risk detected: {primary}"]
+        if mri:
+            findings.append(f"MRI: head volume {mri['mri_volume_ml']:.0f} ml, "
+                            f"left/right asymmetry {mri['mri_lr_asymmetry']:+.1%}")
 
         return DiagnosticResult(
             primary_diagnosis=primary,
             diagnosis_confidence=round(preds[0][1] / 100, 2),
             secondary_diagnoses=[p[0] for p in preds[1:]],
             disease_probabilities=probs,
-            key_findings=[f"Primary risk detected: {primary}"],
+            key_findings=findings,
             recommendations=[
                 "Consult neurologist",
-                "Consider MRI/CT scan",
+                "Review uploaded MRI" if mri else "Consider MRI/CT scan",
                 "Maintain lifestyle modifications"
-            ]
+            ],
+            mri_features=mri
         )
 
     # =============================
     # HELPERS
     # =============================
     def _extract_features(self, f):
-        return np.array([
-            float(f.get("age", 65)),
-            float(f.get("weight", 70)),
-            float(f.get("height", 170)),
-            1 if f.get("gender") == "Male" else 0,
-            float(f.get("alcoholConsumption", 0)),
-            1 if "Alzheimer's Disease" in f.get("familyHistory", []) else 0,
-            1 if "Parkinson's Disease" in f.get("familyHistory", []) else 0,
-            1 if "Dementia" in f.get("familyHistory", []) else 0,
-        ], dtype=np.float32)
+        return np.array(self._feature_row(f), dtype=np.float32)
+
+    def _extract_features_batch(self, forms):
+        """Stack N forms into one (N, F) float32 matrix"""
+        with FEATURE_SECONDS.time():
+            return FEATURE_SPEC.extract_many(forms)
+
+    def _feature_row(self, f):
+        return FEATURE_SPEC.extract(f)
 
     def _risk(self, s):
         return "high" if s >= 70 else "moderate" if s >= 40 else "low"
@@ -283,9 +472,35 @@ class MLModelManager:
 # SINGLETON
 # =============================
 _model_manager = None
+_predictor = None
 
 def get_model_manager():
     global _model_manager
     if _model_manager is None:
         _model_manager = MLModelManager()
+        _register_metrics(_model_manager)
     return _model_manager
+
+def _register_metrics(manager):
+    """Expose cache and model-load stats of the shared manager on /metrics"""
+    REGISTRY.gauge_func(
+        "neurosense_model_load_seconds", "Time taken to load each model",
+        lambda: {(n,): ms / 1000 for n, ms in manager.registry.load_times.items()},
+        labels=("model",))
+    REGISTRY.gauge_func(
+        "neurosense_prediction_cache", "Prediction cache counters",
+        lambda: {} if manager.cache is None else {
+            (k,): v for k, v in manager.cache.stats().items() if isinstance(v, (int, float))},
+        labels=("stat",))
+
+def get_predictor():
+    """
+    Model manager for request handlers: wrapped in a MicroBatcher when
+    NEUROSENSE_MICROBATCH_WINDOW_MS is set, otherwise the manager itself.
+    """
+    global _predictor
+    if _predictor is None:
+        from ml.batcher import MicroBatcher
+        manager = get_model_manager()
+        _predictor = MicroBatcher.from_env(manager) or manager
+    return _predictor
@@ -0,0 +1,215 @@
+"""
+Model Registry
+Describes every artifact in ml/Models and loads it on first use.
+ML frameworks are imported only when a model that needs them is loaded.
+"""
+
+import hashlib
+import importlib
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Any, Optional, List
+
+
+# -----------------------------
+# FRAMEWORK IMPORTS (DEFERRED)
+# -----------------------------
+_frameworks = {}
+
+
+def import_framework(module):
+    """Import an ML framework once, on demand (e.g. "xgboost")"""
+    if module not in _frameworks:
+        _frameworks[module] = importlib.import_module(module)
+    return _frameworks[module]
+
+
+# -----------------------------
+# LOADERS
+# -----------------------------
+def _load_xgb(path):
+    xgb = import_framework("xgboost")
+    model = xgb.Booster()
+    model.load_model(str(path))
+    return model
+
+
+def _load_xgb_compiled(path):
+    from ml.tree_compiler import CompiledBooster
+    return CompiledBooster.load(path)
+
+
+def _load_lgbm(path):
+    import_framework("lightgbm")
+    return _load_pickle(path)
+
+
+def _load_tf(path):
+    tf = import_framework("tensorflow")
+    return tf.keras.models.load_model(path)
+
+
+def _load_tf_numpy(path):
+    from ml.keras_numpy import NumpyDenseModel
+    return NumpyDenseModel.from_h5(path)
+
+
+def _load_tf_function(path):
+    from ml.keras_numpy import TracedKerasModel
+    return TracedKerasModel.from_h5(path)
+
+
+def _load_pickle(path):
+    # the .pkl artifacts were written with joblib (which also reads plain pickles)
+    joblib = import_framework("joblib")
+    return joblib.load(path)
+
+
+LOADERS = {
+    "xgb": ("XGBoost", _load_xgb),
+    "xgb_compiled": ("XGBoost (compiled)", _load_xgb_compiled),
+    "lgbm": ("LightGBM", _load_lgbm),
+    "tf": ("TensorFlow Model", _load_tf),
+    "tf_numpy": ("TensorFlow Model (NumPy)", _load_tf_numpy),
+    "tf_function": ("TensorFlow Model (tf.function)", _load_tf_function),
+    "scaler": ("Scaler", _load_pickle),
+}
+
+
+# (spec kind, backend) → loader kind; the default backend keeps the spec kind
+BACKENDS = {
+    "xgb": {"booster": "xgb", "compiled": "xgb_compiled"},
+    "tf": {"keras": "tf", "numpy": "tf_numpy", "tf_function": "tf_function"},
+}
+
+
+# loaders whose results are plain Python / NumPy objects, safe to load before fork
+FORK_SAFE_KINDS = {"xgb_compiled", "tf_numpy", "scaler"}
+
+
+# -----------------------------
+# ARTIFACT DESCRIPTIONS
+# -----------------------------
+@dataclass
+class ModelSpec:
+    name: str
+    file: str
+    kind: str
+
+
+MODEL_SPECS = [
+    # XGBoost Models
+    ModelSpec("alzheimer_model1_xgb", "alzheimer_model1_xgb.json", "xgb"),
+    ModelSpec("parkinsons_model1_xgb", "parkinsons_model1_xgb.json", "xgb"),
+    ModelSpec("parkinsons_model2_xgb", "parkinsons_model2_xgb.json", "xgb"),
+    ModelSpec("dementia_oasis_model", "dementia_oasis_model.json", "xgb"),
+    ModelSpec("dementia_progression_model", "dementia_progression_model.json", "xgb"),
+
+    # LightGBM Models
+    ModelSpec("alzheimer_model2_lgbm", "alzheimer_model2_lgbm.pkl", "lgbm"),
+
+    # TensorFlow Model
+    ModelSpec("tf_neuro_model", "tf_multimodal_model.h5", "tf"),
+
+    # Scalers
+    ModelSpec("dementia_scaler", "dementia_scaler.pkl", "scaler"),
+    ModelSpec("parkinsons_scaler1", "parkinsons_scaler1.pkl", "scaler"),
+]
+
+
+# -----------------------------
+# REGISTRY
+# -----------------------------
+class ModelRegistry:
+    """
+    Lazy, thread-safe model store. `get(name)` loads the artifact the
+    first time it is asked for; a failed load is remembered and
+    returns None so callers can fall back.
+
+    xgb_backend="compiled" loads XGBoost JSON models as NumPy
+    CompiledBooster objects instead of xgboost.Booster; tf_backend
+    "numpy" / "tf_function" replaces the Keras predict loop.
+    """
+
+    def __init__(self, models_path, specs: Optional[List[ModelSpec]] = None,
+                 xgb_backend: str = "booster", tf_backend: str = "keras"):
+        self.backends = {"xgb": xgb_backend, "tf": tf_backend}
+        for kind, backend in self.backends.items():
+            if backend not in BACKENDS[kind]:
+                raise ValueError(f"Unknown {kind}_backend: {backend}")
+        self.models_path = Path(models_path)
+        self.specs = {s.name: s for s in (specs or MODEL_SPECS)}
+        self.models: Dict[str, Any] = {}
+        self.load_times: Dict[str, float] = {}
+        self.errors: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def path(self, name):
+        return self.models_path / self.specs[name].file
+
+    def loader_kind(self, name):
+        """Loader actually used for `name` under the configured backends"""
+        kind = self.specs[name].kind
+        return BACKENDS[kind][self.backends[kind]] if kind in BACKENDS else kind
+
+    def available(self, name):
+        """True if the artifact exists on disk (no loading)"""
+        return name in self.specs and self.path(name).exists()
+
+    def get(self, name):
+        if name in self.models:
+            return self.models[name]
+        if name in self.errors or not self.available(name):
+            return None
+
+        with self._lock:
+            if name not in self.models and name not in self.errors:
+                self._load(name)
+        return self.models.get(name)
+
+    def preload(self, names=None):
+        """Load the given models (default: every available artifact) now"""
+        for name in names or list(self.specs):
+            self.get(name)
+        return dict(self.load_times)
+
+    def version(self):
+        """Fingerprint of backends and artifact files (size + mtime)"""
+        h = hashlib.sha1(repr(sorted(self.backends.items())).encode())
+        for name in sorted(self.specs):
+            if self.available(name):
+                st = self.path(name).stat()
+                h.update(f"{name}:{st.st_size}:{st.st_mtime_ns};".encode())
+        return h.hexdigest()[:16]
+
+    def clear(self):
+        with self._lock:
+            self.models.clear()
+            self.load_times.clear()
+            self.errors.clear()
+
+    def status(self):
+        return {
+            name: {
+                "file": spec.file,
+                "available": self.available(name),
+                "loaded": name in self.models,
+                "load_ms": self.load_times.get(name),
+                "error": self.errors.get(name),
+            }
+            for name, spec in self.specs.items()
+        }
+
+    def _load(self, name):
+        label, loader = LOADERS[self.loader_kind(name)]
+        start = time.perf_counter()
+        try:
+            self.models[name] = loader(self.path(name))
+        except Exception as e:
+            self.errors[name] = str(e)
+            print(f"❌ {label} load error ({name}):", e)
+            return
+        self.load_times[name] = (time.perf_counter() - start) * 1000
+        print(f"✔ Loaded {label}: {name} ({self.load_times[name]:.1f} ms)")
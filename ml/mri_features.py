@@ -0,0 +1,393 @@
+"""
+MRI Volume Features
+Summary features of an uploaded scan for the diagnostic: intensity
+statistics of the head, its volume, left/right asymmetry and the mean
+intensity of each octant, all from a downsampled copy of the volume.
+
+Volumes are memory-mapped, never read whole: NIfTI-1 (.nii, .nii.gz)
+and NumPy (.npy) arrays are sampled on a grid of at most MAX_GRID voxels
+per axis, so only the pages under the grid are touched. A .nii.gz is
+decompressed once into an anonymous temp file first.
+
+Extraction runs in a small process pool, off the request thread; it is
+started when the scan is uploaded. Results are cached by the scan's
+SHA-256 (the name of its object in storage/mri_store.py), in memory and
+as JSON on disk, so a diagnostic never reads the volume again. A
+diagnostic request waits for an extraction still in progress before its
+prediction is queued; inference itself only reads the cache.
+
+    NEUROSENSE_MRI_FEATURES=0           disable (diagnostics ignore scans)
+    NEUROSENSE_MRI_FEATURES_DIR         default instance/mri_features
+    NEUROSENSE_MRI_FEATURE_WORKERS      extraction processes (default 1)
+    NEUROSENSE_MRI_FEATURE_WAIT         seconds a diagnostic request waits for a result (default 2)
+
+    python -m ml.mri_features scan.nii.gz      # print the features of one file
+"""
+
+import gzip
+import json
+import math
+import multiprocessing
+import os
+import re
+import shutil
+import struct
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, wait as wait_all
+from itertools import product
+
+import numpy as np
+
+from ml.metrics import REGISTRY
+
+# bump when the features change: cached results are recomputed
+FEATURE_FORMAT = 1
+
+# downsampled grid size per axis
+MAX_GRID = 64
+
+# octants in voxel index order (i, j, k halves), e.g. "mri_region_010"
+REGIONS = ["".join(map(str, r)) for r in product((0, 1), repeat=3)]
+
+MRI_FEATURES = [
+    "mri_intensity_mean",       # mean head intensity (scanner units)
+    "mri_intensity_cv",         # std / mean inside the head
+    "mri_p05", "mri_p50", "mri_p95",   # head intensity percentiles / mean
+    "mri_foreground_fraction",  # share of the field of view inside the head
+    "mri_volume_ml",            # head volume
+    "mri_lr_asymmetry",         # (first-axis lower half - upper half) / mean
+] + [f"mri_region_{r}" for r in REGIONS]   # octant mean / mean
+
+FEATURES = REGISTRY.counter(
+    "neurosense_mri_features_total", "MRI feature lookups by outcome (hit, extracted, pending, failed, missing)",
+    labels=("outcome",))
+EXTRACT_SECONDS = REGISTRY.histogram(
+    "neurosense_mri_feature_seconds", "Time from submitting a scan to having its features",
+    buckets=[0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120])
+
+_SHA256 = re.compile(r"^[0-9a-f]{64}")
+
+# NIfTI-1 datatype codes
+NIFTI_DTYPES = {
+    2: "u1", 4: "i2", 8: "i4", 16: "f4", 64: "f8",
+    256: "i1", 512: "u2", 768: "u4", 1024: "i8", 1280: "u8",
+}
+
+
+class UnsupportedVolume(ValueError):
+    pass
+
+
+# -----------------------------
+# READING
+# -----------------------------
+def open_nifti(path, fileobj=None):
+    """(memory-mapped voxel array, voxel size in mm, scl_slope, scl_inter)"""
+    if fileobj is not None:
+        header = fileobj.read(348)
+        fileobj.seek(0)
+    else:
+        with open(path, "rb") as f:
+            header = f.read(348)
+    if len(header) < 348:
+        raise UnsupportedVolume("Truncated NIfTI header")
+
+    for endian in "<>":
+        if struct.unpack(endian + "i", header[:4])[0] == 348:
+            break
+    else:
+        raise UnsupportedVolume("Not a NIfTI-1 file")
+
+    dim = struct.unpack(endian + "8h", header[40:56])
+    datatype = struct.unpack(endian + "h", header[70:72])[0]
+    pixdim = struct.unpack(endian + "8f", header[76:108])
+    vox_offset = struct.unpack(endian + "f", header[108:112])[0]
+    slope, inter = struct.unpack(endian + "2f", header[112:120])
+
+    if datatype not in NIFTI_DTYPES:
+        raise UnsupportedVolume(f"Unsupported NIfTI datatype {datatype}")
+    ndim = dim[0]
+    if not 1 <= ndim <= 7:
+        raise UnsupportedVolume(f"Bad NIfTI dimensions {dim}")
+    shape = tuple(max(1, d) for d in dim[1:1 + ndim])
+
+    volume = np.memmap(fileobj if fileobj is not None else path,
+                       dtype=np.dtype(endian + NIFTI_DTYPES[datatype]), mode="r",
+                       offset=int(vox_offset), shape=shape, order="F")
+    voxel = tuple(abs(p) or 1.0 for p in pixdim[1:4])
+    return volume, voxel, slope, inter
+
+
+def sample(volume, grid=MAX_GRID):
+    """
+    float32 copy of the first 3D volume on a regular grid of at most
+    `grid` voxels per axis, and the sampling step
+    """
+    shape = tuple(volume.shape[:3]) + (1,) * (3 - min(volume.ndim, 3))
+    step = max(1, math.ceil(max(shape) / grid))
+    index = tuple(slice(None, None, step) for _ in range(min(volume.ndim, 3)))
+    index += (0,) * max(0, volume.ndim - 3)
+    out = np.array(volume[index], dtype=np.float32)   # copies only the sampled voxels
+    return out.reshape(tuple(len(range(0, n, step)) for n in shape)), step
+
+
+# -----------------------------
+# FEATURES
+# -----------------------------
+def summarize(d, voxel_mm=(1.0, 1.0, 1.0), step=1):
+    """Feature dict (MRI_FEATURES order) of a sampled 3D volume"""
+    values = d[np.isfinite(d)]
+    if not values.size:
+        raise UnsupportedVolume("Volume has no finite voxels")
+
+    # crude head mask: anything brighter than 10% of the near-maximum
+    mask = np.isfinite(d) & (d > 0.1 * np.percentile(values, 99))
+    if not mask.any():
+        mask = np.isfinite(d)
+    head = d[mask].astype(np.float64)
+    mean = float(head.mean())
+    scale = mean if mean else 1.0
+
+    p05, p50, p95 = np.percentile(head, [5, 50, 95]) / scale
+    voxel_ml = float(np.prod(voxel_mm)) * step ** 3 / 1000.0
+
+    def region_mean(block, block_mask):
+        return float(block[block_mask].mean()) / scale if block_mask.any() else 0.0
+
+    halves = [(slice(0, (n + 1) // 2), slice((n + 1) // 2, None)) for n in d.shape]
+    lower, upper = halves[0]
+    features = {
+        "mri_intensity_mean": mean,
+        "mri_intensity_cv": float(head.std()) / scale,
+        "mri_p05": float(p05),
+        "mri_p50": float(p50),
+        "mri_p95": float(p95),
+        "mri_foreground_fraction": float(mask.mean()),
+        "mri_volume_ml": float(mask.sum()) * voxel_ml,
+        "mri_lr_asymmetry": region_mean(d[lower], mask[lower]) - region_mean(d[upper], mask[upper]),
+    }
+    for name in REGIONS:
+        block = tuple(halves[axis][int(bit)] for axis, bit in enumerate(name))
+        features[f"mri_region_{name}"] = region_mean(d[block], mask[block])
+    return features
+
+
+def extract_features(path, tmp_dir=None):
+    """Features of one volume file (.nii, .nii.gz or .npy); reads only the sampled voxels"""
+    name = path.lower()
+    if name.endswith(".npy"):
+        d, step = sample(np.load(path, mmap_mode="r"))
+        return summarize(d, step=step)
+
+    if name.endswith(".nii.gz"):
+        # gzip cannot be mapped: inflate once into an unnamed temp file
+        with tempfile.TemporaryFile(dir=tmp_dir) as raw:
+            with gzip.open(path, "rb") as src:
+                shutil.copyfileobj(src, raw, 1 << 20)
+            raw.flush()
+            raw.seek(0)
+            volume, voxel, slope, inter = open_nifti(path, fileobj=raw)
+            d, step = sample(volume)
+            del volume
+    elif name.endswith(".nii"):
+        volume, voxel, slope, inter = open_nifti(path)
+        d, step = sample(volume)
+        del volume
+    else:
+        raise UnsupportedVolume(f"No reader for {os.path.basename(path)}")
+
+    if slope and math.isfinite(slope):
+        d = d * np.float32(slope) + np.float32(inter)
+    return summarize(d, voxel, step)
+
+
+def _extract_job(volume_path, cache_path):
+    """Process-pool entry point: extract, then write the JSON cache entry atomically"""
+    folder = os.path.dirname(cache_path)
+    os.makedirs(folder, exist_ok=True)
+    features = extract_features(volume_path, tmp_dir=folder)
+    tmp = f"{cache_path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump({"format": FEATURE_FORMAT, "features": features}, f)
+    os.replace(tmp, cache_path)
+    return features
+
+
+def content_hash(ref):
+    """
+    SHA-256 named by an MRI reference: the hash itself or the path of a
+    stored object (objects/ab/<sha>.nii.gz). Anything else is None; paths
+    sent by clients are never opened directly.
+    """
+    if not ref:
+        return None
+    match = _SHA256.match(os.path.basename(str(ref)).lower())
+    return match.group(0) if match else None
+
+
+# -----------------------------
+# CACHE + PROCESS POOL
+# -----------------------------
+class MRIFeatureCache:
+
+    def __init__(self, store, root="instance/mri_features", workers=1, wait=2.0, maxsize=256):
+        self.store = store
+        self.root = root
+        self.workers = workers
+        self.wait = wait
+        self.maxsize = maxsize
+        self._memory = OrderedDict()
+        self._executor = None
+        self._pid = None
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        if os.environ.get("NEUROSENSE_MRI_FEATURES", "1") == "0":
+            return None
+        from storage.mri_store import MRIStore
+        return cls(
+            MRIStore.from_env(),
+            root=os.environ.get("NEUROSENSE_MRI_FEATURES_DIR", "instance/mri_features"),
+            workers=int(os.environ.get("NEUROSENSE_MRI_FEATURE_WORKERS", 1)),
+            wait=float(os.environ.get("NEUROSENSE_MRI_FEATURE_WAIT", 2)),
+        )
+
+    def path(self, sha256):
+        return os.path.join(self.root, sha256[:2], f"{sha256}.json")
+
+    # =============================
+    # LOOKUP
+    # =============================
+    def get(self, sha256):
+        """Cached features (memory, then disk) or None"""
+        with self._lock:
+            if sha256 in self._memory:
+                self._memory.move_to_end(sha256)
+                return self._memory[sha256]
+        try:
+            with open(self.path(sha256)) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get("format") != FEATURE_FORMAT:
+            return None
+        self._remember(sha256, entry["features"])
+        return entry["features"]
+
+    def _remember(self, sha256, features):
+        with self._lock:
+            self._memory[sha256] = features
+            self._memory.move_to_end(sha256)
+            while len(self._memory) > self.maxsize:
+                self._memory.popitem(last=False)
+
+    def features_many(self, refs, wait=None):
+        """
+        Features for each MRI reference (see content_hash), None where
+        there is no scan, it is unreadable, or extraction takes longer
+        than `wait` seconds (it carries on and is cached for next time).
+        """
+        out = [None] * len(refs)
+        pending = {}
+        for i, ref in enumerate(refs):
+            sha = content_hash(ref)
+            if sha is None:
+                continue
+            cached = self.get(sha)
+            if cached is not None:
+                FEATURES.inc(outcome="hit")
+                out[i] = cached
+                continue
+            future = self.submit(sha)
+            if future is None:
+                FEATURES.inc(outcome="missing")
+            else:
+                pending[i] = future
+
+        if pending:
+            wait_all(pending.values(), timeout=self.wait if wait is None else wait)
+            for i, future in pending.items():
+                if not future.done():
+                    FEATURES.inc(outcome="pending")
+                elif future.exception() is not None:
+                    FEATURES.inc(outcome="failed")
+                else:
+                    FEATURES.inc(outcome="extracted")
+                    out[i] = future.result()
+        return out
+
+    def features(self, ref, wait=None):
+        return self.features_many([ref], wait)[0]
+
+    # =============================
+    # EXTRACTION
+    # =============================
+    def _pool(self):
+        # a pool does not survive a fork; each process gets its own
+        if self._executor is None or self._pid != os.getpid():
+            with self._lock:
+                if self._executor is None or self._pid != os.getpid():
+                    # forkserver: workers start from a clean process, not a copy
+                    # of a threaded web worker
+                    context = multiprocessing.get_context(
+                        "forkserver" if "forkserver" in multiprocessing.get_all_start_methods()
+                        else "spawn")
+                    self._executor = ProcessPoolExecutor(self.workers, mp_context=context)
+                    self._inflight = {}
+                    self._pid = os.getpid()
+        return self._executor
+
+    def submit(self, sha256):
+        """Future for the scan's features, extracting it if needed; None if no such scan"""
+        volume = self.store.find(sha256)
+        if volume is None:
+            return None
+        pool = self._pool()
+        with self._lock:
+            future = self._inflight.get(sha256)
+            started = None
+            if future is None:
+                started = time.perf_counter()
+                future = pool.submit(_extract_job, volume, self.path(sha256))
+                self._inflight[sha256] = future
+        if started is not None:
+            # outside the lock: an extraction that is already done runs the callback here
+            future.add_done_callback(lambda f: self._done(sha256, f, started))
+        return future
+
+    def _done(self, sha256, future, started):
+        with self._lock:
+            self._inflight.pop(sha256, None)
+        if future.exception() is not None:
+            print(f"⚠️ MRI feature extraction failed for {sha256[:12]}:", future.exception())
+            return
+        EXTRACT_SECONDS.observe(time.perf_counter() - started)
+        self._remember(sha256, future.result())
+
+
+_cache = None
+_cache_loaded = False
+
+
+def get_mri_features():
+    """Shared MRIFeatureCache of this process (None when disabled)"""
+    global _cache, _cache_loaded
+    if not _cache_loaded:
+        _cache = MRIFeatureCache.from_env()
+        _cache_loaded = True
+    return _cache
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        sys.exit("usage: python -m ml.mri_features <volume.nii[.gz]|volume.npy>")
+    started = time.perf_counter()
+    for key, value in extract_features(sys.argv[1]).items():
+        print(f"{key:26s} {value:.4f}")
+    print(f"⏱  {time.perf_counter() - started:.2f}s")
@@ -0,0 +1,152 @@
+"""
+Prediction Cache
+Bounded LRU + TTL cache of per-disease model scores, keyed by the exact
+bytes of the feature vector and the model version. An optional shared
+backend (Redis) lets gunicorn workers reuse each other's results.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from ml.model_registry import import_framework
+
+
+def make_key(row, version):
+    """Canonical cache key: model version + raw float32 feature bytes"""
+    row = np.ascontiguousarray(row, dtype=np.float32) + np.float32(0)   # -0.0 → 0.0
+    return version.encode() + b"|" + row.tobytes()
+
+
+# -----------------------------
+# SHARED BACKEND
+# -----------------------------
+class RedisCacheBackend:
+    """Cross-worker cache tier; values are small JSON documents"""
+
+    def __init__(self, url, ttl=300, prefix="neurosense:pred:"):
+        redis = import_framework("redis")
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix.encode()
+
+    def get_many(self, keys):
+        values = self.client.mget([self.prefix + k for k in keys])
+        return [json.loads(v) if v is not None else None for v in values]
+
+    def set_many(self, items):
+        pipe = self.client.pipeline(transaction=False)
+        for key, value in items:
+            pipe.set(self.prefix + key, json.dumps(value), ex=self.ttl)
+        pipe.execute()
+
+
+# -----------------------------
+# LOCAL LRU / TTL CACHE
+# -----------------------------
+class PredictionCache:
+
+    def __init__(self, maxsize=4096, ttl=300, backend=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.backend = backend
+        self._data = OrderedDict()   # key → (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.shared_hits = 0
+        self.evictions = 0
+
+    @classmethod
+    def from_env(cls):
+        """
+        NEUROSENSE_PREDICTION_CACHE_SIZE  entries per worker (0 disables)
+        NEUROSENSE_PREDICTION_CACHE_TTL   seconds
+        NEUROSENSE_PREDICTION_CACHE_REDIS optional shared backend URL
+        """
+        size = int(os.environ.get("NEUROSENSE_PREDICTION_CACHE_SIZE", 4096))
+        if size <= 0:
+            return None
+        ttl = float(os.environ.get("NEUROSENSE_PREDICTION_CACHE_TTL", 300))
+        url = os.environ.get("NEUROSENSE_PREDICTION_CACHE_REDIS")
+        backend = RedisCacheBackend(url, ttl=int(ttl)) if url else None
+        return cls(maxsize=size, ttl=ttl, backend=backend)
+
+    def get_many(self, keys):
+        """Values for `keys` (None on miss); local tier first, then shared"""
+        now = time.monotonic()
+        out = [None] * len(keys)
+        missing = []
+
+        with self._lock:
+            for i, key in enumerate(keys):
+                entry = self._data.get(key)
+                if entry is not None and entry[0] > now:
+                    self._data.move_to_end(key)
+                    out[i] = entry[1]
+                else:
+                    if entry is not None:
+                        del self._data[key]
+                    missing.append(i)
+
+        if missing and self.backend is not None:
+            try:
+                shared = self.backend.get_many([keys[i] for i in missing])
+            except Exception as e:
+                print("⚠️ Shared prediction cache error:", e)
+                shared = [None] * len(missing)
+            found = [(keys[i], v) for i, v in zip(missing, shared) if v is not None]
+            for i, v in zip(missing, shared):
+                out[i] = v
+            self._store(found)
+            missing = [i for i in missing if out[i] is None]
+        else:
+            found = ()
+
+        with self._lock:
+            self.shared_hits += len(found)
+            self.hits += len(keys) - len(missing)
+            self.misses += len(missing)
+        return out
+
+    def put_many(self, items):
+        items = list(items)
+        self._store(items)
+        if self.backend is not None and items:
+            try:
+                self.backend.set_many(items)
+            except Exception as e:
+                print("⚠️ Shared prediction cache error:", e)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            size, hits, misses = len(self._data), self.hits, self.misses
+            shared_hits, evictions = self.shared_hits, self.evictions
+        total = hits + misses
+        return {
+            "size": size,
+            "maxsize": self.maxsize,
+            "hits": hits,
+            "misses": misses,
+            "shared_hits": shared_hits,
+            "evictions": evictions,
+            "hit_rate": hits / total if total else 0.0,
+        }
+
+    def _store(self, items):
+        expires = time.monotonic() + self.ttl
+        with self._lock:
+            for key, value in items:
+                self._data[key] = (expires, value)
+                self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
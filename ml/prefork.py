@@ -0,0 +1,125 @@
+"""
+Pre-Fork Model Sharing
+Loads models once in the gunicorn master so every worker inherits them.
+Model arrays are copied into one anonymous shared mapping (MAP_SHARED),
+so refcount and GC writes on the Python objects never touch the pages
+that hold the weights, and the weights stay shared between workers.
+
+Only fork-safe backends are loaded in the master: the NumPy ones
+(NEUROSENSE_XGB_BACKEND=compiled, NEUROSENSE_TF_BACKEND=numpy) and the
+scalers. xgboost.Booster and TensorFlow keep loading lazily per worker.
+
+    gunicorn -c gunicorn.conf.py app:app
+"""
+
+import gc
+import mmap
+
+import numpy as np
+
+from ml.model_registry import FORK_SAFE_KINDS
+
+ALIGN = 64
+
+
+# -----------------------------
+# SHARED ARENA
+# -----------------------------
+class SharedArena:
+    """One anonymous shared mapping holding read-only NumPy arrays"""
+
+    def __init__(self, nbytes):
+        self.nbytes = max(nbytes, 1)
+        self._buf = mmap.mmap(-1, self.nbytes, flags=mmap.MAP_SHARED | mmap.MAP_ANONYMOUS)
+        self._offset = 0
+
+    def share(self, arr):
+        arr = np.ascontiguousarray(arr)
+        view = np.frombuffer(self._buf, dtype=arr.dtype, count=arr.size,
+                             offset=self._offset).reshape(arr.shape)
+        view[...] = arr
+        view.flags.writeable = False
+        self._offset += _aligned(arr.nbytes)
+        return view
+
+
+def _aligned(n):
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+
+def _map_arrays(value, fn):
+    """
+    Apply fn to every ndarray inside value (lists, tuples, dicts).
+    Object arrays hold pointers to Python objects and stay where they are.
+    """
+    if isinstance(value, np.ndarray):
+        return value if value.dtype.hasobject else fn(value)
+    if isinstance(value, tuple):
+        return tuple(_map_arrays(v, fn) for v in value)
+    if isinstance(value, list):
+        return [_map_arrays(v, fn) for v in value]
+    if isinstance(value, dict):
+        return {k: _map_arrays(v, fn) for k, v in value.items()}
+    return value
+
+
+def share_model_arrays(models):
+    """Move the NumPy arrays of `models` into one SharedArena; returns it"""
+    sizes = []
+
+    def measure(arr):
+        if not isinstance(arr, np.memmap):
+            sizes.append(_aligned(arr.nbytes))
+        return arr
+
+    for model in models:
+        for v in vars(model).values():
+            _map_arrays(v, measure)
+
+    # arrays memory-mapped from a model bundle already share the page cache
+    arena = SharedArena(sum(sizes))
+    share = lambda arr: arr if isinstance(arr, np.memmap) else arena.share(arr)
+    for model in models:
+        for k, v in list(vars(model).items()):
+            setattr(model, k, _map_arrays(v, share))
+    return arena
+
+
+# -----------------------------
+# MASTER-SIDE PRELOAD
+# -----------------------------
+_arena = None
+
+
+def preload_for_fork(manager=None):
+    """
+    Call in the master before workers fork (gunicorn on_starting hook).
+    Loads the fork-safe models, moves their arrays into shared memory
+    and freezes the GC so collections in workers do not dirty them.
+    """
+    global _arena
+    if manager is None:
+        from ml.ml_manager import get_model_manager
+        manager = get_model_manager()
+
+    registry = manager.registry
+    wanted = [n for n in manager.ACTIVE_MODELS + manager.SCALERS if registry.available(n)]
+    names = [n for n in wanted if registry.loader_kind(n) in FORK_SAFE_KINDS]
+    skipped = [n for n in wanted if n not in names]
+    if skipped:
+        print("⚠️ Not fork-safe, loaded per worker instead:", ", ".join(skipped))
+
+    manager.preload(names)
+    # share a scaler's mean/scale only, not the sklearn object around them
+    from ml.bundle import ScalerParams
+    for n in manager.SCALERS:
+        scaler = registry.models.get(n)
+        if scaler is not None and not isinstance(scaler, ScalerParams):
+            registry.models[n] = ScalerParams.from_sklearn(scaler)
+    models = [registry.models[n] for n in names if n in registry.models]
+    _arena = share_model_arrays(models)
+
+    gc.collect()
+    gc.freeze()
+    print(f"✔ Pre-fork: {len(models)} models, {_arena.nbytes / 1e6:.1f} MB shared")
+    return _arena
@@ -0,0 +1,241 @@
+"""
+Compiled XGBoost Tree Evaluator
+Flattens a JSON-saved XGBoost booster into NumPy arrays and scores
+rows with vectorized traversal (no xgboost import, no DMatrix).
+
+Check parity against xgboost:
+    python -m ml.tree_compiler ml/Models/alzheimer_model1_xgb.json
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+
+
+# -----------------------------
+# OBJECTIVES (margin → output)
+# -----------------------------
+def _sigmoid(m):
+    return 1.0 / (1.0 + np.exp(-m))
+
+
+def _logit(p):
+    return np.log(p / (1.0 - p))
+
+
+def _identity(m):
+    return m
+
+
+# objective → (margin transform, base_score → base margin)
+OBJECTIVES = {
+    "binary:logistic": (_sigmoid, _logit),
+    "reg:logistic": (_sigmoid, _logit),
+    "binary:logitraw": (_identity, _identity),
+    "reg:squarederror": (_identity, _identity),
+}
+
+
+def _parse_float(value):
+    # newer xgboost stores base_score as a vector string, e.g. "[4.8E-1]"
+    return float(str(value).strip("[]").split(",")[0])
+
+
+# -----------------------------
+# COMPILED BOOSTER
+# -----------------------------
+class CompiledBooster:
+    """
+    All trees of a booster packed into flat node arrays.
+    Leaves point to themselves, so every row can take exactly
+    `max_depth` steps and ends up on its leaf.
+    """
+
+    ARRAYS = ("feature", "threshold", "left", "right", "default_left", "value", "roots")
+
+    def __init__(self, feature, threshold, left, right, default_left, value,
+                 roots, max_depth, base_margin, objective, num_feature,
+                 feature_names=None):
+        self.feature = feature              # int32 split feature (0 on leaves)
+        self.threshold = threshold          # float32 split condition
+        self.left = left                    # int32 global index of left child
+        self.right = right                  # int32 global index of right child
+        self.default_left = default_left    # bool, direction for missing values
+        self.value = value                  # float32 leaf value (0 on splits)
+        self.roots = roots                  # int32 root index of each tree
+        self.max_depth = int(max_depth)
+        self.base_margin = float(base_margin)
+        self.objective = objective
+        self.num_feature = int(num_feature)
+        self.feature_names = feature_names or None
+        self._transform = OBJECTIVES[objective][0]
+
+    # =============================
+    # BUILD
+    # =============================
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls.from_json(json.load(f))
+
+    @classmethod
+    def from_json(cls, doc):
+        learner = doc["learner"]
+        booster = learner["gradient_booster"]
+        objective = learner["objective"]["name"]
+        params = learner["learner_model_param"]
+
+        if booster.get("name") != "gbtree":
+            raise ValueError(f"Unsupported booster: {booster.get('name')}")
+        if objective not in OBJECTIVES:
+            raise ValueError(f"Unsupported objective: {objective}")
+        if int(params.get("num_class", 0)) > 1 or int(params.get("num_target", 1)) > 1:
+            raise ValueError("Only single-output boosters are supported")
+
+        trees = booster["model"]["trees"]
+        sizes = [len(t["left_children"]) for t in trees]
+        offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.int32)
+        total = int(sum(sizes))
+
+        feature = np.zeros(total, dtype=np.int32)
+        threshold = np.zeros(total, dtype=np.float32)
+        left = np.zeros(total, dtype=np.int32)
+        right = np.zeros(total, dtype=np.int32)
+        default_left = np.zeros(total, dtype=bool)
+        value = np.zeros(total, dtype=np.float32)
+        max_depth = 0
+
+        for tree, off in zip(trees, offsets):
+            if any(tree.get("split_type", [])):
+                raise ValueError("Categorical splits are not supported")
+
+            n = len(tree["left_children"])
+            sl = slice(off, off + n)
+            lc = np.asarray(tree["left_children"], dtype=np.int32)
+            rc = np.asarray(tree["right_children"], dtype=np.int32)
+            cond = np.asarray(tree["split_conditions"], dtype=np.float32)
+            leaf = lc == -1
+            own = np.arange(n, dtype=np.int32)
+
+            feature[sl] = np.where(leaf, 0, tree["split_indices"])
+            threshold[sl] = np.where(leaf, 0, cond)
+            value[sl] = np.where(leaf, cond, 0)
+            left[sl] = np.where(leaf, own, lc) + off
+            right[sl] = np.where(leaf, own, rc) + off
+            default_left[sl] = np.asarray(tree["default_left"], dtype=bool)
+            max_depth = max(max_depth, _depth(lc, rc))
+
+        base_score = _parse_float(params["base_score"])
+        base_margin = OBJECTIVES[objective][1](base_score)
+
+        return cls(
+            feature, threshold, left, right, default_left, value,
+            offsets, max_depth, base_margin, objective,
+            int(params["num_feature"]), learner.get("feature_names"),
+        )
+
+    # =============================
+    # PREDICT
+    # =============================
+    def predict(self, X, feature_names=None, validate_features=True):
+        """Score an (N, F) or (F,) matrix; returns N model outputs"""
+        return self._transform(self.predict_margin(X, feature_names, validate_features))
+
+    def predict_margin(self, X, feature_names=None, validate_features=True):
+        X = self._prepare(X, feature_names, validate_features)
+        leaves = self._leaves(X)
+        return self.value[leaves].sum(axis=1, dtype=np.float64) + self.base_margin
+
+    def _prepare(self, X, feature_names, validate_features):
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+
+        # same checks the xgboost Booster applies to a DMatrix
+        if validate_features and self.feature_names and feature_names != self.feature_names:
+            raise ValueError(
+                "feature_names mismatch: expected "
+                f"{self.feature_names}, got {feature_names}"
+            )
+        if X.shape[1] > self.num_feature:
+            raise ValueError(
+                f"Feature shape mismatch, expected: {self.num_feature}, got {X.shape[1]}"
+            )
+        if X.shape[1] < self.num_feature:
+            pad = np.full((len(X), self.num_feature - X.shape[1]), np.nan, dtype=np.float32)
+            X = np.hstack([X, pad])
+        return X
+
+    def _leaves(self, X):
+        """(N, T) global leaf index reached by each row in each tree"""
+        rows = np.arange(len(X))[:, None]
+        nodes = np.broadcast_to(self.roots, (len(X), len(self.roots))).copy()
+        for _ in range(self.max_depth):
+            x = X[rows, self.feature[nodes]]
+            go_left = np.where(np.isnan(x), self.default_left[nodes], x < self.threshold[nodes])
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return nodes
+
+    def __repr__(self):
+        return (f"CompiledBooster(trees={len(self.roots)}, nodes={len(self.feature)}, "
+                f"max_depth={self.max_depth}, objective={self.objective})")
+
+
+def _depth(left, right):
+    depth, frontier = 0, [0]
+    while frontier:
+        nxt = [c for n in frontier for c in (left[n], right[n]) if c != -1]
+        if nxt:
+            depth += 1
+        frontier = nxt
+    return depth
+
+
+# -----------------------------
+# PARITY CHECK
+# -----------------------------
+def check_parity(path, X=None, n_rows=1000, atol=1e-5, seed=0):
+    """
+    Compare the compiled evaluator with xgboost.Booster on the same rows.
+    Returns the max absolute difference; raises AssertionError above `atol`.
+    """
+    import xgboost as xgb
+
+    compiled = CompiledBooster.load(path)
+    booster = xgb.Booster()
+    booster.load_model(str(path))
+
+    if X is None:
+        rng = np.random.default_rng(seed)
+        X = _sample_rows(compiled, n_rows, rng)
+
+    names = compiled.feature_names
+    expected = booster.predict(xgb.DMatrix(X, missing=np.nan, feature_names=names))
+    got = compiled.predict(X, feature_names=names)
+
+    diff = float(np.max(np.abs(expected - got)))
+    assert diff <= atol, f"{Path(path).name}: max abs diff {diff} > {atol}"
+    return diff
+
+
+def _sample_rows(compiled, n_rows, rng):
+    """Rows drawn around each feature's split thresholds, with some missing values"""
+    X = np.empty((n_rows, compiled.num_feature), dtype=np.float32)
+    splits = compiled.left != np.arange(len(compiled.left))
+    for j in range(compiled.num_feature):
+        t = compiled.threshold[splits & (compiled.feature == j)]
+        lo, hi = (t.min(), t.max()) if len(t) else (0.0, 1.0)
+        span = (hi - lo) or 1.0
+        X[:, j] = rng.uniform(lo - 0.1 * span, hi + 0.1 * span, n_rows)
+        if len(t):
+            exact = rng.random(n_rows) < 0.1
+            X[exact, j] = rng.choice(t, exact.sum())
+    X[rng.random(X.shape) < 0.05] = np.nan
+    return X
+
+
+if __name__ == "__main__":
+    for p in sys.argv[1:] or sorted(Path("ml/Models").glob("*.json")):
+        print(f"{Path(p).name}: max abs diff {check_parity(p):.2e}")
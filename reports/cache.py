@@ -0,0 +1,167 @@
+"""
+Patient Report Cache
+Rendered timeline / EHR PDFs are kept on disk, keyed by patient and by
+the state of the rows they are built from: row count, latest id and
+latest updated_at of health_events (timeline) or assessments (EHR), plus
+the profile fields printed in the EHR header. updated_at (migration 007)
+moves on in-place edits such as a rescore, which leave count and id alone. That key is also the response ETag, so a
+repeat download costs one index lookup and is answered with a 304 or a
+file from disk.
+
+Misses are rendered by a small per-process thread pool; the request waits
+up to `wait` seconds and otherwise gets a 202 with Retry-After. Two
+requests for the same report share one render.
+
+    NEUROSENSE_REPORT_CACHE=0           stream every export (no cache)
+    NEUROSENSE_REPORT_CACHE_DIR         default instance/report_cache
+    NEUROSENSE_REPORT_WORKERS           render threads per process (default 2)
+    NEUROSENSE_REPORT_WAIT              seconds a request waits for a render (default 2)
+"""
+
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ml.metrics import REGISTRY
+
+# bump when the PDF layout changes: every cached report is re-rendered
+REPORT_FORMAT = 1
+
+# (row count, latest id, latest change) of the rows each report is built from
+VERSION_SQL = {
+    "timeline": """
+        SELECT COUNT(*) AS n, MAX(id) AS last_id, MAX(updated_at) AS changed
+        FROM health_events WHERE patient_id = %s
+    """,
+    "ehr": """
+        SELECT COUNT(*) AS n, MAX(id) AS last_id, MAX(updated_at) AS changed
+        FROM assessments WHERE patient_id = %s
+    """,
+}
+
+REPORTS = REGISTRY.counter(
+    "neurosense_report_cache_total", "Report requests by outcome (not_modified, hit, rendered, pending)",
+    labels=("kind", "outcome"))
+RENDER_SECONDS = REGISTRY.histogram(
+    "neurosense_report_render_seconds", "Time to render a report to the cache", labels=("kind",))
+
+
+class ReportCache:
+
+    def __init__(self, root="instance/report_cache", workers=2, wait=2.0):
+        self.root = root
+        self.workers = workers
+        self.wait = wait
+        self._executor = None
+        self._pid = None
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        if os.environ.get("NEUROSENSE_REPORT_CACHE", "1") == "0":
+            return None
+        return cls(
+            root=os.environ.get("NEUROSENSE_REPORT_CACHE_DIR", "instance/report_cache"),
+            workers=int(os.environ.get("NEUROSENSE_REPORT_WORKERS", 2)),
+            wait=float(os.environ.get("NEUROSENSE_REPORT_WAIT", 2)),
+        )
+
+    # =============================
+    # KEYS
+    # =============================
+    def etag(self, cur, kind, patient_id, extra=""):
+        """Cache key / ETag for the report as the database stands now"""
+        cur.execute(VERSION_SQL[kind], (patient_id,))
+        row = cur.fetchone()
+        n, last_id, changed = ((row["n"], row["last_id"], row["changed"])
+                               if isinstance(row, dict) else row)
+        raw = f"{REPORT_FORMAT}|{kind}|{patient_id}|{n}|{last_id}|{changed}|{extra}"
+        return hashlib.sha1(raw.encode()).hexdigest()[:24]
+
+    def path(self, kind, patient_id, etag):
+        return os.path.join(self.root, kind, str(int(patient_id)), f"{etag}.pdf")
+
+    def lookup(self, kind, patient_id, etag):
+        """
+        The cached report opened for reading, or None. Open, not a path: a
+        newer render may prune the file, and an open file survives that.
+        """
+        return self.open(self.path(kind, patient_id, etag))
+
+    @staticmethod
+    def open(path):
+        try:
+            return open(path, "rb")
+        except FileNotFoundError:
+            return None
+
+    # =============================
+    # RENDERING
+    # =============================
+    def _pool(self):
+        # worker threads do not survive a fork; each process gets its own
+        if self._executor is None or self._pid != os.getpid():
+            with self._lock:
+                if self._executor is None or self._pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(self.workers,
+                                                        thread_name_prefix="report-render")
+                    self._inflight = {}
+                    self._pid = os.getpid()
+        return self._executor
+
+    def render(self, kind, patient_id, etag, chunks):
+        """
+        Future for the cached file path. `chunks` is a callable returning
+        the PDF byte chunks; it runs on a render thread.
+        """
+        path = self.path(kind, patient_id, etag)
+        pool = self._pool()
+        with self._lock:
+            future = self._inflight.get(path)
+            started = future is None
+            if started:
+                future = pool.submit(self._write, kind, path, chunks)
+                self._inflight[path] = future
+        if started:
+            # outside the lock: a render that is already done runs the callback here
+            future.add_done_callback(lambda _: self._forget(path))
+        return future
+
+    def _forget(self, path):
+        with self._lock:
+            self._inflight.pop(path, None)
+
+    def _write(self, kind, path, chunks):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with RENDER_SECONDS.time(kind=kind), open(tmp, "wb") as f:
+                for chunk in chunks():
+                    f.write(chunk)
+            os.replace(tmp, path)
+        except Exception:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        self._prune(path)
+        return path
+
+    def _prune(self, keep):
+        """
+        Drop older renders of the same report; they can never match again.
+        Files written within the last `wait` seconds are left alone: a
+        request whose render just finished may not have opened it yet.
+        """
+        folder = os.path.dirname(keep)
+        cutoff = time.time() - self.wait
+        for name in os.listdir(folder):
+            old = os.path.join(folder, name)
+            if old != keep and name.endswith(".pdf"):
+                try:
+                    if os.path.getmtime(old) < cutoff:
+                        os.remove(old)
+                except OSError:
+                    pass
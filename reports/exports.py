@@ -0,0 +1,73 @@
+"""
+Patient PDF Exports
+Timeline and EHR documents as byte generators over a server-side cursor:
+rows are read one at a time and each page is sent as soon as it is full,
+so memory stays flat however long the patient's history is.
+
+    return Response(stream_with_context(timeline_pdf(rows)), mimetype="application/pdf")
+"""
+
+from reportlab.lib.pagesizes import A4
+
+from reports.pdf_stream import StreamingPDF, PageFlow, BOLD
+
+TIMELINE_SQL = """
+    SELECT title, description, disease, created_at
+    FROM health_events
+    WHERE patient_id = %s
+    ORDER BY created_at DESC, id DESC
+"""
+
+EHR_SQL = """
+    SELECT primary_diagnosis, diagnosis_confidence, created_at
+    FROM assessments
+    WHERE patient_id = %s
+    ORDER BY created_at DESC, id DESC
+"""
+
+
+def _chunks(parts):
+    """Drop empty pieces: an empty chunk would end a chunked response early"""
+    for part in parts:
+        if part:
+            yield part
+
+
+def timeline_pdf(events, pagesize=A4):
+    """Health timeline PDF; `events` is any iterable of TIMELINE_SQL rows"""
+    pdf = StreamingPDF(pagesize, title="Health Timeline")
+    flow = PageFlow(pdf)
+
+    def parts():
+        yield pdf.start()
+        yield from flow.write("Health Timeline", font=BOLD, size=16, after=40)
+        for e in events:
+            yield from flow.wrap(f"{e['created_at']} - {e['title']}")
+            yield from flow.wrap(e["description"] or "", indent=10)
+            yield from flow.write(f"Disease: {e['disease']}", indent=10)
+            flow.space(15)
+        yield from flow.close()
+
+    return _chunks(parts())
+
+
+def ehr_pdf(patient, assessments, pagesize=A4):
+    """EHR summary PDF; `assessments` is any iterable of EHR_SQL rows"""
+    pdf = StreamingPDF(pagesize, title="Electronic Health Record")
+    flow = PageFlow(pdf)
+
+    def parts():
+        yield pdf.start()
+        yield from flow.write("Electronic Health Record", font=BOLD, size=16, after=30)
+        yield from flow.write(f"Name: {patient['full_name']}")
+        yield from flow.write(f"Email: {patient['email']}")
+        yield from flow.write(f"Age: {patient['age']}", after=30)
+        for a in assessments:
+            primary = a["primary_diagnosis"] or "N/A"
+            confidence = "N/A" if a["diagnosis_confidence"] is None else a["diagnosis_confidence"]
+            yield from flow.wrap(f"{a['created_at']} - Diagnosis: {primary}")
+            yield from flow.write(f"Confidence: {confidence}", indent=10)
+            flow.space(10)
+        yield from flow.close()
+
+    return _chunks(parts())
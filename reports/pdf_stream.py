@@ -0,0 +1,185 @@
+"""
+Streaming PDF Writer
+reportlab's canvas keeps every page in memory until save(). This writer
+emits each page's bytes as soon as the page is full, so an export of any
+length is sent incrementally and only the byte offsets of finished
+objects (8 bytes each) are kept.
+
+    pdf = StreamingPDF(title="Health Timeline")
+    flow = PageFlow(pdf)
+    yield pdf.start()
+    yield from flow.write("Health Timeline", font=BOLD, size=16, after=40)
+    yield from flow.wrap(long_text, indent=10)
+    yield from flow.close()       # last page, then pdf.finish()
+
+Text uses the standard Helvetica fonts (WinAnsi encoding, nothing
+embedded); characters outside it print as '?'. Line widths come from
+reportlab's font metrics.
+"""
+
+import zlib
+from array import array
+
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+REGULAR = "Helvetica"
+BOLD = "Helvetica-Bold"
+
+# object numbers fixed up front; pages are numbered from FIRST_PAGE_OBJ on
+CATALOG, PAGES, INFO = 1, 2, 3
+FONTS = {REGULAR: ("F1", 4), BOLD: ("F2", 5)}
+FIRST_PAGE_OBJ = 6
+
+# page refs / xref lines per chunk when writing the trailer
+TRAILER_BATCH = 1000
+
+
+def pdf_string(text):
+    """PDF literal string (bytes) for text in WinAnsi encoding"""
+    raw = str(text).encode("cp1252", errors="replace")
+    return b"(" + raw.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+
+def wrap_lines(text, font, size, width, measure=stringWidth):
+    """
+    Split text into lines no wider than `width` points, breaking at spaces
+    and hard-breaking words that are wider than a whole line.
+    """
+    lines = []
+    for paragraph in str(text).splitlines() or [""]:
+        line = ""
+        for word in paragraph.split():
+            candidate = f"{line} {word}" if line else word
+            if measure(candidate, font, size) <= width:
+                line = candidate
+                continue
+            if line:
+                lines.append(line)
+            # a single word wider than the line: cut it into pieces
+            while measure(word, font, size) > width and len(word) > 1:
+                cut = len(word) - 1
+                while cut > 1 and measure(word[:cut], font, size) > width:
+                    cut -= 1
+                lines.append(word[:cut])
+                word = word[cut:]
+            line = word
+        lines.append(line)
+    return lines
+
+
+class StreamingPDF:
+    """Writes a PDF object by object; every method returns (or yields) bytes to send"""
+
+    def __init__(self, pagesize=A4, title=None):
+        self.width, self.height = pagesize
+        self.title = title
+        self._pos = 0
+        self._offsets = array("Q")
+        self._pages = 0
+
+    def _emit(self, data):
+        self._pos += len(data)
+        return data
+
+    def _obj(self, num, body):
+        while len(self._offsets) <= num:
+            self._offsets.append(0)
+        self._offsets[num] = self._pos
+        return self._emit(b"%d 0 obj\n" % num + body + b"\nendobj\n")
+
+    def start(self):
+        header = b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n"
+        self._pos = len(header)
+        out = [header]
+        for font, (_, num) in FONTS.items():
+            out.append(self._obj(num, b"<< /Type /Font /Subtype /Type1 /BaseFont /%s "
+                                      b"/Encoding /WinAnsiEncoding >>" % font.encode()))
+        return b"".join(out)
+
+    def page(self, content):
+        """One finished page from its content stream operators (bytes)"""
+        stream_num = FIRST_PAGE_OBJ + 2 * self._pages
+        page_num = stream_num + 1
+        self._pages += 1
+
+        data = zlib.compress(content)
+        fonts = b" ".join(b"/%s %d 0 R" % (name.encode(), num) for name, num in FONTS.values())
+        return (
+            self._obj(stream_num, b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(data)
+                      + data + b"\nendstream")
+            + self._obj(page_num, b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %s %s] "
+                                  b"/Resources << /Font << %s >> >> /Contents %d 0 R >>"
+                        % (PAGES, _num(self.width), _num(self.height), fonts, stream_num))
+        )
+
+    def finish(self):
+        """
+        Page tree, catalog, xref and trailer, yielded in bounded pieces;
+        call after the last page.
+        """
+        # the page tree is one object, but its Kids array is sent in batches
+        self._offsets[PAGES] = self._pos
+        yield self._emit(b"%d 0 obj\n<< /Type /Pages /Count %d /Kids [" % (PAGES, self._pages))
+        for start in range(0, self._pages, TRAILER_BATCH):
+            stop = min(start + TRAILER_BATCH, self._pages)
+            yield self._emit(b"".join(b"%d 0 R " % (FIRST_PAGE_OBJ + 2 * i + 1)
+                                      for i in range(start, stop)))
+        yield self._emit(b"] >>\nendobj\n")
+        yield self._obj(CATALOG, b"<< /Type /Catalog /Pages %d 0 R >>" % PAGES)
+        yield self._obj(INFO, b"<< /Producer (NeuroSense) /Title %s >>" % pdf_string(self.title or ""))
+
+        size = len(self._offsets)
+        xref_pos = self._pos
+        yield b"xref\n0 %d\n0000000000 65535 f \n" % size
+        for start in range(1, size, TRAILER_BATCH):
+            yield b"".join(b"%010d 00000 n \n" % self._offsets[num]
+                           for num in range(start, min(start + TRAILER_BATCH, size)))
+        yield (b"trailer\n<< /Size %d /Root %d 0 R /Info %d 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+               % (size, CATALOG, INFO, xref_pos))
+
+
+def _num(value):
+    return (b"%.2f" % value).rstrip(b"0").rstrip(b".")
+
+
+class PageFlow:
+    """
+    Top-to-bottom text layout over StreamingPDF pages. write() and wrap()
+    are generators yielding a page's bytes whenever one fills up.
+    """
+
+    def __init__(self, pdf, top=800, bottom=60, left=50, right=None):
+        self.pdf = pdf
+        self.top, self.bottom, self.left = top, bottom, left
+        self.right = right if right is not None else pdf.width - left
+        self.y = top
+        self._ops = []
+
+    def _break(self):
+        yield self.pdf.page(b"\n".join(self._ops))
+        self._ops = []
+        self.y = self.top
+
+    def write(self, text, indent=0, font=REGULAR, size=11, after=15):
+        """One line at the current position, then move down `after` points"""
+        if self.y < self.bottom and self._ops:
+            yield from self._break()
+        name = FONTS[font][0].encode()
+        self._ops.append(b"BT /%s %s Tf %s %s Td %s Tj ET" % (
+            name, _num(size), _num(self.left + indent), _num(self.y), pdf_string(text)))
+        self.y -= after
+
+    def wrap(self, text, indent=0, font=REGULAR, size=11, after=15):
+        width = self.right - self.left - indent
+        for line in wrap_lines(text, font, size, width):
+            yield from self.write(line, indent, font, size, after)
+
+    def space(self, points):
+        self.y -= points
+
+    def close(self):
+        """Last page (if it has content) and the document trailer"""
+        if self._ops or not self.pdf._pages:
+            yield from self._break()
+        yield from self.pdf.finish()
@@ -0,0 +1,276 @@
+"""
+Content-Addressed MRI Storage
+Uploads are streamed to a temp file in fixed-size chunks while their
+SHA-256 is computed, then renamed into objects/<sha[:2]>/<sha><ext>. A
+scan that is already stored is not written twice: the temp file is
+dropped and the existing object returned. Temp files live next to the
+objects, so the final rename is atomic and a failed upload never leaves a
+partial object behind.
+
+Large volumes can be sent as a resumable session instead of one request:
+
+    POST  /upload_mri/sessions          {"filename": ..., "size": ...} -> upload_id
+    PATCH /upload_mri/sessions/<id>     body = next chunk, Upload-Offset: <bytes so far>
+    HEAD  /upload_mri/sessions/<id>     Upload-Offset: <bytes received> (to resume)
+
+The session's part file is the only state: its size is the offset, so an
+interrupted chunk resumes from whatever reached the disk. Once the last
+chunk is committed the session's metadata records the stored object, so
+a retried final PATCH (its response was lost) or a HEAD gets that result
+instead of a 404. Sessions idle for longer than `session_ttl` are removed.
+
+    NEUROSENSE_MRI_DIR          default uploads/mri
+    NEUROSENSE_MRI_MAX_BYTES    largest accepted scan (default 2 GiB)
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+import re
+import secrets
+import time
+
+from ml.metrics import REGISTRY
+
+CHUNK_SIZE = 1 << 20
+
+UPLOADS = REGISTRY.counter(
+    "neurosense_mri_uploads_total", "MRI uploads by outcome (stored, deduplicated, rejected)",
+    labels=("outcome",))
+UPLOAD_BYTES = REGISTRY.counter(
+    "neurosense_mri_upload_bytes_total", "MRI bytes received")
+
+_UPLOAD_ID = re.compile(r"^[A-Za-z0-9_-]{16,64}$")
+_EXTENSION = re.compile(r"^(\.[a-z0-9]{1,8}){1,2}$")
+
+
+class UploadError(Exception):
+    status = 400
+
+
+class UploadTooLarge(UploadError):
+    status = 413
+
+
+class UploadConflict(UploadError):
+    """The client's offset is not where the stored part ends"""
+    status = 409
+
+    def __init__(self, message, offset):
+        super().__init__(message)
+        self.offset = offset
+
+
+class UnknownUpload(UploadError):
+    status = 404
+
+
+def extension(filename):
+    """'.nii.gz' / '.dcm' style suffix kept on the object (readers go by it)"""
+    name = os.path.basename(filename or "").lower()
+    parts = name.split(".")[1:]
+    ext = "." + ".".join(parts[-2:]) if parts[-1:] == ["gz"] else ("." + parts[-1] if parts else "")
+    return ext if _EXTENSION.match(ext) else ""
+
+
+class MRIStore:
+
+    def __init__(self, root="uploads/mri", max_bytes=2 << 30, chunk_size=CHUNK_SIZE,
+                 session_ttl=24 * 3600):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self.session_ttl = session_ttl
+        self.objects = os.path.join(root, "objects")
+        self.tmp = os.path.join(root, "tmp")
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            root=os.environ.get("NEUROSENSE_MRI_DIR", "uploads/mri"),
+            max_bytes=int(os.environ.get("NEUROSENSE_MRI_MAX_BYTES", 2 << 30)),
+        )
+
+    # =============================
+    # OBJECTS
+    # =============================
+    def find(self, sha256):
+        """Path of a stored object with this hash, or None"""
+        shard = os.path.join(self.objects, sha256[:2])
+        if os.path.isdir(shard):
+            for name in os.listdir(shard):
+                if name.split(".", 1)[0] == sha256:
+                    return os.path.join(shard, name)
+        return None
+
+    def _commit(self, tmp_path, sha256, filename, size):
+        existing = self.find(sha256)
+        if existing is not None:
+            os.remove(tmp_path)
+            UPLOADS.inc(outcome="deduplicated")
+            return {"sha256": sha256, "file": existing, "size": size, "deduplicated": True}
+
+        path = os.path.join(self.objects, sha256[:2], sha256 + extension(filename))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp_path, path)
+        UPLOADS.inc(outcome="stored")
+        return {"sha256": sha256, "file": path, "size": size, "deduplicated": False}
+
+    def _copy(self, stream, out, limit, digest=None):
+        """Copy stream -> out in chunks; raises UploadTooLarge past `limit` bytes"""
+        written = 0
+        while True:
+            chunk = stream.read(self.chunk_size)
+            if not chunk:
+                return written
+            written += len(chunk)
+            if written > limit:
+                raise UploadTooLarge(f"Upload exceeds {limit} bytes")
+            if digest is not None:
+                digest.update(chunk)
+            out.write(chunk)
+            UPLOAD_BYTES.inc(len(chunk))
+
+    # =============================
+    # SINGLE REQUEST
+    # =============================
+    def put(self, stream, filename):
+        """Store a whole upload read from a file-like stream"""
+        os.makedirs(self.tmp, exist_ok=True)
+        tmp_path = os.path.join(self.tmp, f"put-{secrets.token_hex(8)}.tmp")
+        digest = hashlib.sha256()
+        try:
+            with open(tmp_path, "wb") as out:
+                size = self._copy(stream, out, self.max_bytes, digest)
+            if size == 0:
+                raise UploadError("Empty upload")
+            return self._commit(tmp_path, digest.hexdigest(), filename, size)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            UPLOADS.inc(outcome="rejected")
+            raise
+
+    # =============================
+    # RESUMABLE SESSIONS
+    # =============================
+    def _session_paths(self, upload_id):
+        if not _UPLOAD_ID.match(upload_id or ""):
+            raise UnknownUpload("Unknown upload")
+        base = os.path.join(self.tmp, upload_id)
+        return base + ".part", base + ".json"
+
+    def _load(self, upload_id, owner):
+        part, meta = self._session_paths(upload_id)
+        try:
+            with open(meta) as f:
+                info = json.load(f)
+        except FileNotFoundError:
+            raise UnknownUpload("Unknown or expired upload")
+        if info["owner"] != owner:
+            raise UnknownUpload("Unknown or expired upload")
+        return part, meta, info
+
+    @staticmethod
+    def _write_meta(meta, info):
+        tmp_meta = meta + ".tmp"
+        with open(tmp_meta, "w") as f:
+            json.dump(info, f)
+        os.replace(tmp_meta, meta)
+
+    @staticmethod
+    def _completed(upload_id, info):
+        """Status of a session whose object is already stored"""
+        return {"upload_id": upload_id, "offset": info["size"], "size": info["size"],
+                "complete": True, "sha256": info["sha256"], "file": info["file"],
+                "deduplicated": info["deduplicated"]}
+
+    def create_session(self, filename, size, owner):
+        size = int(size)
+        if size <= 0:
+            raise UploadError("Upload size must be positive")
+        if size > self.max_bytes:
+            raise UploadTooLarge(f"Upload exceeds {self.max_bytes} bytes")
+        self.cleanup()
+
+        os.makedirs(self.tmp, exist_ok=True)
+        upload_id = secrets.token_urlsafe(18)
+        part, meta = self._session_paths(upload_id)
+        open(part, "wb").close()
+        self._write_meta(meta, {"filename": filename, "size": size, "owner": owner,
+                                "created": time.time()})
+        return {"upload_id": upload_id, "offset": 0, "size": size, "chunk_size": self.chunk_size}
+
+    def status(self, upload_id, owner):
+        part, _, info = self._load(upload_id, owner)
+        if info.get("complete"):
+            return self._completed(upload_id, info)
+        return {"upload_id": upload_id, "offset": os.path.getsize(part), "size": info["size"]}
+
+    def append(self, upload_id, owner, offset, stream):
+        """
+        Append the next chunk at `offset`. Returns the new status; once the
+        last byte arrives the file is hashed and committed, and the status
+        carries the stored object ("file", "sha256", ...). Any chunk sent to a
+        completed session (a retried final PATCH) gets that same result.
+        """
+        part, meta, info = self._load(upload_id, owner)
+        if info.get("complete"):
+            return self._completed(upload_id, info)
+        with open(part, "ab") as out:
+            try:
+                fcntl.flock(out, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                raise UploadConflict("Another chunk is being written", os.path.getsize(part))
+
+            # another request may have completed it since _load; opening
+            # the part then re-created it empty
+            info = self._load(upload_id, owner)[2]
+            if info.get("complete"):
+                if os.fstat(out.fileno()).st_size == 0:
+                    os.remove(part)
+                return self._completed(upload_id, info)
+
+            current = os.fstat(out.fileno()).st_size
+            if offset != current:
+                raise UploadConflict(f"Expected offset {current}", current)
+            try:
+                self._copy(stream, out, info["size"] - current)
+            except UploadTooLarge:
+                out.truncate(current)
+                raise UploadTooLarge(f"Chunk runs past the declared size of {info['size']} bytes")
+            out.flush()
+            received = os.fstat(out.fileno()).st_size
+            os.utime(meta)  # the TTL counts from the last chunk, not from creation
+
+            result = {"upload_id": upload_id, "offset": received, "size": info["size"]}
+            if received == info["size"]:
+                result.update(self._finish(part, meta, info))
+            return result
+
+    def _finish(self, part, meta, info):
+        digest = hashlib.sha256()
+        with open(part, "rb") as f:
+            for chunk in iter(lambda: f.read(self.chunk_size), b""):
+                digest.update(chunk)
+        stored = self._commit(part, digest.hexdigest(), info["filename"], info["size"])
+        # kept until the session expires, for retries of this last chunk
+        self._write_meta(meta, {**info, "complete": True, **stored})
+        return {"complete": True, **stored}
+
+    def cleanup(self, now=None):
+        """Remove expired sessions and stray temp files; returns how many"""
+        if not os.path.isdir(self.tmp):
+            return 0
+        cutoff = (now or time.time()) - self.session_ttl
+        removed = 0
+        for name in os.listdir(self.tmp):
+            path = os.path.join(self.tmp, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except OSError:
+                pass
+        return removed
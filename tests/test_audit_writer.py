@@ -0,0 +1,136 @@
+"""Spill, replay and dead-letter behaviour of db/audit_writer.py (fake pool, no MySQL)"""
+
+import json
+
+from db.audit_writer import AsyncRowWriter, is_transient
+
+
+class DBError(Exception):
+    """Stands in for MySQLdb errors: args are (errno, message)"""
+
+
+class _Cursor:
+    def __init__(self, db):
+        self.db = db
+        self.pending = []
+
+    def executemany(self, sql, rows):
+        if "dashboard_counters" in sql:
+            return
+        if self.db.down:
+            raise DBError(2003, "Can't connect to MySQL server")
+        for row in rows:
+            if row[0] == "bad":
+                raise DBError(1452, "Cannot add or update a child row")
+            self.pending.append(row)
+
+    def close(self):
+        pass
+
+
+class _Conn:
+    def __init__(self, db):
+        self.db = db
+        self.cur = None
+
+    def cursor(self):
+        self.cur = _Cursor(self.db)
+        return self.cur
+
+    def commit(self):
+        self.db.rows.extend(self.cur.pending)
+
+    def rollback(self):
+        self.db.rollbacks += 1
+
+
+class _Pool:
+    def __init__(self):
+        self.down = False
+        self.rows = []
+        self.rollbacks = 0
+
+    def acquire(self):
+        return _Conn(self)
+
+    def release(self, conn):
+        pass
+
+
+def _writer(tmp_path, pool):
+    # a long interval: the tests drain by hand, the worker only on demand
+    return AsyncRowWriter(pool, batch_size=10, flush_interval=60,
+                          spill_path=str(tmp_path / "spill.jsonl"),
+                          dead_letter_path=str(tmp_path / "dead.jsonl"))
+
+
+def _event(patient_id):
+    return (patient_id, "intervention", "t", "d", "low", "alzheimers")
+
+
+def _lines(path):
+    return [json.loads(line) for line in open(path)] if path.exists() else []
+
+
+def test_error_classification():
+    assert is_transient(DBError(2006, "MySQL server has gone away"))
+    assert is_transient(DBError(1213, "Deadlock found"))
+    assert is_transient(RuntimeError("no errno"))
+    assert not is_transient(DBError(1452, "FK violation"))
+
+
+def test_unreachable_database_spills_and_replays(tmp_path):
+    pool = _Pool()
+    writer = _writer(tmp_path, pool)
+    pool.down = True
+    writer.append("health_events", _event(1))
+    writer.append("health_events", _event(2))
+    writer._drain()
+    assert len(_lines(tmp_path / "spill.jsonl")) == 2
+    assert pool.rows == []
+
+    pool.down = False
+    assert writer.replay() == 2
+    assert [row[0] for row in pool.rows] == [1, 2]
+    assert not (tmp_path / "spill.jsonl").exists()
+    writer.close()
+
+
+def test_rejected_row_is_dead_lettered_not_spilled(tmp_path):
+    pool = _Pool()
+    writer = _writer(tmp_path, pool)
+    for patient_id in (1, "bad", 3):
+        writer.append("health_events", _event(patient_id))
+    writer._drain()
+
+    assert [row[0] for row in pool.rows] == [1, 3]
+    assert pool.rollbacks == 2           # the batch, then the bad row alone
+    dead = _lines(tmp_path / "dead.jsonl")
+    assert [d["params"][0] for d in dead] == ["bad"]
+    assert "child row" in dead[0]["error"]
+    assert not (tmp_path / "spill.jsonl").exists()
+    writer.close()
+
+
+def test_replay_does_not_respill_a_rejected_row(tmp_path):
+    pool = _Pool()
+    writer = _writer(tmp_path, pool)
+    pool.down = True
+    writer.append("health_events", _event("bad"))
+    writer.append("health_events", _event(2))
+    writer._drain()
+
+    pool.down = False
+    writer.replay()
+    assert [row[0] for row in pool.rows] == [2]
+    assert not (tmp_path / "spill.jsonl").exists()
+    assert len(_lines(tmp_path / "dead.jsonl")) == 1
+    writer.close()
+
+
+def test_append_with_wait_returns_after_the_flush(tmp_path):
+    pool = _Pool()
+    writer = _writer(tmp_path, pool)
+    assert writer.append("health_events", _event(7), wait=5.0)
+    assert [row[0] for row in pool.rows] == [7]
+    writer.close()
@@ -0,0 +1,71 @@
+"""ml/batcher.py: one bad request fails alone, and the worker survives (fake manager)"""
+
+import pytest
+
+from ml.batcher import MicroBatcher, _Request
+
+
+class _Context:
+    def __init__(self, forms):
+        self.forms = forms
+
+    def risks(self, key):
+        # like the real context: results for the whole batch or nothing
+        if any(f.get("bad") for f in self.forms):
+            raise ValueError("model rejected a row")
+        return [f"{key}:{f['id']}" for f in self.forms]
+
+
+class _Manager:
+    def __init__(self):
+        self.contexts = 0
+
+    def _feature_row(self, form):
+        if "id" not in form:
+            raise KeyError("id")
+
+    def new_context(self, forms):
+        self.contexts += 1
+        return _Context(forms)
+
+
+def _batch(batcher, forms):
+    """Run `forms` as one batch on the calling thread"""
+    requests = [_Request("alzheimers", f) for f in forms]
+    batcher._execute(requests)
+    return [r.future for r in requests]
+
+
+def test_bad_form_fails_alone_in_log_passes():
+    manager = _Manager()
+    batcher = MicroBatcher(manager, window_ms=1, max_batch=64)
+    forms = [{"id": i} for i in range(64)]
+    forms[37]["bad"] = True
+    futures = _batch(batcher, forms + [{}])
+
+    assert [f.result() for i, f in enumerate(futures[:64]) if i != 37] == \
+        [f"alzheimers:{i}" for i in range(64) if i != 37]
+    with pytest.raises(ValueError):
+        futures[37].result()
+    with pytest.raises(KeyError):
+        futures[64].result()
+    # one pass, then two halves per level down to the bad form: ~2 log2(64)
+    assert manager.contexts <= 1 + 2 * 6
+
+
+def test_worker_survives_a_failed_batch():
+    batcher = MicroBatcher(_Manager(), window_ms=1)
+    calls = []
+    execute = batcher._execute
+
+    def flaky(batch):
+        calls.append(len(batch))
+        if len(calls) == 1:
+            raise RuntimeError("boom")
+        execute(batch)
+
+    batcher._execute = flaky
+    with pytest.raises(RuntimeError):
+        batcher.submit("alzheimers", {"id": 1}).result(timeout=5)
+    assert batcher.submit("alzheimers", {"id": 2}).result(timeout=5) == "alzheimers:2"
+    assert batcher._thread.is_alive()
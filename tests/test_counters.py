@@ -0,0 +1,37 @@
+"""db/counters.py: the write-side counter matches what the COUNTERS queries count"""
+
+import os
+import re
+
+from db import counters
+
+MIGRATION = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                         "migrations", "008_backfill_dashboard_counters.sql")
+
+
+def _stored(confidence):
+    """What a FLOAT column hands back, compared as a double like MySQL does"""
+    import numpy as np
+    return float(np.float32(confidence))
+
+
+def test_report_counter_agrees_with_the_stored_float():
+    for confidence in (0.7, 0.695, 0.6949999, 0.69500001, 0.9, 0.2, 1, 0):
+        expected = "reports_high" if _stored(confidence) >= counters.HIGH_CONFIDENCE else "reports_pending"
+        assert counters.report_counter(confidence) == expected
+    assert counters.report_counter(0.7) == "reports_high"
+    assert counters.report_counter(0.69) == "reports_pending"
+
+
+def test_confidence_is_compared_on_the_bare_column():
+    for name in ("reports_high", "reports_pending"):
+        assert "ROUND(" not in counters.COUNTERS[name]
+
+
+def test_backfill_migration_counts_what_reconcile_counts():
+    with open(MIGRATION) as f:
+        sql = " ".join(f.read().split())
+    for name, query in counters.COUNTERS.items():
+        where = re.search(r"FROM .*", query).group(0)
+        assert f"'{name}'" in sql
+        assert where in sql, name
@@ -0,0 +1,61 @@
+"""db/diagnostics.py: what save_diagnostic writes inline and what it queues (fake connection)"""
+
+from db.diagnostics import save_diagnostic
+
+RESULT = {"primary_diagnosis": "Alzheimer's", "diagnosis_confidence": 0.82,
+          "secondary_diagnoses": [], "disease_probabilities": {"Alzheimer's": 82.0},
+          "key_findings": [], "recommendations": []}
+
+
+class _Cursor:
+    lastrowid = 41
+
+    def __init__(self, log):
+        self.log = log
+
+    def execute(self, sql, params=None):
+        self.log.append(" ".join(sql.split())[:30])
+
+    def executemany(self, sql, rows):
+        self.log.append(" ".join(sql.split())[:30])
+
+    def close(self):
+        pass
+
+
+class _Conn:
+    def __init__(self):
+        self.log = []
+
+    def cursor(self):
+        return _Cursor(self.log)
+
+    def commit(self):
+        self.log.append("COMMIT")
+
+    def rollback(self):
+        self.log.append("ROLLBACK")
+
+
+class _Writer:
+    def __init__(self):
+        self.rows = []
+
+    def append(self, table, params, wait=None):
+        self.rows.append((table, params))
+
+
+def test_inline_writes_all_rows_in_one_transaction():
+    conn = _Conn()
+    assert save_diagnostic(conn, 7, 3, RESULT) == 41
+    tables = [entry.split()[2] for entry in conn.log[:-1]]
+    assert tables[:3] == ["diagnostic_reports", "health_events", "audit_log"]
+    assert conn.log[-1] == "COMMIT" and conn.log.count("COMMIT") == 1
+
+
+def test_writer_gets_event_and_audit_rows_after_the_commit():
+    conn, writer = _Conn(), _Writer()
+    save_diagnostic(conn, 7, 3, RESULT, writer=writer)
+    assert not any("health_events" in entry or "audit_log" in entry for entry in conn.log)
+    assert [table for table, _ in writer.rows] == ["health_events", "audit_log"]
+    assert writer.rows[0][1][4] == "high" and writer.rows[1][1][3] == 41
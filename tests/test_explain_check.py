@@ -0,0 +1,94 @@
+"""Queries collected by db/explain_check.py, and EXPLAIN on a configured database"""
+
+import ast
+import os
+
+import pytest
+
+from db import explain_check
+
+
+def _constants(source):
+    """Module-level string constants of a source file, without importing it"""
+    with open(os.path.join(explain_check.ROOT, source)) as f:
+        tree = ast.parse(f.read())
+    return {t.id: " ".join(node.value.value.split())
+            for node in tree.body if isinstance(node, ast.Assign)
+            and isinstance(node.value, ast.Constant) and isinstance(node.value.value, str)
+            for t in node.targets if isinstance(t, ast.Name)}
+
+
+def test_streamed_export_queries_are_collected():
+    exports = _constants("reports/exports.py")
+    collected = {sql: location for location, sql in explain_check.collect()}
+    # executed through stream_rows(sql, pid) in app.py, not cursor.execute() directly
+    assert collected[exports["TIMELINE_SQL"]].startswith("app.py:")
+    assert collected[exports["EHR_SQL"]].startswith("app.py:")
+
+
+class _PlanCursor:
+    """Cursor returning a canned EXPLAIN plan per table name found in the query"""
+
+    def __init__(self, plans):
+        self.plans = plans
+        self.description = None
+
+    def execute(self, sql, params=None):
+        self.sql = sql
+
+    def fetchall(self):
+        return [plan for table, plan in self.plans.items() if table in self.sql]
+
+    def close(self):
+        pass
+
+
+class _Conn:
+    def __init__(self, plans):
+        self.plans = plans
+
+    def cursor(self):
+        return _PlanCursor(self.plans)
+
+
+PLANS = {
+    "patients": {"table": "patients", "type": "ALL", "rows": 50000, "possible_keys": None,
+                 "key": None, "Extra": "Using where"},
+    "assessments": {"table": "assessments", "type": "ref", "rows": 3,
+                    "possible_keys": "idx_assessments_patient_created",
+                    "key": "idx_assessments_patient_created", "Extra": None},
+}
+
+
+def test_full_scan_is_flagged(capsys):
+    queries = [("app.py:1 scan()", "SELECT * FROM patients WHERE age > %s")]
+    assert explain_check.check(_Conn(PLANS), queries) == 1
+    assert "full scan of patients" in capsys.readouterr().out
+
+
+def test_indexed_query_passes():
+    queries = [("app.py:2 lookup()", "SELECT * FROM assessments WHERE patient_id = %s")]
+    assert explain_check.check(_Conn(PLANS), queries) == 0
+
+
+def test_allowed_scan_is_not_a_failure(monkeypatch):
+    monkeypatch.setattr(explain_check, "ALLOWED_SCANS", {"FROM patients": "tiny table"})
+    queries = [("app.py:1 scan()", "SELECT * FROM patients WHERE age > %s")]
+    assert explain_check.check(_Conn(PLANS), queries) == 0
+
+
+def test_app_queries_use_indexes_on_the_configured_database():
+    """The real check, against the database named by MYSQL_DB (migrated, realistic rows)"""
+    if not os.environ.get("MYSQL_DB"):
+        pytest.skip("set MYSQL_* to a migrated database to run EXPLAIN for real")
+    MySQLdb = pytest.importorskip("MySQLdb")
+    from db.pool import connect_kwargs, mysql_config
+
+    try:
+        conn = MySQLdb.connect(**connect_kwargs(mysql_config()))
+    except MySQLdb.Error as e:
+        pytest.skip(f"database not reachable: {e}")
+    try:
+        assert explain_check.check(conn, explain_check.collect()) == 0
+    finally:
+        conn.close()
@@ -0,0 +1,89 @@
+"""ml/features.py: row and columnar extraction agree, and models see what they did before"""
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from ml.features import FEATURE_SPEC, MODEL_INPUTS, OASIS_ALIASES
+from ml.model_registry import ModelRegistry
+
+FORMS = [
+    {},
+    {"age": 72, "weight": 80.5, "height": 165, "gender": "Male", "alcoholConsumption": 3,
+     "familyHistory": ["Alzheimer's Disease", "Dementia"],
+     "medicalConditions": ["Hypertension"], "neurologicalSymptoms": ["Tremors", "Stiffness"],
+     "speechIssues": "mild"},
+    {"age": "58", "weight": "61", "height": "158.5", "gender": "Female",
+     "familyHistory": ["Parkinson's Disease"], "speechIssues": "none"},
+    {"age": 90, "height": 0, "gender": "Other", "medicalConditions": ["Diabetes", "Depression"],
+     "neurologicalSymptoms": ["Slowed movement", "Balance problems"]},
+    {"age": 40.25, "weight": 0, "height": 0},
+]
+
+
+def _old_feature_row(f):
+    """MLModelManager._feature_row before the feature spec, verbatim"""
+    return [
+        float(f.get("age", 65)),
+        float(f.get("weight", 70)),
+        float(f.get("height", 170)),
+        1 if f.get("gender") == "Male" else 0,
+        float(f.get("alcoholConsumption", 0)),
+        1 if "Alzheimer's Disease" in f.get("familyHistory", []) else 0,
+        1 if "Parkinson's Disease" in f.get("familyHistory", []) else 0,
+        1 if "Dementia" in f.get("familyHistory", []) else 0,
+    ]
+
+
+def _both(forms):
+    rows = np.array([FEATURE_SPEC.extract(f) for f in forms], dtype=np.float32)
+    columns = FEATURE_SPEC.extract_many(forms * (64 // len(forms) + 1))[:len(forms)]
+    return rows, columns
+
+
+def test_row_and_column_paths_agree():
+    rows, columns = _both(FORMS)
+    np.testing.assert_array_equal(rows, columns)
+    assert np.isnan(rows[3, FEATURE_SPEC.index["bmi"]])
+
+
+@pytest.mark.parametrize("value", [None, "", "n/a"])
+def test_row_and_column_paths_reject_the_same_values(value):
+    form = {"age": value}
+    with pytest.raises((TypeError, ValueError)):
+        FEATURE_SPEC.extract(form)
+    with pytest.raises((TypeError, ValueError)):
+        FEATURE_SPEC.extract_many([form] * 64)
+
+
+def test_network_inputs_match_the_previous_extractor():
+    X = FEATURE_SPEC.extract_many(FORMS)
+    old = np.array([_old_feature_row(f) for f in FORMS], dtype=np.float32)
+    np.testing.assert_array_equal(X[:, :8], old)
+    layout = MODEL_INPUTS["tf_neuro_model"].compile(FEATURE_SPEC)
+    np.testing.assert_array_equal(layout.apply(X), old)
+
+
+# the scaler was pickled by an older scikit-learn and fitted on a DataFrame
+@pytest.mark.filterwarnings("ignore::UserWarning")
+def test_dementia_scores_match_the_sklearn_pipeline():
+    xgb = pytest.importorskip("xgboost")
+    registry = ModelRegistry(Path(__file__).resolve().parent.parent / "ml" / "Models")
+    scaler = registry.get("dementia_scaler")
+    model = registry.get("dementia_oasis_model")
+    if scaler is None or model is None:
+        pytest.skip("dementia model files not available")
+
+    # the notebook pipeline: training columns, mean for what the form lacks, transform
+    X = FEATURE_SPEC.extract_many(FORMS)
+    columns = list(scaler.feature_names_in_)
+    raw = np.array([[X[i, FEATURE_SPEC.index[OASIS_ALIASES[c]]] if c in OASIS_ALIASES
+                     else scaler.mean_[j] for j, c in enumerate(columns)]
+                    for i in range(len(FORMS))])
+    expected = model.predict(xgb.DMatrix(scaler.transform(raw).astype(np.float32),
+                                         feature_names=columns))
+
+    layout = MODEL_INPUTS["dementia_oasis_model"].compile(FEATURE_SPEC, model, scaler)
+    got = model.predict(xgb.DMatrix(layout.apply(X), feature_names=layout.columns))
+    np.testing.assert_allclose(got, expected, atol=1e-6)
@@ -0,0 +1,92 @@
+"""NumPy / tf.function backends against the reference forward pass"""
+
+import json
+
+import numpy as np
+import pytest
+
+from ml.keras_numpy import NumpyDenseModel, check_parity
+
+ATOL = 1e-5
+N_IN, HIDDEN = 8, 16
+
+# fixed inputs: zeros, a ramp, large values and a seeded random block
+X = np.vstack([
+    np.zeros((1, N_IN)),
+    np.linspace(-3, 3, N_IN)[None, :],
+    np.full((1, N_IN), 100.0),
+    np.random.default_rng(0).normal(size=(32, N_IN)),
+]).astype(np.float32)
+
+
+def _weights():
+    rng = np.random.default_rng(42)
+    return {
+        "dense": [("kernel", rng.normal(size=(N_IN, HIDDEN)).astype(np.float32)),
+                  ("bias", rng.normal(size=HIDDEN).astype(np.float32))],
+        "batch_normalization": [
+            ("gamma", rng.uniform(0.5, 1.5, HIDDEN).astype(np.float32)),
+            ("beta", rng.normal(size=HIDDEN).astype(np.float32)),
+            ("moving_mean", rng.normal(size=HIDDEN).astype(np.float32)),
+            ("moving_variance", rng.uniform(0.5, 2.0, HIDDEN).astype(np.float32))],
+        "dense_1": [("kernel", rng.normal(size=(HIDDEN, 1)).astype(np.float32)),
+                    ("bias", rng.normal(size=1).astype(np.float32))],
+    }
+
+
+CONFIG = {"class_name": "Sequential", "config": {"name": "sequential", "layers": [
+    {"class_name": "InputLayer", "config": {"name": "input", "batch_input_shape": [None, N_IN]}},
+    {"class_name": "Dense", "config": {"name": "dense", "units": HIDDEN, "activation": "relu"}},
+    {"class_name": "BatchNormalization", "config": {"name": "batch_normalization", "epsilon": 1e-3}},
+    {"class_name": "Dropout", "config": {"name": "dropout", "rate": 0.3}},
+    {"class_name": "Dense", "config": {"name": "dense_1", "units": 1, "activation": "sigmoid"}},
+]}}
+
+
+def _reference(X, w):
+    """The same network written out in float64"""
+    x = X.astype(np.float64)
+    (_, k), (_, b) = w["dense"]
+    x = np.maximum(x @ k + b, 0)
+    gamma, beta, mean, var = (v for _, v in w["batch_normalization"])
+    x = (x - mean) / np.sqrt(var.astype(np.float64) + 1e-3) * gamma + beta
+    (_, k), (_, b) = w["dense_1"]
+    return 1.0 / (1.0 + np.exp(-(x @ k + b)))
+
+
+def test_numpy_backend_from_h5(tmp_path):
+    h5py = pytest.importorskip("h5py")
+    weights = _weights()
+    path = tmp_path / "model.h5"
+    # Keras 2 .h5 layout: model_config attribute + model_weights/<layer>/<layer>/<weight>
+    with h5py.File(path, "w") as f:
+        f.attrs["model_config"] = json.dumps(CONFIG)
+        group = f.create_group("model_weights")
+        for layer, values in weights.items():
+            g = group.create_group(layer)
+            g.attrs["weight_names"] = [f"{layer}/{name}:0".encode() for name, _ in values]
+            for name, value in values:
+                g[f"{layer}/{name}:0"] = value
+
+    got = NumpyDenseModel.from_h5(path).predict(X)
+    assert got.shape == (len(X), 1)
+    assert np.max(np.abs(got - _reference(X, weights))) <= ATOL
+
+
+def test_backends_match_keras(tmp_path):
+    tf = pytest.importorskip("tensorflow")
+    model = tf.keras.Sequential([
+        tf.keras.Input(shape=(N_IN,)),
+        tf.keras.layers.Dense(HIDDEN, activation="relu"),
+        tf.keras.layers.BatchNormalization(epsilon=1e-3),
+        tf.keras.layers.Dropout(0.3),
+        tf.keras.layers.Dense(1, activation="sigmoid"),
+    ])
+    weights = _weights()
+    for layer, values in zip([l for l in model.layers if l.weights], weights.values()):
+        layer.set_weights([v for _, v in values])
+    path = tmp_path / "model.h5"
+    model.save(path)
+
+    diffs = check_parity(str(path), X=X, atol=ATOL)
+    assert max(diffs.values()) <= ATOL
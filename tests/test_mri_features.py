@@ -0,0 +1,44 @@
+"""ml/mri_features.py: the inference path only reads the cache"""
+
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from ml.mri_features import MRIFeatureCache
+
+SHA = "ab" * 32
+
+
+class _Store:
+    def __init__(self, path):
+        self.path = path
+
+    def find(self, sha256):
+        return self.path if sha256 == SHA else None
+
+
+class _SlowCache(MRIFeatureCache):
+    """An extraction that never finishes"""
+
+    def submit(self, sha256):
+        return Future()
+
+
+def test_cache_only_lookup_does_not_wait(tmp_path):
+    cache = _SlowCache(_Store(None), root=str(tmp_path), wait=30)
+    start = time.perf_counter()
+    assert cache.features_many([SHA, None, "not-a-scan"], wait=0) == [None, None, None]
+    assert time.perf_counter() - start < 1
+
+
+def test_extraction_started_by_a_lookup_fills_the_cache(tmp_path):
+    volume = np.zeros((20, 20, 20), dtype=np.float32)
+    volume[5:15, 5:15, 5:15] = 100
+    np.save(tmp_path / "scan.npy", volume)
+    cache = MRIFeatureCache(_Store(str(tmp_path / "scan.npy")), root=str(tmp_path / "features"))
+
+    cache.features_many([SHA], wait=0)
+    assert cache.features(SHA, wait=60) is not None     # what the request thread does
+    assert cache.features_many([SHA], wait=0)[0] is not None
+    assert cache.get(SHA) is not None
@@ -0,0 +1,77 @@
+"""storage/mri_store.py: resumable sessions, including a retried last chunk"""
+
+import hashlib
+import io
+import os
+
+import pytest
+
+from storage.mri_store import MRIStore, UnknownUpload, UploadConflict, UploadTooLarge
+
+DATA = os.urandom(10_000)
+SHA = hashlib.sha256(DATA).hexdigest()
+
+
+@pytest.fixture
+def store(tmp_path):
+    return MRIStore(root=str(tmp_path), chunk_size=1024)
+
+
+def _upload(store, owner="doc-1"):
+    return store.create_session("brain.nii.gz", len(DATA), owner)["upload_id"]
+
+
+def test_interrupted_upload_resumes_from_the_stored_offset(store):
+    upload_id = _upload(store)
+    store.append(upload_id, "doc-1", 0, io.BytesIO(DATA[:4000]))
+
+    # the client lost track: ask where to continue, and a stale offset is refused
+    offset = store.status(upload_id, "doc-1")["offset"]
+    assert offset == 4000
+    with pytest.raises(UploadConflict) as conflict:
+        store.append(upload_id, "doc-1", 1000, io.BytesIO(DATA[1000:4000]))
+    assert conflict.value.offset == 4000
+
+    done = store.append(upload_id, "doc-1", offset, io.BytesIO(DATA[offset:]))
+    assert done["complete"] and done["sha256"] == SHA
+    with open(done["file"], "rb") as f:
+        assert f.read() == DATA
+    assert done["file"].endswith(SHA + ".nii.gz")
+
+
+def test_retried_final_chunk_returns_the_stored_object(store):
+    upload_id = _upload(store)
+    store.append(upload_id, "doc-1", 0, io.BytesIO(DATA[:6000]))
+    first = store.append(upload_id, "doc-1", 6000, io.BytesIO(DATA[6000:]))
+
+    retry = store.append(upload_id, "doc-1", 6000, io.BytesIO(DATA[6000:]))
+    assert retry["complete"] and retry["file"] == first["file"] and retry["sha256"] == SHA
+    assert store.status(upload_id, "doc-1")["offset"] == len(DATA)
+    assert not os.path.exists(os.path.join(store.tmp, upload_id + ".part"))
+
+
+def test_chunk_past_the_declared_size_is_cut_back(store):
+    upload_id = _upload(store)
+    store.append(upload_id, "doc-1", 0, io.BytesIO(DATA[:9000]))
+    with pytest.raises(UploadTooLarge):
+        store.append(upload_id, "doc-1", 9000, io.BytesIO(DATA[9000:] + b"extra"))
+    assert store.status(upload_id, "doc-1")["offset"] == 9000
+
+
+def test_sessions_belong_to_their_owner_and_expire(store):
+    upload_id = _upload(store)
+    with pytest.raises(UnknownUpload):
+        store.status(upload_id, "doc-2")
+    with pytest.raises(UnknownUpload):
+        store.status("../../etc/passwd", "doc-1")
+
+    assert store.cleanup(now=os.path.getmtime(store.tmp) + store.session_ttl + 1) == 2
+    with pytest.raises(UnknownUpload):
+        store.status(upload_id, "doc-1")
+
+
+def test_same_scan_twice_is_stored_once(store):
+    first = store.put(io.BytesIO(DATA), "a.nii")
+    upload_id = _upload(store)
+    second = store.append(upload_id, "doc-1", 0, io.BytesIO(DATA))
+    assert second["deduplicated"] and second["file"] == first["file"]
@@ -0,0 +1,94 @@
+"""db/pagination.py: walking every page returns every row once (SQLite stands in for MySQL)"""
+
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from db.pagination import BadPageToken, PagedQuery
+
+EVENTS = PagedQuery(
+    "events", "SELECT id, event_type, created_at FROM health_events",
+    order=("created_at", "id"), where=("patient_id = %s",),
+    filters={"event_type": "event_type = %s"}, descending=True)
+
+
+class _Cursor:
+    """DB-API cursor with MySQLdb's %s placeholders and dict rows"""
+
+    def __init__(self, conn):
+        self.cur = conn.cursor()
+
+    def execute(self, sql, params):
+        self.cur.execute(sql.replace("%s", "?"), params)
+
+    def fetchall(self):
+        names = [d[0] for d in self.cur.description]
+        return [dict(zip(names, row)) for row in self.cur.fetchall()]
+
+
+@pytest.fixture
+def cur():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE health_events (id INTEGER PRIMARY KEY, patient_id INT, "
+                 "event_type TEXT, created_at TEXT)")
+    start = datetime(2026, 3, 1, 9, 0, 0)
+    rows = []
+    for i in range(1, 101):
+        # bursts of rows sharing one created_at, like a batch of async writes
+        created = start + timedelta(seconds=i // 7)
+        rows.append((i, 1 if i % 10 else 2, "diagnosis" if i % 3 else "intervention",
+                     created.strftime("%Y-%m-%d %H:%M:%S")))
+    conn.executemany("INSERT INTO health_events VALUES (?, ?, ?, ?)", rows)
+    return _Cursor(conn)
+
+
+def _walk(cur, limit, **filters):
+    """Every page of patient 1's events (params binds the %s in `where`)"""
+    pages, token = [], None
+    while True:
+        rows, token = EVENTS.page(cur, after=token, limit=limit, params=(1,), **filters)
+        pages.append(rows)
+        if token is None:
+            return pages
+
+
+def _expected(cur, where=""):
+    cur.execute("SELECT id, event_type, created_at FROM health_events WHERE patient_id = 1"
+                + where + " ORDER BY created_at DESC, id DESC", [])
+    return [r["id"] for r in cur.fetchall()]
+
+
+@pytest.mark.parametrize("limit", [1, 7, 10, 30, 90, 200])
+def test_every_row_once_across_created_at_ties(cur, limit):
+    pages = _walk(cur, limit)
+    ids = [r["id"] for page in pages for r in page]
+    assert ids == _expected(cur)
+    assert all(len(page) == limit for page in pages[:-1])
+
+
+def test_exact_multiple_has_no_empty_last_page(cur):
+    total = len(_expected(cur))
+    assert total == 90
+    pages = _walk(cur, 45)
+    assert [len(p) for p in pages] == [45, 45]
+
+
+def test_filter_applies_on_every_page(cur):
+    pages = _walk(cur, 8, event_type="intervention")
+    ids = [r["id"] for page in pages for r in page]
+    assert ids == _expected(cur, " AND event_type = 'intervention'")
+
+
+def test_token_of_another_list_is_rejected(cur):
+    other = PagedQuery("patients", "SELECT id FROM patients", order=("id",))
+    with pytest.raises(BadPageToken):
+        EVENTS.decode(other.token({"id": 3}))
+    with pytest.raises(BadPageToken):
+        EVENTS.decode("not a token!")
+
+
+
+def test_datetime_key_round_trips_as_a_mysql_literal():
+    row = {"id": 12, "created_at": datetime(2026, 3, 1, 9, 0, 1)}
+    assert EVENTS.decode(EVENTS.token(row)) == ["2026-03-01 09:00:01", 12]
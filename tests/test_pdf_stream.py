@@ -0,0 +1,58 @@
+"""reports/pdf_stream.py: the streamed bytes form a PDF whose xref points at its objects"""
+
+import re
+
+import pytest
+
+pytest.importorskip("reportlab")
+
+from reports import pdf_stream
+from reports.pdf_stream import BOLD, PageFlow, StreamingPDF, wrap_lines
+
+
+def _document(lines):
+    pdf = StreamingPDF(title="Health (Timeline)")
+    flow = PageFlow(pdf)
+    chunks = [pdf.start()]
+    chunks += flow.write("Health Timeline", font=BOLD, size=16, after=40)
+    for i in range(lines):
+        chunks += flow.wrap(f"Event {i}: " + "word " * 40, indent=10)
+    chunks += flow.close()
+    return b"".join(chunks), pdf
+
+
+def _xref(data):
+    start = int(re.search(rb"startxref\n(\d+)\n%%EOF\n$", data).group(1))
+    assert data[start:].startswith(b"xref\n")
+    size = int(re.match(rb"xref\n0 (\d+)\n", data[start:]).group(1))
+    entries = re.findall(rb"(\d{10}) (\d{5}) ([nf]) \n", data[start:])
+    assert len(entries) == size
+    return size, entries
+
+
+@pytest.mark.parametrize("lines", [0, 3, 400])
+def test_xref_offsets_point_at_their_objects(monkeypatch, lines):
+    monkeypatch.setattr(pdf_stream, "TRAILER_BATCH", 7)    # several Kids / xref batches
+    data, pdf = _document(lines)
+    size, entries = _xref(data)
+
+    assert entries[0] == (b"0000000000", b"65535", b"f")
+    for num, (offset, _, kind) in enumerate(entries[1:], start=1):
+        assert kind == b"n"
+        assert data[int(offset):].startswith(b"%d 0 obj\n" % num), num
+    assert re.search(rb"/Size %d /Root 1 0 R" % size, data)
+    assert b"/Count %d /Kids [" % pdf._pages in data
+    assert data.count(b"/Type /Page ") == pdf._pages
+
+
+def test_pages_break_before_the_bottom_margin():
+    data, pdf = _document(400)
+    assert pdf._pages > 1
+    assert data.startswith(b"%PDF-1.4\n")
+
+
+def test_wrap_lines_breaks_at_spaces_and_splits_long_words():
+    measure = lambda text, font, size: len(text)          # one point per character
+    assert wrap_lines("aa bb cc", BOLD, 10, 5, measure) == ["aa bb", "cc"]
+    assert wrap_lines("abcdefghij", BOLD, 10, 4, measure) == ["abcd", "efgh", "ij"]
+    assert wrap_lines("", BOLD, 10, 4, measure) == [""]
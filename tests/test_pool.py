@@ -0,0 +1,94 @@
+"""db/pool.py: stale connections are replaced and a forked child never reuses the parent's"""
+
+import os
+import time
+
+import pytest
+
+from db.pool import ConnectionPool, PoolTimeout
+
+
+class _Conn:
+    def __init__(self, n):
+        self.n = n
+        self.alive = True
+        self.closed = False
+
+    def ping(self):
+        if not self.alive:
+            raise OSError("MySQL server has gone away")
+
+    def rollback(self):
+        if not self.alive:
+            raise OSError("MySQL server has gone away")
+
+    def close(self):
+        self.closed = True
+
+
+class _Connect:
+    def __init__(self):
+        self.made = []
+
+    def __call__(self):
+        conn = _Conn(len(self.made))
+        self.made.append(conn)
+        return conn
+
+
+def test_idle_connection_is_reused():
+    pool = ConnectionPool(_Connect(), size=2)
+    conn = pool.acquire()
+    pool.release(conn)
+    assert pool.acquire() is conn
+
+
+def test_stale_connection_is_pinged_and_replaced():
+    connect = _Connect()
+    pool = ConnectionPool(connect, size=1, ping_after=0.0)
+    conn = pool.acquire()
+    pool.release(conn)
+    conn.alive = False                    # server closed it while idle
+    time.sleep(0.01)
+
+    fresh = pool.acquire()
+    assert fresh is not conn and conn.closed
+    assert pool.stats()["open"] == 1
+
+
+def test_connection_that_cannot_roll_back_is_discarded():
+    pool = ConnectionPool(_Connect(), size=1)
+    conn = pool.acquire()
+    conn.alive = False
+    pool.release(conn)
+    assert conn.closed and pool.stats()["open"] == 0
+    assert pool.acquire() is not conn
+
+
+def test_exhausted_pool_times_out():
+    pool = ConnectionPool(_Connect(), size=1, timeout=0.05)
+    pool.acquire()
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork()")
+def test_forked_child_opens_its_own_connections():
+    connect = _Connect()
+    pool = ConnectionPool(connect, size=1)
+    parent = pool.acquire()
+    pool.release(parent)
+
+    pid = os.fork()
+    if pid == 0:
+        # child: the idle socket belongs to the parent, and so does its slot
+        code = 1
+        try:
+            conn = pool.acquire()
+            if conn is not parent and len(connect.made) == 2 and pool.stats()["open"] == 1:
+                code = 0
+        finally:
+            os._exit(code)
+    _, status = os.waitpid(pid, 0)
+    assert os.WEXITSTATUS(status) == 0
+    assert pool.acquire() is parent       # the parent's pool is untouched
@@ -0,0 +1,56 @@
+"""ml/prediction_cache.py: thread-safe counters, and keys that follow the model files"""
+
+import os
+import shutil
+import threading
+from pathlib import Path
+
+import pytest
+
+from ml.prediction_cache import PredictionCache
+
+MODELS = Path(__file__).resolve().parent.parent / "ml" / "Models"
+
+
+def test_counters_are_exact_under_concurrency():
+    cache = PredictionCache(maxsize=64)
+    cache.put_many([(b"a", 1), (b"b", 2)])
+
+    def worker():
+        for _ in range(2000):
+            cache.get_many([b"a", b"b", b"missing"])
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    stats = cache.stats()
+    assert stats["hits"] == 8 * 2000 * 2
+    assert stats["misses"] == 8 * 2000
+
+
+@pytest.mark.filterwarnings("ignore::UserWarning")
+def test_replaced_model_file_invalidates_cached_scores(tmp_path):
+    pytest.importorskip("xgboost")
+    from ml.ml_manager import MLModelManager
+
+    models = tmp_path / "Models"
+    shutil.copytree(MODELS, models)
+    cache = PredictionCache()
+    manager = MLModelManager(models_path=str(models), cache=cache, mri=None)
+    form = {"age": 74, "gender": "Female"}
+
+    manager.predict_alzheimers_risk(form)
+    before = manager.model_version
+    assert cache.stats()["size"] == 1
+
+    # a deploy drops a new file in place: same name, new mtime
+    artifact = models / "alzheimer_model1_xgb.json"
+    stat = artifact.stat()
+    os.utime(artifact, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    manager.predict_alzheimers_risk(form)
+    assert manager.model_version != before
+    stats = cache.stats()
+    assert stats["size"] == 1 and stats["hits"] == 0
@@ -0,0 +1,49 @@
+"""Keys and file handling of reports/cache.py (fake cursor, no MySQL)"""
+
+import os
+import time
+
+from reports.cache import ReportCache
+
+
+class _Cursor:
+    def __init__(self, row):
+        self.row = row
+
+    def execute(self, sql, params):
+        pass
+
+    def fetchone(self):
+        return self.row
+
+
+def test_in_place_edit_changes_the_etag(tmp_path):
+    cache = ReportCache(root=str(tmp_path))
+    before = cache.etag(_Cursor({"n": 3, "last_id": 9, "changed": "2026-01-01 10:00:00.000001"}), "ehr", 1)
+    after = cache.etag(_Cursor({"n": 3, "last_id": 9, "changed": "2026-01-01 10:00:00.000002"}), "ehr", 1)
+    assert before != after
+
+
+def test_render_then_lookup(tmp_path):
+    cache = ReportCache(root=str(tmp_path))
+    path = cache.render("ehr", 1, "abc", lambda: [b"%PDF-", b"1.4"]).result(timeout=5)
+    with cache.lookup("ehr", 1, "abc") as f:
+        assert f.read() == b"%PDF-1.4"
+    assert cache.lookup("ehr", 1, "other") is None
+    assert os.path.exists(path)
+
+
+def test_prune_keeps_recent_files_and_open_lookups_survive(tmp_path):
+    cache = ReportCache(root=str(tmp_path), wait=2.0)
+    old = cache.render("ehr", 1, "old", lambda: [b"old"]).result(timeout=5)
+    recent = cache.render("ehr", 1, "recent", lambda: [b"recent"]).result(timeout=5)
+    assert os.path.exists(old)               # written within `wait`: kept
+
+    past = time.time() - 60
+    os.utime(old, (past, past))
+    os.utime(recent, (past, past))
+    served = cache.lookup("ehr", 1, "old")   # a request is about to send it
+    cache.render("ehr", 1, "new", lambda: [b"new"]).result(timeout=5)
+    assert not os.path.exists(old) and not os.path.exists(recent)
+    with served:
+        assert served.read() == b"old"
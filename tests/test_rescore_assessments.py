@@ -0,0 +1,58 @@
+"""jobs/rescore_assessments.py: stored forms are scored, not skipped (no MySQL)"""
+
+import json
+
+import pytest
+
+from jobs import rescore_assessments as job
+from ml.features import FEATURE_SPEC
+from ml.ml_manager import MLModelManager
+
+STORED = {"age": "75", "weight": "", "height": "170", "gender": "Female",
+          "memoryComplaints": "severe", "neurologicalSymptoms": ["Tremors", "Stiffness"]}
+
+
+class _Cursor:
+    def __init__(self):
+        self.calls = []
+
+    def executemany(self, sql, params):
+        self.calls.append((sql, list(params)))
+
+
+@pytest.fixture(scope="module")
+def manager():
+    return MLModelManager(cache=None, mri=None)
+
+
+def test_coerce_reads_numbers_and_drops_blanks():
+    form = FEATURE_SPEC.coerce(STORED)
+    assert form["age"] == 75.0 and form["height"] == 170.0
+    assert "weight" not in form
+    assert FEATURE_SPEC.extract(form) == FEATURE_SPEC.extract({**form, "weight": 70})
+    assert STORED["age"] == "75"
+
+
+def test_string_valued_forms_are_scored(manager):
+    rows = [(1, 10, json.dumps(STORED)), (2, 11, json.dumps({**STORED, "age": "52"})),
+            (3, 12, None)]
+    params, failed = job.score_chunk(manager, rows)
+    assert failed == []
+    assert [p[-1] for p in params] == [1, 2, 3]
+    alz = json.loads(params[0][0])
+    assert ["Age", 90] in alz["top_factors"]
+
+
+def test_unparseable_number_is_skipped(manager):
+    params, failed = job.score_chunk(manager, [(1, 10, json.dumps({"age": "old"})),
+                                               (2, 10, json.dumps(STORED))])
+    assert [row_id for row_id, _ in failed] == [1]
+    assert [p[-1] for p in params] == [2]
+
+
+def test_write_chunk_updates_by_id():
+    cur = _Cursor()
+    job.write_chunk(cur, [("a", "p", "d", "x", 7)])
+    sql, params = cur.calls[0]
+    assert sql.startswith("UPDATE assessments SET") and sql.endswith("WHERE id = %s")
+    assert params == [("a", "p", "d", "x", 7)]
@@ -0,0 +1,43 @@
+"""Which lookup db/search.py picks for a query, and its page tokens (fake cursor)"""
+
+from db import search
+
+
+class _Cursor:
+    def __init__(self, rows=()):
+        self.rows = list(rows)
+        self.calls = []
+
+    def execute(self, sql, params):
+        self.calls.append((" ".join(sql.split()), list(params)))
+
+    def fetchall(self):
+        return self.rows
+
+
+def test_domain_search_uses_the_domain_column():
+    cur = _Cursor()
+    search.search_patients(cur, "@gmail.com")
+    sql, params = cur.calls[0]
+    assert "email_domain LIKE %s" in sql
+    assert params[0] == "gmail.com%"
+
+
+def test_email_search_is_a_prefix_lookup():
+    cur = _Cursor()
+    search.search_patients(cur, "jane@gm")
+    sql, params = cur.calls[0]
+    assert "email LIKE %s" in sql and params[0] == "jane@gm%"
+
+
+def test_ranked_results_page_by_score_and_id():
+    rows = [{"id": 9 - i, "score": 2.5 - i * 0.5} for i in range(4)]
+    cur = _Cursor(rows)
+    page, token = search.search_patients(cur, "smith", limit=3)
+    assert [r["id"] for r in page] == [9, 8, 7] and token
+
+    cur = _Cursor()
+    search.search_patients(cur, "smith", after=token, limit=3)
+    sql, params = cur.calls[0]
+    assert "(score < %s) OR (score = %s AND id < %s)" in sql
+    assert params == ['+"smith"', '+"smith"', 1.5, 1.5, 7, 4]
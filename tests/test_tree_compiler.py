@@ -0,0 +1,31 @@
+"""CompiledBooster parity with xgboost.Booster on the shipped models"""
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from ml.tree_compiler import CompiledBooster, check_parity
+
+pytest.importorskip("xgboost")
+
+MODELS = sorted(Path(__file__).resolve().parent.parent.joinpath("ml", "Models").glob("*.json"))
+ATOL = 1e-5
+
+
+@pytest.mark.parametrize("path", MODELS, ids=lambda p: p.stem)
+def test_parity_on_sampled_rows(path):
+    # rows drawn around every split threshold (seed 0), some values missing
+    assert check_parity(path, n_rows=1000, seed=0, atol=ATOL) <= ATOL
+
+
+@pytest.mark.parametrize("path", MODELS, ids=lambda p: p.stem)
+def test_parity_on_fixed_rows(path):
+    n = CompiledBooster.load(path).num_feature
+    X = np.array([
+        np.zeros(n),
+        np.full(n, np.nan),
+        np.linspace(-5, 5, n),
+        np.where(np.arange(n) % 2, np.nan, 70.0),
+    ], dtype=np.float32)
+    assert check_parity(path, X=X, atol=ATOL) <= ATOL